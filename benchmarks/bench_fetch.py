@@ -0,0 +1,288 @@
+"""
+Benchmark fetch_wikipedia_info against a local mock MediaWiki API.
+
+Starts `benchmarks.mock_mediawiki` in a subprocess with the requested latency
+and error rate, then runs a fixed query mix through the tool at several
+concurrency levels. Reports p50/p95/p99 latency, throughput and errors per
+level plus the peak RSS of the benchmark process, as JSON. Given a baseline
+file from an earlier run, exits with status 1 when a metric regresses by more
+than the threshold.
+
+Usage:
+    python -m benchmarks.bench_fetch --output bench.json
+    python -m benchmarks.bench_fetch --baseline bench.json --threshold 0.2
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+import numpy as np
+
+from benchmarks.mock_mediawiki import load_corpus
+from wikipedia_assistant import server
+from wikipedia_assistant.wikipedia_client import WikipediaClient
+
+
+def make_queries(corpus: List[Dict[str, Any]], count: int, seed: int = 0) -> List[str]:
+    """
+    Build the query mix: mostly exact and lower-cased titles, plus ambiguous
+    single words and queries without any match.
+    """
+    rng = random.Random(seed)
+    articles = [r["title"] for r in corpus if not r.get("disambiguation")]
+    ambiguous = [r["title"] for r in corpus if r.get("disambiguation")] or articles
+    queries = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.6:
+            queries.append(rng.choice(articles))
+        elif roll < 0.8:
+            queries.append(rng.choice(articles).lower())
+        elif roll < 0.9:
+            queries.append(rng.choice(ambiguous))
+        else:
+            queries.append(f"qqzx {rng.randint(0, 10 ** 6)}")
+    return queries
+
+
+# Result codes the query mix produces on purpose: ambiguous words and
+# queries without a match. Any other code is a failed request.
+_EXPECTED_CODES = {"no_results", "ambiguous", "page_not_found"}
+
+
+def is_error(result: Any) -> bool:
+    """Whether a tool result reports a failure rather than an answer."""
+    return isinstance(result, dict) and result.get("code", "no_results") not in _EXPECTED_CODES
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def run_level(queries: Sequence[str], concurrency: int) -> Dict[str, Any]:
+    """Run every query through the tool with `concurrency` callers."""
+    latencies: List[float] = []
+    errors = 0
+    pending = iter(queries)
+
+    async def worker() -> None:
+        nonlocal errors
+        for query in pending:
+            start = time.perf_counter()
+            try:
+                failed = is_error(await server.fetch_wikipedia_info(query))
+            except Exception:
+                failed = True
+            errors += failed
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "error_rate": round(errors / len(latencies), 4),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+    }
+
+
+async def run_benchmark(
+    api_url: str,
+    queries: Sequence[str],
+    levels: Sequence[int],
+    warmup: int,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> List[Dict[str, Any]]:
+    """Run the query mix at each concurrency level and return one report per level."""
+    client = WikipediaClient(
+        api_url=api_url, max_connections=max(levels), transport=transport
+    )
+    server.set_client(client)
+    server.set_cache(None)
+    # Repeated failing queries would otherwise be answered from memory.
+    server.set_negative_cache(None)
+    try:
+        if warmup:
+            await run_level(queries[:warmup], 1)
+        return [await run_level(queries, level) for level in levels]
+    finally:
+        server.set_client(None)
+        await client.aclose()
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """
+    Return one message per metric that is worse than the baseline by more
+    than `threshold` (a fraction): higher p95/p99 latency, error rate or
+    peak RSS, or lower throughput. Any errors against an error-free baseline
+    count, so a failing backend cannot pass for a fast one.
+    """
+    regressions = []
+    previous = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    for level in results["levels"]:
+        before = previous.get(level["concurrency"])
+        if before is None:
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if level[metric] > before[metric] * (1 + threshold):
+                regressions.append(
+                    f"c={level['concurrency']} {metric}: {before[metric]} -> {level[metric]}"
+                )
+        rate, before_rate = _error_rate(level), _error_rate(before)
+        if rate > before_rate * (1 + threshold):
+            regressions.append(
+                f"c={level['concurrency']} errors: {before['errors']} -> {level['errors']}"
+            )
+        if level["throughput_rps"] < before["throughput_rps"] * (1 - threshold):
+            regressions.append(
+                f"c={level['concurrency']} throughput_rps: "
+                f"{before['throughput_rps']} -> {level['throughput_rps']}"
+            )
+    if "peak_rss_mb" in baseline and (
+        results["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + threshold)
+    ):
+        regressions.append(
+            f"peak_rss_mb: {baseline['peak_rss_mb']} -> {results['peak_rss_mb']}"
+        )
+    return regressions
+
+
+def _error_rate(level: Dict[str, Any]) -> float:
+    # Baselines from before the rate was reported only have the count.
+    return level.get("error_rate", level["errors"] / max(level["requests"], 1))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port: int, process: subprocess.Popen, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("mock MediaWiki server exited during startup")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("mock MediaWiki server did not start")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark fetch_wikipedia_info offline")
+    parser.add_argument("--requests", type=int, default=500, help="queries per level")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated levels")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--corpus", help="JSON list of recorded articles")
+    parser.add_argument("--corpus-size", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="JSON results of an earlier run")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2,
+        help="allowed relative regression against the baseline",
+    )
+    args = parser.parse_args(argv)
+    levels = [int(level) for level in args.concurrency.split(",")]
+    # FastMCP turns on INFO logging, which would log every upstream request.
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    port = _free_port()
+    command = [
+        sys.executable, "-m", "benchmarks.mock_mediawiki",
+        "--port", str(port),
+        "--corpus-size", str(args.corpus_size),
+        "--latency-ms", str(args.latency_ms),
+        "--jitter-ms", str(args.jitter_ms),
+        "--error-rate", str(args.error_rate),
+        "--seed", str(args.seed),
+    ]
+    if args.corpus:
+        command += ["--corpus", args.corpus]
+    queries = make_queries(load_corpus(args.corpus, args.corpus_size), args.requests, args.seed)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        filter(None, [root, os.path.join(root, "src"), os.environ.get("PYTHONPATH")])
+    ))
+    mock = subprocess.Popen(command, env=env)
+    try:
+        _wait_for_port(port, mock)
+        levels_results = asyncio.run(run_benchmark(
+            f"http://127.0.0.1:{port}/w/api.php", queries, levels, args.warmup
+        ))
+    finally:
+        mock.terminate()
+        mock.wait()
+
+    results = {
+        "benchmark": "fetch_wikipedia_info",
+        "python": platform.python_version(),
+        "config": {
+            "requests": args.requests,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate,
+            "corpus": args.corpus or f"generated:{args.corpus_size}",
+            "seed": args.seed,
+        },
+        "levels": levels_results,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    return report(results, args.output, args.baseline, args.threshold)
+
+
+def report(
+    results: Dict[str, Any],
+    output: Optional[str],
+    baseline: Optional[str],
+    threshold: float,
+) -> int:
+    """Write `results` and return the exit status: 1 on any regression."""
+    text = json.dumps(results, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if baseline:
+        with open(baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+Benchmark the cold start of the stdio MCP server.
+
+Measures how long `import wikipedia_assistant.server` takes, from
+`python -X importtime`, and lists the slowest modules. Then spawns
+`python -m wikipedia_assistant.server` and times the responses to
+`initialize` and `tools/list` from process start, the path an MCP client
+waits on before its first tool call. Each figure is the median of several
+runs. Given a baseline file from an earlier run, exits with status 1 when a
+figure regresses by more than the threshold.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 10 --output startup.json
+    python -m benchmarks.bench_startup --baseline startup.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+MODULE = "wikipedia_assistant.server"
+PROTOCOL_VERSION = "2025-03-26"
+
+# Figures compared against a baseline; higher is worse for all of them.
+METRICS = ("import_ms", "initialize_ms", "tools_list_ms")
+
+
+def _env() -> Dict[str, str]:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return dict(os.environ, PYTHONPATH=os.pathsep.join(
+        filter(None, [os.path.join(root, "src"), os.environ.get("PYTHONPATH")])
+    ))
+
+
+def parse_importtime(text: str) -> List[Tuple[str, int, int]]:
+    """Parse `-X importtime` output into (module, self µs, cumulative µs) rows."""
+    rows = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        rows.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    return rows
+
+
+def measure_import(module: str = MODULE) -> List[Tuple[str, int, int]]:
+    """Import `module` in a fresh interpreter and return its importtime rows."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=_env(), capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(process.stderr)
+
+
+def _send(process: subprocess.Popen, message: Dict[str, Any]) -> None:
+    process.stdin.write(json.dumps(message) + "\n")
+    process.stdin.flush()
+
+
+def _receive(process: subprocess.Popen, request_id: int) -> Dict[str, Any]:
+    for line in process.stdout:
+        message = json.loads(line)
+        if message.get("id") == request_id:
+            if "error" in message:
+                raise RuntimeError(f"server error: {message['error']}")
+            return message["result"]
+    raise RuntimeError("server exited before answering")
+
+
+def measure_handshake(timeout: float = 30.0) -> Dict[str, Any]:
+    """
+    Start the stdio server and time `initialize` and `tools/list`, in
+    milliseconds from spawning the process.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", MODULE],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        env=_env(), text=True,
+    )
+    try:
+        _send(process, {
+            "jsonrpc": "2.0", "id": 1, "method": "initialize",
+            "params": {
+                "protocolVersion": PROTOCOL_VERSION,
+                "capabilities": {},
+                "clientInfo": {"name": "bench_startup", "version": "0"},
+            },
+        })
+        _receive(process, 1)
+        initialized = time.perf_counter()
+        _send(process, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+        _send(process, {"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+        tools = _receive(process, 2)["tools"]
+        listed = time.perf_counter()
+    finally:
+        process.stdin.close()
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    return {
+        "initialize_ms": round((initialized - start) * 1000, 1),
+        "tools_list_ms": round((listed - start) * 1000, 1),
+        "tools": len(tools),
+    }
+
+
+def run_benchmark(runs: int, slowest: int = 10) -> Dict[str, Any]:
+    """Measure import and handshake times `runs` times and report the medians."""
+    imports = [measure_import() for _ in range(runs)]
+    handshakes = [measure_handshake() for _ in range(runs)]
+    totals = [
+        next(cumulative for name, _, cumulative in rows if name == MODULE) / 1000
+        for rows in imports
+    ]
+    last = sorted(imports[-1], key=lambda row: -row[1])[:slowest]
+    return {
+        "benchmark": "startup",
+        "python": platform.python_version(),
+        "runs": runs,
+        "import_ms": round(statistics.median(totals), 1),
+        "initialize_ms": statistics.median(h["initialize_ms"] for h in handshakes),
+        "tools_list_ms": statistics.median(h["tools_list_ms"] for h in handshakes),
+        "tools": handshakes[-1]["tools"],
+        "slowest_imports": [
+            {
+                "module": name,
+                "self_ms": round(own / 1000, 1),
+                "cumulative_ms": round(total / 1000, 1),
+            }
+            for name, own, total in last
+        ],
+    }
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """Return one message per figure that is slower than the baseline by more than `threshold`."""
+    return [
+        f"{metric}: {baseline[metric]} -> {results[metric]}"
+        for metric in METRICS
+        if metric in baseline and results[metric] > baseline[metric] * (1 + threshold)
+    ]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the stdio server cold start")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="JSON results of an earlier run")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2,
+        help="allowed relative regression against the baseline",
+    )
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.runs)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""
+Microbenchmark the offline article stores.
+
+Builds the SQLite OfflineStore and block stores with several codecs, block
+sizes and dictionary sizes from the same articles, either an existing
+offline store or a synthetic corpus from `benchmarks.mock_mediawiki`. Then
+reports, per store, the file size, the compression ratio of the article data
+and the p50/p99 latency of `get` for random titles, as JSON. Given a
+baseline file from an earlier run, exits with status 1 when a figure
+regresses by more than the threshold.
+
+Usage:
+    python -m benchmarks.bench_store --corpus-size 50000 --output store.json
+    python -m benchmarks.bench_store --store wiki.sqlite3 --lookups 20000
+    python -m benchmarks.bench_store --baseline store.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from benchmarks.mock_mediawiki import generate_corpus
+from wikipedia_assistant.block_store import BlockStore, build
+from wikipedia_assistant.offline_store import OfflineStore
+
+# (name, codec, block size, dictionary size) of the block stores to compare.
+CONFIGS: Tuple[Tuple[str, str, int, int], ...] = (
+    ("zlib-4k", "zlib", 4096, 0),
+    ("zlib-4k-dict", "zlib", 4096, 32768),
+    ("zlib-16k", "zlib", 16384, 0),
+    ("zlib-16k-dict", "zlib", 16384, 32768),
+    ("zlib-64k", "zlib", 65536, 0),
+    ("zstd-4k-dict", "zstd", 4096, 65536),
+    ("zstd-16k-dict", "zstd", 16384, 65536),
+)
+
+# Figures compared against a baseline; higher is worse for all of them.
+METRICS = ("file_bytes", "lookup_p50_us", "lookup_p99_us")
+
+
+def _have_zstd() -> bool:
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def make_store(path: str, size: int, seed: int = 0) -> OfflineStore:
+    """Write a synthetic corpus into a new OfflineStore at `path`."""
+    store = OfflineStore(path)
+    articles = []
+    for record in generate_corpus(size, seed):
+        article = {"title": record["title"], "summary": record["extract"], "revision": 1}
+        if record.get("disambiguation"):
+            article["options"] = record["links"]
+        articles.append(article)
+    store.write_batch(articles, [])
+    return store
+
+
+def time_lookups(store: Any, titles: Sequence[str]) -> Dict[str, float]:
+    """Time `store.get` for each title and return p50/p99 in microseconds."""
+    samples = np.empty(len(titles))
+    get = store.get
+    for i, title in enumerate(titles):
+        start = time.perf_counter()
+        get(title)
+        samples[i] = time.perf_counter() - start
+    return {
+        "lookup_p50_us": round(float(np.percentile(samples, 50)) * 1e6, 1),
+        "lookup_p99_us": round(float(np.percentile(samples, 99)) * 1e6, 1),
+    }
+
+
+def run_benchmark(
+    store: OfflineStore, directory: str, lookups: int, seed: int = 0
+) -> Dict[str, Any]:
+    """Pack `store` in every configuration and measure each result."""
+    titles = [title for title, _ in store.iter_articles()]
+    queries = random.Random(seed).choices(titles, k=lookups)
+    raw_bytes = sum(
+        len(title.encode("utf-8")) + len(summary.encode("utf-8"))
+        for title, summary in store.iter_articles()
+    )
+    # Recent writes may still sit in the write-ahead log next to the database.
+    sqlite_bytes = sum(
+        os.path.getsize(path)
+        for path in (store.path, store.path + "-wal")
+        if os.path.exists(path)
+    )
+    results: Dict[str, Any] = {
+        "sqlite": dict(file_bytes=sqlite_bytes, **time_lookups(store, queries)),
+    }
+    for name, codec, block_size, dictionary_size in CONFIGS:
+        if codec == "zstd" and not _have_zstd():
+            continue
+        path = os.path.join(directory, f"{name}.blocks")
+        start = time.perf_counter()
+        build(
+            store.iter_records(), store.iter_redirects(), path,
+            codec=codec, block_size=block_size, dictionary_size=dictionary_size,
+        )
+        build_seconds = time.perf_counter() - start
+        blocks = BlockStore(path)
+        try:
+            results[name] = dict(
+                file_bytes=os.path.getsize(path),
+                compression_ratio=round(
+                    blocks.footer["raw_bytes"] / blocks.footer["sections"]["blocks"][1], 2
+                ),
+                build_seconds=round(build_seconds, 2),
+                **time_lookups(blocks, queries),
+            )
+        finally:
+            blocks.close()
+    return {
+        "benchmark": "store",
+        "python": platform.python_version(),
+        "articles": len(titles),
+        "raw_bytes": raw_bytes,
+        "lookups": lookups,
+        "stores": results,
+    }
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """
+    Return one message per store figure that is worse than the baseline by
+    more than `threshold`.
+    """
+    messages = []
+    for name, figures in results["stores"].items():
+        before = baseline.get("stores", {}).get(name, {})
+        for metric in METRICS:
+            if metric in before and figures[metric] > before[metric] * (1 + threshold):
+                messages.append(f"{name} {metric}: {before[metric]} -> {figures[metric]}")
+    return messages
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the offline article stores")
+    parser.add_argument("--store", help="offline store to pack instead of a synthetic corpus")
+    parser.add_argument("--corpus-size", type=int, default=20000)
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="JSON results of an earlier run")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2,
+        help="allowed relative regression against the baseline",
+    )
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.store:
+            store = OfflineStore(args.store, readonly=True)
+        else:
+            store = make_store(os.path.join(directory, "wiki.sqlite3"), args.corpus_size, args.seed)
+        try:
+            results = run_benchmark(store, directory, args.lookups, args.seed)
+        finally:
+            store.close()
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Microbenchmark typo-tolerant title resolution.
+
+Builds a title index from an all-titles file or from synthetic titles, then
+times `TitleIndex.resolve` for exact titles, titles with one typo and
+titles with two typos, plus the first typo resolved after opening the index,
+and reports p50/p99 latency per kind as JSON. Given a baseline file from an
+earlier run, exits with status 1 when a figure regresses by more than the
+threshold.
+
+Usage:
+    python -m benchmarks.bench_titles --titles 200000 --output titles.json
+    python -m benchmarks.bench_titles --all-titles enwiki-latest-all-titles-in-ns0.gz
+    python -m benchmarks.bench_titles --baseline titles.json --threshold 0.2
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from wikipedia_assistant.title_index import TitleIndex, build, read_titles
+
+# Synthetic words are made of these syllables, so many are near each other,
+# as in real titles.
+_SYLLABLES = (
+    "al an ber cu de el field gar ham ing ka la lin man mer ne ni por py ri ry "
+    "son sta ster thon to ton tur vo wood"
+).split()
+_LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+# Figures compared against a baseline; higher is worse for all of them.
+METRICS = ("p50_us", "p99_us")
+
+
+def make_titles(count: int, seed: int = 0) -> List[str]:
+    """Build `count` distinct titles of one to four words with Zipf-like word use."""
+    rng = random.Random(seed)
+    vocabulary = sorted({
+        "".join(rng.choices(_SYLLABLES, k=rng.choice((1, 2, 2, 3, 3, 4))))
+        for _ in range(max(count // 2, 10))
+    })
+    rng.shuffle(vocabulary)
+    weights = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+    titles = set()
+    while len(titles) < count:
+        words = rng.choices(vocabulary, cum_weights=weights, k=rng.choice((1, 2, 2, 3, 3, 4)))
+        titles.add(" ".join(word.capitalize() for word in words))
+    return sorted(titles)
+
+
+def add_typos(title: str, typos: int, rng: random.Random) -> str:
+    """Delete, insert or substitute `typos` letters of `title`, or swap two."""
+    for _ in range(typos):
+        i = rng.randrange(len(title))
+        kind = rng.randrange(4)
+        if kind == 0 and len(title) > 1:
+            title = title[:i] + title[i + 1:]
+        elif kind == 1:
+            title = title[:i] + rng.choice(_LETTERS) + title[i:]
+        elif kind == 2:
+            title = title[:i] + rng.choice(_LETTERS) + title[i + 1:]
+        elif i + 1 < len(title):
+            title = title[:i] + title[i + 1] + title[i] + title[i + 2:]
+    return title
+
+
+def time_resolve(index: TitleIndex, queries: Sequence[str]) -> Dict[str, float]:
+    """Time `index.resolve` for each query and return p50/p99 in microseconds."""
+    samples = np.empty(len(queries))
+    resolve = index.resolve
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        resolve(query)
+        samples[i] = time.perf_counter() - start
+    return {
+        "p50_us": round(float(np.percentile(samples, 50)) * 1e6, 1),
+        "p99_us": round(float(np.percentile(samples, 99)) * 1e6, 1),
+    }
+
+
+def run_benchmark(
+    titles: Sequence[str], directory: str, lookups: int, seed: int = 0
+) -> Dict[str, Any]:
+    """Index `titles` and time each kind of query against the index."""
+    path = os.path.join(directory, "titles.idx")
+    start = time.perf_counter()
+    count = build(titles, path)
+    build_seconds = time.perf_counter() - start
+
+    rng = random.Random(seed)
+    # Typos in very short titles are not corrected.
+    long_titles = [title for title in titles if len(title) >= 6] or list(titles)
+    queries = {
+        "exact": rng.choices(titles, k=lookups),
+        "one_typo": [add_typos(t, 1, rng) for t in rng.choices(long_titles, k=lookups)],
+        "two_typos": [add_typos(t, 2, rng) for t in rng.choices(long_titles, k=lookups)],
+    }
+    index = TitleIndex(path)
+    try:
+        start = time.perf_counter()
+        index.resolve(queries["one_typo"][0])
+        first_us = (time.perf_counter() - start) * 1e6
+        kinds = {kind: time_resolve(index, batch) for kind, batch in queries.items()}
+    finally:
+        index.close()
+    return {
+        "benchmark": "titles",
+        "python": platform.python_version(),
+        "titles": count,
+        "file_bytes": os.path.getsize(path),
+        "build_seconds": round(build_seconds, 2),
+        "lookups": lookups,
+        "first_typo_us": round(first_us, 1),
+        "kinds": kinds,
+    }
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """
+    Return one message per latency figure that is worse than the baseline by
+    more than `threshold`.
+    """
+    messages = []
+    for kind, figures in results["kinds"].items():
+        before = baseline.get("kinds", {}).get(kind, {})
+        for metric in METRICS:
+            if metric in before and figures[metric] > before[metric] * (1 + threshold):
+                messages.append(f"{kind} {metric}: {before[metric]} -> {figures[metric]}")
+    return messages
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark typo-tolerant title resolution")
+    parser.add_argument("--all-titles", help="all-titles file to index instead of synthetic titles")
+    parser.add_argument("--titles", type=int, default=200000, help="synthetic titles")
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="JSON results of an earlier run")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2,
+        help="allowed relative regression against the baseline",
+    )
+    args = parser.parse_args(argv)
+
+    if args.all_titles:
+        titles = list(read_titles(args.all_titles))
+    else:
+        titles = make_titles(args.titles, args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        results = run_benchmark(titles, directory, args.lookups, args.seed)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
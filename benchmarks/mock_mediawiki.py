@@ -0,0 +1,205 @@
+"""
+Local stand-in for the MediaWiki action API, used by the benchmarks.
+
+Serves a fixed article corpus with the parts of the API the client uses:
+generator/list search, multi-title page queries with extracts, URLs and
+disambiguation flags, and page links. The corpus is a JSON list of
+`{"title", "extract", "disambiguation", "links", "redirects"}` records, such
+as responses recorded from the real API; without one a deterministic corpus
+is generated. Every request can be delayed and can fail with a configurable
+probability, to mimic a slow or overloaded upstream.
+
+Usage:
+    python -m benchmarks.mock_mediawiki --port 8765 --latency-ms 20 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+# Articles are generated as "<Word> <kind>" pages, plus one disambiguation
+# page per word that links to them.
+_WORDS = (
+    "amber basalt cedar delta ember falcon garnet harbor indigo jasper kestrel "
+    "lagoon marble nebula onyx prairie quartz raven sierra tundra umber valley "
+    "willow xenon yarrow zephyr"
+).split()
+_KINDS = (
+    "river mountain city album novel company ship engine theorem festival "
+    "species language dynasty satellite railway"
+).split()
+_TOKEN = re.compile(r"\w+")
+
+
+def generate_corpus(size: int = 2000, seed: int = 0) -> List[Dict[str, Any]]:
+    """Build a deterministic corpus of about `size` articles."""
+    rng = random.Random(seed)
+    corpus: List[Dict[str, Any]] = []
+    by_word = defaultdict(list)
+    while len(corpus) < size:
+        word, kind = rng.choice(_WORDS), rng.choice(_KINDS)
+        title = f"{word.capitalize()} {kind} {len(corpus)}"
+        sentences = [
+            f"{title} is a {kind} named after the {word}.",
+            *(
+                " ".join(rng.choice(_WORDS + _KINDS) for _ in range(rng.randint(8, 20)))
+                .capitalize() + "."
+                for _ in range(rng.randint(2, 8))
+            ),
+        ]
+        corpus.append({"title": title, "extract": " ".join(sentences)})
+        by_word[word].append(title)
+    for word, titles in sorted(by_word.items()):
+        corpus.append({
+            "title": word.capitalize(),
+            "extract": f"{word.capitalize()} may refer to:",
+            "disambiguation": True,
+            "links": titles[:20],
+        })
+    return corpus
+
+
+class MockMediaWiki:
+    """In-memory article set with a tiny term index for search."""
+
+    def __init__(self, corpus: List[Dict[str, Any]], lang: str = "en"):
+        self.lang = lang
+        self.pages: Dict[str, Dict[str, Any]] = {}
+        self.redirects: Dict[str, str] = {}
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        for pageid, record in enumerate(corpus, start=1):
+            page = dict(record, pageid=pageid)
+            self.pages[record["title"]] = page
+            for alias in record.get("redirects", []):
+                self.redirects[alias] = record["title"]
+            for term in set(_TOKEN.findall(record["title"].lower())):
+                self._postings[term].append(pageid)
+        self._titles = {page["pageid"]: title for title, page in self.pages.items()}
+
+    def search(self, query: str, limit: int) -> List[str]:
+        scores: Dict[int, int] = defaultdict(int)
+        for term in set(_TOKEN.findall(query.lower())):
+            for pageid in self._postings.get(term, ()):
+                scores[pageid] += 1
+        best = sorted(scores, key=lambda pageid: (-scores[pageid], pageid))[:limit]
+        return [self._titles[pageid] for pageid in best]
+
+    def url(self, title: str) -> str:
+        return f"https://{self.lang}.wikipedia.org/wiki/{title.replace(' ', '_')}"
+
+    def respond(self, params: Dict[str, str]) -> Dict[str, Any]:
+        if params.get("list") == "search":
+            hits = self.search(params["srsearch"], int(params.get("srlimit", 10)))
+            return {"query": {"search": [{"title": t} for t in hits]}}
+        if params.get("generator") == "search":
+            hits = self.search(params["gsrsearch"], int(params.get("gsrlimit", 10)))
+            return self.pages_response(hits, params, ranked=True)
+        if "titles" in params:
+            return self.pages_response(params["titles"].split("|"), params)
+        return {"error": {"code": "badparams", "info": "Unsupported request"}}
+
+    def pages_response(
+        self, titles: List[str], params: Dict[str, str], ranked: bool = False
+    ) -> Dict[str, Any]:
+        props = set(params.get("prop", "").split("|"))
+        pages = []
+        redirects = []
+        for index, requested in enumerate(titles, start=1):
+            title = self.redirects.get(requested, requested)
+            if title != requested:
+                redirects.append({"from": requested, "to": title})
+            page = self.pages.get(title)
+            if page is None:
+                pages.append({"ns": 0, "title": title, "missing": True})
+                continue
+            entry: Dict[str, Any] = {"pageid": page["pageid"], "ns": 0, "title": title}
+            if ranked:
+                entry["index"] = index
+            if "extracts" in props:
+                entry["extract"] = page["extract"]
+            if "info" in props:
+                entry["fullurl"] = self.url(title)
+            if "pageprops" in props and page.get("disambiguation"):
+                entry["pageprops"] = {"disambiguation": ""}
+            if "links" in props:
+                entry["links"] = [{"ns": 0, "title": t} for t in page.get("links", [])]
+            pages.append(entry)
+        if not pages:
+            return {"batchcomplete": True}
+        query: Dict[str, Any] = {"pages": pages}
+        if redirects:
+            query["redirects"] = redirects
+        return {"batchcomplete": True, "query": query}
+
+
+def create_app(
+    wiki: MockMediaWiki,
+    *,
+    latency_ms: float = 0.0,
+    jitter_ms: float = 0.0,
+    error_rate: float = 0.0,
+    error_status: int = 503,
+    seed: Optional[int] = None,
+) -> Starlette:
+    """
+    Serve `wiki` at /w/api.php.
+
+    Each request sleeps for `latency_ms` plus up to `jitter_ms`, then fails
+    with `error_status` (and `Retry-After: 0`) with probability `error_rate`.
+    """
+    rng = random.Random(seed)
+
+    async def api(request: Request) -> Response:
+        delay = latency_ms + rng.uniform(0, jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if rng.random() < error_rate:
+            return Response(status_code=error_status, headers={"Retry-After": "0"})
+        return JSONResponse(wiki.respond(dict(request.query_params)))
+
+    return Starlette(routes=[Route("/w/api.php", api)])
+
+
+def load_corpus(path: Optional[str], size: int = 2000) -> List[Dict[str, Any]]:
+    if path is None:
+        return generate_corpus(size)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Mock MediaWiki API for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--corpus", help="JSON list of recorded articles")
+    parser.add_argument("--corpus-size", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    app = create_app(
+        MockMediaWiki(load_corpus(args.corpus, args.corpus_size)),
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
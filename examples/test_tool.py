@@ -5,6 +5,7 @@ Test script to demonstrate the fetch_wikipedia_info tool functionality.
 This script shows how the Wikipedia Research Assistant works with various queries.
 """
 
+import asyncio
 import sys
 import os
 import json
@@ -14,12 +15,12 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from wikipedia_assistant.server import fetch_wikipedia_info
 
-def test_query(query: str):
+async def test_query(query: str):
     """Test a single query and display results."""
     print(f"🔍 Searching for: '{query}'")
     print("-" * 50)
     
-    result = fetch_wikipedia_info(query)
+    result = await fetch_wikipedia_info(query)
     
     if "error" in result:
         print(f"❌ Error: {result['error']}")
@@ -31,7 +32,7 @@ def test_query(query: str):
     
     print("\n" + "=" * 60 + "\n")
 
-def main():
+async def main():
     """Run demonstration queries."""
     print("🎯 Wikipedia Research Assistant - Tool Demonstration")
     print("Following the Educative Course Implementation")
@@ -49,10 +50,10 @@ def main():
     ]
     
     for query in test_queries:
-        test_query(query)
+        await test_query(query)
     
     print("✅ Demonstration complete!")
     print("💡 The fetch_wikipedia_info tool is working correctly and ready for MCP integration.")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    asyncio.run(main()) 
\ No newline at end of file
@@ -9,8 +9,9 @@ setup(
     packages=find_packages(where="src"),
     package_dir={"": "src"},
     install_requires=[
-        "wikipedia>=1.4.0",
         "mcp>=0.1.0",
+        "httpx>=0.28.0",
+        "numpy>=1.24.0",
     ],
     extras_require={
         "dev": [
@@ -19,12 +20,20 @@ setup(
             "black>=22.0.0",
             "flake8>=5.0.0",
             "mypy>=1.0.0",
-        ]
+        ],
+        "zstd": ["zstandard>=0.21.0"],
     },
     python_requires=">=3.8",
     entry_points={
         "console_scripts": [
-            "wikipedia-assistant=wikipedia_assistant.server:main",
+            "wikipedia-assistant=wikipedia_assistant.cli:main",
+            "wikipedia-assistant-ingest=wikipedia_assistant.dump:main",
+            "wikipedia-assistant-index=wikipedia_assistant.search_index:main",
+            "wikipedia-assistant-daemon=wikipedia_assistant.daemon:main",
+            "wikipedia-assistant-update=wikipedia_assistant.recentchanges:main",
+            "wikipedia-assistant-pack=wikipedia_assistant.block_store:main",
+            "wikipedia-assistant-vectors=wikipedia_assistant.vector_index:main",
+            "wikipedia-assistant-titles=wikipedia_assistant.title_index:main",
         ],
     },
 ) 
\ No newline at end of file
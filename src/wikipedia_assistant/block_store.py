@@ -0,0 +1,444 @@
+"""
+Read-only article store of compressed blocks in a memory-mapped file.
+
+Holds the same data as the SQLite OfflineStore (title, lead section,
+disambiguation options and redirects) at a fraction of its size. Articles are
+sorted by lookup key and packed into blocks of about `block_size` bytes, each
+compressed on its own with zlib or zstd, optionally against a shared
+dictionary trained on a sample of the articles. Reading one article
+decompresses only its block.
+
+The index is a set of fixed-width arrays read straight from the map: sorted
+lookup keys with their offsets, the first article id of each block and the
+block offsets, plus the redirect keys and the article id each one points at.
+A title is found by binary search over the keys, so opening the store reads
+nothing but the footer, and worker processes that open the same file share
+its pages through the OS page cache.
+
+File layout: the magic bytes, the dictionary and block data, then the index
+arrays, each aligned to 8 bytes, and finally a JSON footer with the section
+offsets followed by its length and the magic bytes again. Inside a block, a
+record count and record end offsets (uint32) precede the records, each
+`title NUL summary NUL options-JSON`.
+
+Usage:
+    python -m wikipedia_assistant.block_store --store wiki.sqlite3 --output wiki.blocks
+"""
+import argparse
+import bisect
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import zlib
+from collections import Counter
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Literal, Optional, Sequence, Tuple
+
+from wikipedia_assistant.offline_store import ArticleLookups, normalize_title, title_url
+
+MAGIC = b"WRABLKS\x01"
+
+CODECS = ("zlib", "zstd")
+DEFAULT_BLOCK_SIZE = 4096
+# zlib only looks back 32 KiB, so a longer preset dictionary is never used.
+MAX_ZLIB_DICTIONARY = 32768
+# Records sampled from the start of the input to train the dictionary.
+DICTIONARY_SAMPLE_BYTES = 4 * 1024 * 1024
+
+_WORD = re.compile(rb"\S+\s")
+
+
+def is_block_store(path: str) -> bool:
+    """Return whether `path` starts with the block store magic bytes."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _zstandard():
+    try:
+        import zstandard  # type: ignore[import-not-found]
+    except ImportError:
+        raise RuntimeError(
+            "The zstd codec needs the zstandard package: "
+            "pip install 'wikipedia-research-assistant[zstd]'"
+        ) from None
+    return zstandard
+
+
+def _encode_record(article: Dict[str, Any]) -> bytes:
+    options = json.dumps(article["options"]) if article.get("options") else ""
+    return "\0".join((article["title"], article["summary"], options)).encode("utf-8")
+
+
+def _pack_block(records: Sequence[bytes]) -> bytes:
+    ends = []
+    end = 0
+    for record in records:
+        end += len(record)
+        ends.append(end)
+    return struct.pack(f"<{len(ends) + 1}I", len(ends), *ends) + b"".join(records)
+
+
+def train_dictionary(samples: Sequence[bytes], size: int, codec: str = "zlib") -> bytes:
+    """
+    Build a compression dictionary of at most `size` bytes from sample records.
+
+    zstd trains one with its own trainer. For zlib, which uses the dictionary
+    as preceding text, the dictionary is made of the words that save the most
+    bytes (count times length), with the most valuable ones last, closest to
+    the data.
+    """
+    if codec == "zstd":
+        zstandard = _zstandard()
+        return zstandard.train_dictionary(size, list(samples)).as_bytes()
+    size = min(size, MAX_ZLIB_DICTIONARY)
+    counts = Counter(word for sample in samples for word in _WORD.findall(sample))
+    chosen: List[bytes] = []
+    total = 0
+    for word, count in sorted(counts.items(), key=lambda item: -item[1] * len(item[0])):
+        if count < 2 or total + len(word) > size:
+            break
+        chosen.append(word)
+        total += len(word)
+    return b"".join(reversed(chosen))
+
+
+class _Compressor:
+    def __init__(self, codec: str, level: Optional[int], dictionary: bytes):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec: {codec!r}")
+        self.codec = codec
+        self.level = level
+        self.dictionary = dictionary
+        if codec == "zstd":
+            zstandard = _zstandard()
+            self._zstd = zstandard.ZstdCompressor(
+                level=3 if level is None else level,
+                dict_data=zstandard.ZstdCompressionDict(dictionary) if dictionary else None,
+            )
+
+    def compress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return self._zstd.compress(data)
+        level = 9 if self.level is None else self.level
+        if self.dictionary:
+            compressor = zlib.compressobj(level, zdict=self.dictionary)
+        else:
+            compressor = zlib.compressobj(level)
+        return compressor.compress(data) + compressor.flush()
+
+
+def _decompressor(codec: str, dictionary: bytes):
+    if codec == "zstd":
+        zstandard = _zstandard()
+        decompressor = zstandard.ZstdDecompressor(
+            dict_data=zstandard.ZstdCompressionDict(dictionary) if dictionary else None,
+        )
+        return decompressor.decompress
+    if dictionary:
+        return lambda data: zlib.decompressobj(zdict=dictionary).decompress(data)
+    return zlib.decompress
+
+
+class _Writer:
+    """Writes a block store section by section."""
+
+    def __init__(self, path: str, compressor: _Compressor, block_size: int):
+        self._file: BinaryIO = open(path, "wb")
+        self._file.write(MAGIC)
+        self._compressor = compressor
+        self._block_size = block_size
+        self._sections: Dict[str, Tuple[int, int]] = {}
+        self._section("dictionary", compressor.dictionary)
+        self._file.write(b"\0" * (-self._file.tell() % 8))
+        self._blocks_start = self._file.tell()
+        self._block_offsets: List[int] = [0]
+        self._block_first: List[int] = [0]
+        self._pending: List[bytes] = []
+        self._pending_bytes = 0
+        self.keys: List[bytes] = []
+        self.raw_bytes = 0
+
+    def add(self, key: bytes, record: bytes) -> None:
+        self.keys.append(key)
+        self._pending.append(record)
+        self._pending_bytes += len(record)
+        if self._pending_bytes >= self._block_size:
+            self._flush_block()
+
+    def _flush_block(self) -> None:
+        if not self._pending:
+            return
+        payload = _pack_block(self._pending)
+        self.raw_bytes += len(payload)
+        self._file.write(self._compressor.compress(payload))
+        self._block_offsets.append(self._file.tell() - self._blocks_start)
+        self._block_first.append(len(self.keys))
+        self._pending = []
+        self._pending_bytes = 0
+
+    def _section(self, name: str, data: bytes) -> None:
+        self._file.write(b"\0" * (-self._file.tell() % 8))
+        self._sections[name] = (self._file.tell(), len(data))
+        self._file.write(data)
+
+    def _strings(self, name: str, values: Sequence[bytes]) -> None:
+        offsets = [0]
+        for value in values:
+            offsets.append(offsets[-1] + len(value))
+        self._section(f"{name}_offsets", struct.pack(f"<{len(offsets)}Q", *offsets))
+        self._section(name, b"".join(values))
+
+    def finish(self, redirects: Sequence[Tuple[bytes, int]], meta: Dict[str, Any]) -> None:
+        self._flush_block()
+        self._sections["blocks"] = (
+            self._blocks_start,
+            self._file.tell() - self._blocks_start,
+        )
+        offsets, first = self._block_offsets, self._block_first
+        self._section("block_offsets", struct.pack(f"<{len(offsets)}Q", *offsets))
+        self._section("block_first", struct.pack(f"<{len(first)}I", *first))
+        self._strings("keys", self.keys)
+        self._strings("redirect_keys", [key for key, _ in redirects])
+        targets = [target for _, target in redirects]
+        self._section("redirect_targets", struct.pack(f"<{len(targets)}I", *targets))
+        footer = json.dumps(dict(
+            meta,
+            codec=self._compressor.codec,
+            article_count=len(self.keys),
+            redirect_count=len(redirects),
+            block_count=len(offsets) - 1,
+            raw_bytes=self.raw_bytes,
+            sections=self._sections,
+        )).encode("utf-8")
+        self._file.write(footer)
+        self._file.write(struct.pack("<Q", len(footer)) + MAGIC)
+        self._file.close()
+
+
+def build(
+    articles: Iterable[Dict[str, Any]],
+    redirects: Iterable[Tuple[str, str]],
+    output: str,
+    *,
+    base_url: str = "https://en.wikipedia.org/wiki/",
+    lang: str = "en",
+    codec: str = "zlib",
+    level: Optional[int] = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    dictionary_size: int = 0,
+) -> int:
+    """
+    Write a block store and return the number of articles in it.
+
+    `articles` are dicts with `title`, `summary` and optional `options`,
+    ordered by their `normalize_title` key, as `OfflineStore.iter_records`
+    yields them; `redirects` are (title or key, target title) pairs in any
+    order. Redirects whose target is missing, and those shadowed by an article
+    of the same key, are dropped. With `dictionary_size`, a dictionary of up
+    to that many bytes is trained on the first few megabytes of articles.
+    """
+    articles = iter(articles)
+    sample: List[Dict[str, Any]] = []
+    dictionary = b""
+    if dictionary_size:
+        sampled = 0
+        for article in articles:
+            sample.append(article)
+            sampled += len(article["summary"])
+            if sampled >= DICTIONARY_SAMPLE_BYTES:
+                break
+        dictionary = train_dictionary(
+            [_encode_record(a) for a in sample], dictionary_size, codec
+        )
+
+    writer = _Writer(output, _Compressor(codec, level, dictionary), block_size)
+    previous = b""
+    for article in (*sample, *articles) if sample else articles:
+        key = normalize_title(article["title"]).encode("utf-8")
+        if key <= previous and writer.keys:
+            raise ValueError(f"Articles are not ordered by key at {article['title']!r}")
+        previous = key
+        writer.add(key, _encode_record(article))
+
+    keys = writer.keys
+    resolved: Dict[bytes, int] = {}
+    for title, target in redirects:
+        key = normalize_title(title).encode("utf-8")
+        target_key = normalize_title(target).encode("utf-8")
+        index = bisect.bisect_left(keys, target_key)
+        if index < len(keys) and keys[index] == target_key:
+            at = bisect.bisect_left(keys, key)
+            if at == len(keys) or keys[at] != key:
+                resolved[key] = index
+    writer.finish(sorted(resolved.items()), {"base_url": base_url, "lang": lang})
+    return len(keys)
+
+
+class _Strings(Sequence):
+    """Sorted byte strings stored as an offsets array and their data."""
+
+    def __init__(self, mm: mmap.mmap, offsets: memoryview, start: int):
+        self._mm = mm
+        self._offsets = offsets
+        self._start = start
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        start = self._start + self._offsets[index]
+        return self._mm[start:self._start + self._offsets[index + 1]]
+
+    def find(self, value: bytes) -> Optional[int]:
+        index = bisect.bisect_left(self, value)
+        if index < len(self) and self[index] == value:
+            return index
+        return None
+
+
+class BlockStore(ArticleLookups):
+    """
+    Read-only, memory-mapped block store with the lookups of OfflineStore.
+
+    Safe to share between threads; lookups only read the map.
+    """
+
+    def __init__(self, path: str, *, search_index: Any = None, title_index: Any = None):
+        self.path = path
+        # Optional SearchIndex used when a query is not an exact title.
+        self.search_index = search_index
+        # Optional TitleIndex that corrects typos in titles first.
+        self.title_index = title_index
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != MAGIC or self._mm[-8:] != MAGIC:
+            raise ValueError(f"{path} is not a block store")
+        (footer_len,) = struct.unpack("<Q", self._mm[-16:-8])
+        self.footer: Dict[str, Any] = json.loads(self._mm[-16 - footer_len:-16])
+        self.base_url: str = self.footer["base_url"]
+        self.lang: str = self.footer["lang"]
+        sections = self.footer["sections"]
+
+        self._view = memoryview(self._mm)
+        self._block_offsets = self._array(sections["block_offsets"], "Q")
+        self._block_first = self._array(sections["block_first"], "I")
+        self._redirect_targets = self._array(sections["redirect_targets"], "I")
+        self._keys = _Strings(
+            self._mm, self._array(sections["keys_offsets"], "Q"), sections["keys"][0]
+        )
+        self._redirect_keys = _Strings(
+            self._mm,
+            self._array(sections["redirect_keys_offsets"], "Q"),
+            sections["redirect_keys"][0],
+        )
+        self._blocks_start = sections["blocks"][0]
+        start, length = sections["dictionary"]
+        self._decompress = _decompressor(self.footer["codec"], self._mm[start:start + length])
+
+    def _array(self, section: Sequence[int], fmt: Literal["I", "Q"]) -> memoryview:
+        offset, length = section
+        return self._view[offset:offset + length].cast(fmt)
+
+    def close(self) -> None:
+        for name in (
+            "_block_offsets", "_block_first", "_redirect_targets", "_keys", "_redirect_keys"
+        ):
+            value = getattr(self, name)
+            (value._offsets if isinstance(value, _Strings) else value).release()
+        self._view.release()
+        self._mm.close()
+
+    async def aclose(self) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.footer["article_count"]
+
+    def _block(self, block: int) -> bytes:
+        start = self._blocks_start + self._block_offsets[block]
+        end = self._blocks_start + self._block_offsets[block + 1]
+        return self._decompress(self._view[start:end])
+
+    def article(self, article_id: int) -> Dict[str, Any]:
+        """Return the article with id `article_id`, its position in key order."""
+        block = bisect.bisect_right(self._block_first, article_id) - 1
+        payload = self._block(block)
+        slot = article_id - self._block_first[block]
+        (count,) = struct.unpack_from("<I", payload)
+        ends = struct.unpack_from(f"<{count}I", payload, 4)
+        base = 4 + 4 * count
+        start = base + (ends[slot - 1] if slot else 0)
+        title, summary, options = (
+            payload[start:base + ends[slot]].decode("utf-8").split("\0")
+        )
+        article = {"title": title, "summary": summary, "url": title_url(self.base_url, title)}
+        if options:
+            article["options"] = json.loads(options)
+        return article
+
+    def get(self, title: str) -> Optional[Dict[str, Any]]:
+        """Return the stored article for `title`, following one redirect."""
+        key = normalize_title(title).encode("utf-8")
+        article_id = self._keys.find(key)
+        if article_id is None:
+            redirect = self._redirect_keys.find(key)
+            if redirect is None:
+                return None
+            article_id = self._redirect_targets[redirect]
+        return self.article(article_id)
+
+    def iter_articles(self) -> Iterator[Tuple[str, str]]:
+        """Yield (title, summary) for every article, in key order."""
+        for block in range(self.footer["block_count"]):
+            payload = self._block(block)
+            (count,) = struct.unpack_from("<I", payload)
+            base = start = 4 + 4 * count
+            for end in struct.unpack_from(f"<{count}I", payload, 4):
+                title, summary, _ = payload[start:base + end].decode("utf-8").split("\0")
+                yield title, summary
+                start = base + end
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Pack an offline store into a compressed, memory-mapped block store."
+    )
+    parser.add_argument("--store", required=True, help="offline store to pack")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--codec", choices=CODECS, default="zlib")
+    parser.add_argument("--level", type=int, default=None, help="compression level")
+    parser.add_argument(
+        "--block-size", type=int, default=DEFAULT_BLOCK_SIZE,
+        help="uncompressed bytes per block; smaller is faster to read, larger compresses better",
+    )
+    parser.add_argument(
+        "--dictionary-size", type=int, default=0,
+        help="train a dictionary of this many bytes (0: none)",
+    )
+    args = parser.parse_args(argv)
+
+    from wikipedia_assistant.offline_store import OfflineStore
+
+    store = OfflineStore(args.store, readonly=True)
+    try:
+        count = build(
+            store.iter_records(), store.iter_redirects(), args.output,
+            base_url=store.base_url, lang=store.lang, codec=args.codec,
+            level=args.level, block_size=args.block_size,
+            dictionary_size=args.dictionary_size,
+        )
+    finally:
+        store.close()
+    size = os.path.getsize(args.output)
+    print(f"Packed {count} articles into {args.output} ({size / 1e6:.1f} MB).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
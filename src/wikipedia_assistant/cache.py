@@ -0,0 +1,255 @@
+"""
+Persistent result cache backed by a local SQLite file.
+
+The cache survives server restarts, so a fresh stdio session starts warm. The
+database runs in WAL mode, which lets several server processes read and write
+the same file concurrently. Calls run on the event loop, so writes wait only
+briefly for another process's write lock and are skipped when it stays busy:
+a result that is not cached is simply fetched again later.
+
+Entries can be served stale: for `stale_ttl` seconds past their expiry, and
+from `refresh_ahead` seconds before it, `lookup_json` still returns them but
+flags them for a refresh, so callers can answer at once and refresh in the
+background.
+
+Failed lookups go to a separate, in-memory NegativeCache with a short TTL.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "wikipedia-research-assistant", "results.sqlite3"
+)
+
+# Access times are only rewritten when they are older than this many seconds,
+# so hot keys do not turn every read into a write.
+ACCESS_GRANULARITY = 60.0
+
+# Seconds a write waits for the write lock of another process before it is
+# skipped. Reads never wait in WAL mode.
+BUSY_TIMEOUT = 0.05
+
+# Opening the file may have to wait for a checkpoint; that happens once.
+_OPEN_TIMEOUT = 5.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_accessed_at ON results (accessed_at);
+"""
+
+
+def make_key(query: str, lang: str = "en") -> str:
+    """Normalize a query so that casing and spacing variants share an entry."""
+    return f"{lang}:{' '.join(query.split()).casefold()}"
+
+
+class ResultCache:
+    """
+    Key/value store for tool results with per-entry TTLs and a size cap.
+
+    The size is checked every `max_entries // 100` writes, so the cache can
+    exceed `max_entries` by about 1% in between. When it has grown past the
+    cap, entries past their stale window are dropped first, then the least
+    recently used ones.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        *,
+        ttl: float = 86400.0,
+        max_entries: int = 10000,
+        timeout: float = BUSY_TIMEOUT,
+        stale_ttl: float = 0.0,
+        refresh_ahead: float = 0.0,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.refresh_ahead = refresh_ahead
+        self.max_entries = max_entries
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._trim_interval = max(1, max_entries // 100)
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            path, timeout=_OPEN_TIMEOUT, isolation_level=None, check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._db.execute(f"PRAGMA busy_timeout = {int(timeout * 1000)}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get(self, query: str, lang: str = "en") -> Optional[Dict[str, Any]]:
+        """Return the cached result for `query`, or None if missing or expired."""
+        value = self.get_json(query, lang)
+        return None if value is None else json.loads(value)
+
+    def get_json(self, query: str, lang: str = "en") -> Optional[str]:
+        """Like get(), but return the stored JSON text without decoding it."""
+        now = time.time()
+        row = self._read(make_key(query, lang), now)
+        if row is None or row[1] <= now:
+            return None
+        return row[0]
+
+    def lookup_json(self, query: str, lang: str = "en") -> Tuple[Optional[str], bool]:
+        """
+        Return the stored JSON text for `query`, stale entries included, and
+        whether the entry should be refreshed.
+
+        The text is None for a miss or an entry more than `stale_ttl` seconds
+        past expiry; the flag is True for those and for entries expiring
+        within `refresh_ahead` seconds.
+        """
+        now = time.time()
+        row = self._read(make_key(query, lang), now)
+        if row is None or row[1] + self.stale_ttl <= now:
+            return None, True
+        value, expires_at = row
+        return value, expires_at - self.refresh_ahead <= now
+
+    def _read(self, key: str, now: float) -> Optional[Tuple[str, float]]:
+        """Return the value and expiry of `key`, touching its access time."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, expires_at, accessed_at FROM results WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at, accessed_at = row
+            if expires_at + self.stale_ttl > now and now - accessed_at > ACCESS_GRANULARITY:
+                try:
+                    self._db.execute(
+                        "UPDATE results SET accessed_at = ? WHERE key = ?", (now, key)
+                    )
+                except sqlite3.OperationalError as e:
+                    # The access time is only an eviction hint.
+                    if not _is_busy(e):
+                        raise
+        return value, expires_at
+
+    def set(
+        self,
+        query: str,
+        lang: str,
+        result: Dict[str, Any],
+        ttl: Optional[float] = None,
+    ) -> None:
+        """Store `result` for `query`, evicting old entries past the size cap."""
+        self.set_json(query, lang, json.dumps(result, separators=(",", ":")), ttl)
+
+    def set_json(
+        self, query: str, lang: str, value: str, ttl: Optional[float] = None
+    ) -> None:
+        """
+        Store an already JSON-encoded result for `query`.
+
+        The write is skipped when another process holds the write lock for
+        longer than the busy timeout.
+        """
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                    (make_key(query, lang), value, expires_at, now),
+                )
+                self._writes += 1
+                if self._writes % self._trim_interval == 0:
+                    count = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+                    if count > self.max_entries:
+                        self._evict(count - self.max_entries, now)
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e):
+                    raise
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM results")
+
+    def _evict(self, excess: int, now: float) -> None:
+        """Drop expired entries, then the `excess` least recently used ones."""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            expired = self._db.execute(
+                "DELETE FROM results WHERE expires_at <= ?", (now - self.stale_ttl,)
+            ).rowcount
+            if expired < excess:
+                self._db.execute(
+                    "DELETE FROM results WHERE key IN ("
+                    "SELECT key FROM results ORDER BY accessed_at LIMIT ?)",
+                    (excess - expired,),
+                )
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+
+
+def _is_busy(error: sqlite3.OperationalError) -> bool:
+    """Return whether `error` means another connection holds a lock."""
+    return "locked" in str(error)
+
+
+class NegativeCache:
+    """
+    Short-lived, in-memory cache for failed lookups (no results, missing page).
+
+    It is kept apart from ResultCache so that a stream of junk queries can
+    only evict other failures, never real results. Entries expire after `ttl`
+    seconds; past `max_entries` the least recently used one is dropped.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get(self, query: str, lang: str = "en") -> Optional[Any]:
+        """Return the failure stored for `query`, or None if missing or expired."""
+        key = make_key(query, lang)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, query: str, lang: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store the failure `value` for `query`, dropping the oldest past the cap."""
+        key = make_key(query, lang)
+        self._entries[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
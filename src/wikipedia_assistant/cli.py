@@ -0,0 +1,117 @@
+"""
+Command line of the `wikipedia-assistant` server.
+
+Kept apart from `wikipedia_assistant.server` so that a stdio session in
+daemon mode is handed to the shim before FastMCP, httpx and the backends are
+imported: the shim only relays bytes to the shared daemon, which does the
+heavy imports once.
+"""
+import argparse
+import os
+from typing import Callable, Optional, Sequence
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse the server's command-line arguments."""
+    parser = argparse.ArgumentParser(description="Wikipedia MCP server")
+    parser.add_argument("--backend", choices=["online", "offline"], default=None)
+    parser.add_argument(
+        "--store",
+        help="offline store built from a Wikipedia dump, or a block store packed from one",
+    )
+    parser.add_argument("--search-index", help="local BM25 index for the search step")
+    parser.add_argument("--vector-index", help="local semantic index for semantic search")
+    parser.add_argument(
+        "--title-index", help="local title index that resolves misspelled titles without a search"
+    )
+    parser.add_argument(
+        "--transport", choices=["stdio", "sse", "streamable-http"], default="stdio"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--keep-alive", type=int, default=75,
+        help="seconds an idle HTTP keep-alive connection stays open",
+    )
+    parser.add_argument(
+        "--graceful-timeout", type=int, default=30,
+        help="seconds to let in-flight requests finish on shutdown",
+    )
+    parser.add_argument(
+        "--warm-file",
+        help="title list or pageviews dump of articles to prefetch into the cache",
+    )
+    parser.add_argument(
+        "--warm-limit", type=int, default=None,
+        help="number of titles from --warm-file to prefetch (default 1000)",
+    )
+    parser.add_argument(
+        "--daemon", action="store_true",
+        help="stdio only: relay the session to a shared backend daemon, starting it if needed",
+    )
+    parser.add_argument(
+        "--metrics", action="store_true",
+        help="record request-path metrics (see the metrics resource and /metrics)",
+    )
+    args = parser.parse_args(argv)
+    if args.transport == "sse" and args.workers > 1:
+        parser.error("the SSE transport keeps sessions in memory; use --workers 1")
+    return args
+
+
+def configure(args: argparse.Namespace) -> None:
+    """
+    Export the command-line settings to the environment.
+
+    Worker processes and the daemon import the server afresh, so the
+    configuration travels through the environment rather than through
+    `server.set_client()`.
+    """
+    for name, value in (
+        ("WIKIPEDIA_BACKEND", args.backend),
+        ("WIKIPEDIA_OFFLINE_STORE", args.store),
+        ("WIKIPEDIA_SEARCH_INDEX", args.search_index),
+        ("WIKIPEDIA_VECTOR_INDEX", args.vector_index),
+        ("WIKIPEDIA_TITLE_INDEX", args.title_index),
+        ("WIKIPEDIA_WARM_FILE", args.warm_file),
+        ("WIKIPEDIA_WARM_LIMIT", args.warm_limit and str(args.warm_limit)),
+        ("WIKIPEDIA_METRICS", args.metrics and "1"),
+    ):
+        if value:
+            os.environ[name] = value
+
+
+def uses_daemon(args: argparse.Namespace) -> bool:
+    """Return whether a stdio session should go through the shared daemon."""
+    return args.transport == "stdio" and (
+        args.daemon or os.environ.get("WIKIPEDIA_DAEMON", "").lower() in ("1", "true", "yes")
+    )
+
+
+def main(
+    argv: Optional[Sequence[str]] = None,
+    run: Optional[Callable[[argparse.Namespace], None]] = None,
+) -> None:
+    """
+    Entry point of the `wikipedia-assistant` script.
+
+    `run` serves the parsed arguments; it defaults to
+    `wikipedia_assistant.server.run`, imported only when it is needed.
+    """
+    args = parse_args(argv)
+    configure(args)
+    if uses_daemon(args):
+        from wikipedia_assistant.daemon import run_shim
+
+        run_shim()
+        return
+    if run is None:
+        from wikipedia_assistant import server
+
+        run = server.run
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Shared backend daemon behind thin stdio shims.
+
+Without it every MCP client window spawns its own stdio server, each with its
+own heap, connection pool and cold cache. In daemon mode one long-lived
+process owns the backend and serves MCP sessions on a Unix domain socket, one
+session per connection, while the stdio entry point becomes a shim that
+starts the daemon when none is running and copies bytes between its
+stdin/stdout and the socket. The socket carries the stdio transport's
+newline-delimited JSON-RPC as-is, so the shim never parses a message, and
+the shim itself only needs the standard library.
+
+The daemon is started with the environment of the shim that launched it, so
+WIKIPEDIA_* settings of the first shim configure it for every later session.
+It runs until it receives SIGTERM or SIGINT and logs to `<socket>.log`.
+
+    python -m wikipedia_assistant.daemon              # stdio shim
+    python -m wikipedia_assistant.daemon serve        # daemon, in the foreground
+"""
+import argparse
+import fcntl
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Optional, Sequence, cast
+
+DEFAULT_SOCKET_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "wikipedia-research-assistant", "daemon.sock"
+)
+
+# Bytes moved per read by the shim, and the longest message the daemon accepts.
+CHUNK_SIZE = 65536
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+# Seconds a session waits for outstanding responses after its input ends.
+DRAIN_TIMEOUT = 30.0
+
+
+def socket_path() -> str:
+    """Return the daemon socket path: WIKIPEDIA_DAEMON_SOCKET or the default."""
+    return os.path.expanduser(os.environ.get("WIKIPEDIA_DAEMON_SOCKET") or DEFAULT_SOCKET_PATH)
+
+
+def _make_private_dir(path: str) -> None:
+    # Only the owner may reach the socket, its lock file and its log.
+    os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+
+
+def _try_connect(path: str) -> Optional[socket.socket]:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+    return sock
+
+
+def _spawn(path: str) -> subprocess.Popen:
+    # The shim may run as a script (src/wikipedia_assistant/server.py), so
+    # make sure the daemon can import the package it belongs to.
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        filter(None, [package_root, os.environ.get("PYTHONPATH")])
+    ))
+    with open(path + ".log", "ab") as log:
+        return subprocess.Popen(
+            [sys.executable, "-m", "wikipedia_assistant.daemon", "serve", "--socket", path],
+            stdin=subprocess.DEVNULL, stdout=log, stderr=log,
+            env=env, start_new_session=True,
+        )
+
+
+def connect(path: Optional[str] = None, timeout: float = 30.0) -> socket.socket:
+    """
+    Connect to the daemon at `path`, starting it first if none is running.
+
+    Shims starting at the same time serialize on a lock file, so only one of
+    them launches a daemon and the others connect to it.
+    """
+    path = path or socket_path()
+    sock = _try_connect(path)
+    if sock is not None:
+        return sock
+    _make_private_dir(path)
+    with open(path + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        sock = _try_connect(path)
+        if sock is not None:
+            return sock
+        process = _spawn(path)
+        deadline = time.monotonic() + timeout
+        while sock is None:
+            if process.poll() is not None:
+                raise RuntimeError(
+                    f"The daemon exited with status {process.returncode}; see {path}.log"
+                )
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"The daemon did not start listening on {path}")
+            time.sleep(0.02)
+            sock = _try_connect(path)
+    return sock
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def relay(sock: socket.socket, stdin_fd: int, stdout_fd: int) -> None:
+    """
+    Copy `stdin_fd` to `sock` and `sock` to `stdout_fd` until the daemon
+    closes the connection. End of input is passed on as a half-close, which
+    ends the session.
+    """
+    def forward_input() -> None:
+        try:
+            while True:
+                data = os.read(stdin_fd, CHUNK_SIZE)
+                if not data:
+                    break
+                sock.sendall(data)
+        except OSError:
+            pass
+        finally:
+            try:
+                sock.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+
+    threading.Thread(target=forward_input, name="stdin", daemon=True).start()
+    while True:
+        data = sock.recv(CHUNK_SIZE)
+        if not data:
+            break
+        _write_all(stdout_fd, data)
+
+
+def run_shim(path: Optional[str] = None) -> None:
+    """Serve one stdio MCP session through the daemon."""
+    with connect(path) as sock:
+        relay(sock, sys.stdin.fileno(), sys.stdout.fileno())
+
+
+class _SocketFile:
+    """
+    The line-file interface `mcp.server.stdio.stdio_server` expects, over a
+    socket.
+
+    End of input is only reported once every request read so far has been
+    answered (or DRAIN_TIMEOUT has passed), so a client that half-closes the
+    connection right after its last request still gets the response.
+    """
+
+    def __init__(self, stream):
+        import anyio
+        from anyio.streams.buffered import BufferedByteReceiveStream
+
+        self._stream = stream
+        self._buffered = BufferedByteReceiveStream(stream)
+        self._pending = set()
+        self._drained = anyio.Event()
+        self._drained.set()
+
+    def __aiter__(self) -> "_SocketFile":
+        return self
+
+    async def __anext__(self) -> str:
+        import anyio
+
+        try:
+            line = await self._buffered.receive_until(b"\n", MAX_MESSAGE_BYTES)
+        except (anyio.EndOfStream, anyio.IncompleteRead):
+            with anyio.move_on_after(DRAIN_TIMEOUT):
+                await self._drained.wait()
+            raise StopAsyncIteration from None
+        message = _decode(line)
+        if "method" in message and "id" in message:
+            if not self._pending:
+                self._drained = anyio.Event()
+            self._pending.add(message["id"])
+        return line.decode("utf-8")
+
+    async def write(self, text: str) -> None:
+        await self._stream.send(text.encode("utf-8"))
+        message = _decode(text)
+        if "method" not in message and message.get("id") in self._pending:
+            self._pending.discard(message["id"])
+            if not self._pending:
+                self._drained.set()
+
+    async def flush(self) -> None:
+        pass
+
+
+def _decode(line) -> dict:
+    try:
+        message = json.loads(line)
+    except ValueError:
+        return {}
+    return message if isinstance(message, dict) else {}
+
+
+async def serve(path: Optional[str] = None) -> None:
+    """
+    Run the daemon: accept MCP sessions on the Unix socket at `path` until
+    SIGTERM or SIGINT. All sessions share the server's backend and caches.
+    """
+    import signal
+
+    import anyio
+    from mcp.server.stdio import stdio_server
+
+    from wikipedia_assistant import server
+
+    path = path or socket_path()
+    if os.path.exists(path):
+        existing = _try_connect(path)
+        if existing is not None:
+            existing.close()
+            raise RuntimeError(f"A daemon is already listening on {path}")
+        os.unlink(path)
+    _make_private_dir(path)
+    app = server.mcp._mcp_server
+
+    async def session(stream) -> None:
+        async with stream:
+            # stdio_server only iterates its input and calls write() and
+            # flush() on its output, which _SocketFile provides.
+            file = cast(Any, _SocketFile(stream))
+            try:
+                async with stdio_server(file, file) as (read_stream, write_stream):
+                    await app.run(
+                        read_stream, write_stream, app.create_initialization_options()
+                    )
+            except Exception as e:
+                print(f"Session ended with an error: {e!r}", file=sys.stderr)
+
+    # The socket is created with owner-only permissions rather than chmod
+    # after bind, which would leave a window where others could connect.
+    umask = os.umask(0o077)
+    try:
+        listener = await anyio.create_unix_listener(path)
+    finally:
+        os.umask(umask)
+    print(f"Listening on {path}", file=sys.stderr, flush=True)
+    try:
+        async with listener, anyio.create_task_group() as tg:
+            tg.start_soon(listener.serve, session)
+            with anyio.open_signal_receiver(signal.SIGTERM, signal.SIGINT) as signals:
+                async for _ in signals:
+                    tg.cancel_scope.cancel()
+                    break
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+        await server.close_client()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Shared Wikipedia MCP backend daemon")
+    parser.add_argument(
+        "command", nargs="?", choices=["shim", "serve"], default="shim",
+        help="shim (default): stdio session through the daemon; serve: run the daemon",
+    )
+    parser.add_argument("--socket", default=None, help="Unix socket path")
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        import anyio
+
+        anyio.run(serve, args.socket)
+    else:
+        run_shim(args.socket)
+
+
+if __name__ == "__main__":
+    main()
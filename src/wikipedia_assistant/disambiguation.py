@@ -0,0 +1,106 @@
+"""
+Resolve ambiguous queries within the same tool call.
+
+When a query lands on a disambiguation page, the intro extracts of its first
+options are fetched together (one packed multi-title request online) and
+ranked against the query. A clear winner is returned as the answer with the
+other candidates as alternatives; otherwise every candidate comes back with a
+short snippet so the caller can pick one without another lookup.
+"""
+import math
+from collections import Counter
+from typing import Any, Dict, List, Sequence, Tuple
+
+from wikipedia_assistant.models import (
+    Candidate,
+    DisambiguationResult,
+    ResolvedResult,
+    Result,
+)
+from wikipedia_assistant.search_index import tokenize
+from wikipedia_assistant.summarizer import split_sentences
+from wikipedia_assistant.wikipedia_client import DisambiguationError
+
+# Number of disambiguation options whose extracts are fetched and ranked.
+MAX_CANDIDATES = 8
+
+# Minimum lead of the best candidate over the runner-up to answer with it.
+CONFIDENCE_MARGIN = 0.15
+
+SNIPPET_CHARS = 200
+
+# Weight of a query term found in a candidate's extract, relative to its title.
+_BODY_MATCH = 0.6
+
+# Disambiguation pages list the common meanings first and every backend
+# returns the options in page order, so earlier options get a small head
+# start that breaks ties.
+_POSITION_PRIOR = 0.05
+
+
+def snippet(summary: str, limit: int = SNIPPET_CHARS) -> str:
+    """Return the first sentence of `summary`, cut to `limit` characters."""
+    sentences = split_sentences(summary)
+    first = sentences[0] if sentences else ""
+    if len(first) <= limit:
+        return first
+    return first[:limit - 1].rsplit(" ", 1)[0].rstrip(",;: ") + "…"
+
+
+def rank_candidates(
+    query: str, candidates: Sequence[Dict[str, str]]
+) -> List[Tuple[float, Dict[str, str]]]:
+    """
+    Score candidate articles against `query`, best first.
+
+    Each query term counts with its inverse document frequency among the
+    candidates: fully when it appears in the candidate's title, partly when
+    it only appears in the extract. Scores are normalized to [0, 1] before
+    the position prior is added.
+    """
+    terms = set(tokenize(query))
+    docs = [
+        (set(tokenize(c["title"])), Counter(tokenize(c["summary"])))
+        for c in candidates
+    ]
+    idf = {}
+    for term in terms:
+        df = sum(term in title or term in body for title, body in docs)
+        if df:
+            idf[term] = math.log(1 + len(docs) / df)
+    total = sum(idf.values()) or 1.0
+
+    scored = []
+    for position, (candidate, (title, body)) in enumerate(zip(candidates, docs)):
+        match = sum(
+            weight * (1.0 if term in title else _BODY_MATCH if body[term] else 0.0)
+            for term, weight in idf.items()
+        )
+        scored.append((match / total + _POSITION_PRIOR / (1 + position), candidate))
+    scored.sort(key=lambda item: -item[0])
+    return scored
+
+
+async def resolve(backend: Any, query: str, error: DisambiguationError) -> Result:
+    """
+    Turn a DisambiguationError for `query` into a resolved or candidate result.
+
+    `backend` must provide `candidates(titles)`, as WikipediaClient and
+    OfflineStore do. Without any loadable candidate the plain option list is
+    returned.
+    """
+    found = await backend.candidates(error.options[:MAX_CANDIDATES])
+    if not found:
+        return DisambiguationResult(error.title, error.options, [])
+
+    ranked = rank_candidates(query, found)
+    options = [
+        Candidate(c["title"], snippet(c["summary"]), c["url"], score)
+        for score, c in ranked
+    ]
+    if len(ranked) == 1 or ranked[0][0] - ranked[1][0] >= CONFIDENCE_MARGIN:
+        best = ranked[0][1]
+        return ResolvedResult(
+            best["title"], best["summary"], best["url"], error.title, options[1:]
+        )
+    return DisambiguationResult(error.title, error.options, options)
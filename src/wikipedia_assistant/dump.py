@@ -0,0 +1,197 @@
+"""
+Stream Wikipedia dumps into the local OfflineStore.
+
+Supports `pages-articles.xml(.bz2)` exports and CirrusSearch JSON dumps
+(`.json`, `.json.gz` or `.json.bz2`). Files are parsed as a stream, so memory
+use stays flat regardless of dump size. Progress is committed together with
+each batch of pages, which makes ingestion restartable: a second run over the
+same file skips what was already stored.
+
+Usage:
+    python -m wikipedia_assistant.dump DUMP --store wiki.sqlite3
+"""
+import argparse
+import bz2
+import gzip
+import json
+import os
+import re
+import sys
+import xml.etree.ElementTree as ET
+from typing import IO, Any, Dict, Iterator, List, Optional, Sequence, cast
+
+from wikipedia_assistant.offline_store import OfflineStore
+from wikipedia_assistant.wikitext import (
+    disambiguation_options,
+    is_disambiguation,
+    wikitext_lead,
+)
+
+
+def _open(path: str) -> IO[bytes]:
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    if path.endswith(".gz"):
+        return cast(IO[bytes], gzip.open(path, "rb"))
+    return open(path, "rb")
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def iter_xml_dump(stream: IO[bytes]) -> Iterator[Dict[str, Any]]:
+    """
+    Yield one record per main-namespace page of a pages-articles XML dump.
+
+    Records are either `{"title", "summary", "revision", "options"}` articles
+    or `{"title", "target"}` redirects. The first record is a `{"site": ...}`
+    entry carrying the article base URL when the dump has a siteinfo block.
+    """
+    context = ET.iterparse(stream, events=("start", "end"))
+    _, root = next(context)
+    page: Dict[str, Any] = {}
+    in_revision = False
+    for event, elem in context:
+        tag = _local(elem.tag)
+        if event == "start":
+            if tag == "page":
+                page = {}
+            elif tag == "revision":
+                in_revision = True
+            continue
+
+        if tag == "base" and not page:
+            yield {"site": (elem.text or "").rsplit("/", 1)[0] + "/"}
+        elif tag == "title":
+            page["title"] = elem.text or ""
+        elif tag == "ns":
+            page["ns"] = elem.text
+        elif tag == "redirect":
+            page["redirect"] = elem.get("title")
+        elif tag == "id" and in_revision and "revision" not in page:
+            page["revision"] = int(elem.text or 0)
+        elif tag == "revision":
+            in_revision = False
+        elif tag == "text":
+            page["text"] = elem.text or ""
+        elif tag == "page":
+            if page.get("ns") == "0":
+                yield _page_record(page)
+            root.clear()
+
+
+def _page_record(page: Dict[str, Any]) -> Dict[str, Any]:
+    if page.get("redirect"):
+        return {"title": page["title"], "target": page["redirect"].split("#")[0]}
+    text = page.get("text", "")
+    record = {
+        "title": page["title"],
+        "summary": wikitext_lead(text),
+        "revision": page.get("revision", 0),
+    }
+    if is_disambiguation(text):
+        record["options"] = disambiguation_options(text)
+    return record
+
+
+def iter_cirrus_dump(stream: IO[bytes]) -> Iterator[Dict[str, Any]]:
+    """
+    Yield records from a CirrusSearch JSON dump.
+
+    The dump alternates `{"index": ...}` action lines with document lines.
+    Each article document yields its article record followed by one record
+    per redirect that points at it.
+    """
+    for line in stream:
+        if not line.strip():
+            continue
+        doc = json.loads(line)
+        if "index" in doc or doc.get("namespace", 0) != 0:
+            continue
+        title = doc["title"]
+        record = {
+            "title": title,
+            "summary": doc.get("opening_text") or "",
+            "revision": doc.get("version", 0),
+        }
+        templates = " ".join(doc.get("template", []))
+        if re.search(r"Template:(?:Disambiguation|Dmbox|Hndis|Geodis)", templates):
+            record["options"] = doc.get("outgoing_link", [])
+        yield record
+        for redirect in doc.get("redirect", []):
+            if redirect.get("namespace", 0) == 0:
+                yield {"title": redirect["title"], "target": title}
+
+
+def site_lang(base_url: str) -> str:
+    """Return the language code of a base URL like https://en.wikipedia.org/wiki/."""
+    host = base_url.split("//", 1)[-1].split("/", 1)[0]
+    return host.split(".", 1)[0]
+
+
+def ingest(
+    dump_path: str,
+    store: OfflineStore,
+    *,
+    batch_size: int = 1000,
+    restart: bool = False,
+) -> int:
+    """
+    Load `dump_path` into `store` and return the number of records processed.
+
+    Every batch commits together with the count of records consumed so far. An
+    interrupted run therefore resumes after the last committed batch, and a
+    completed dump is not reprocessed unless `restart` is set.
+    """
+    stat = os.stat(dump_path)
+    progress_key = f"progress:{os.path.abspath(dump_path)}:{stat.st_size}:{int(stat.st_mtime)}"
+    done = 0 if restart else int(store.get_meta(progress_key) or 0)
+    is_cirrus = ".json" in os.path.basename(dump_path)
+
+    articles: List[Dict[str, Any]] = []
+    redirects: List[Dict[str, str]] = []
+    seen = 0
+    with _open(dump_path) as stream:
+        records = iter_cirrus_dump(stream) if is_cirrus else iter_xml_dump(stream)
+        for record in records:
+            if "site" in record:
+                store.set_site(record["site"], site_lang(record["site"]))
+                continue
+            seen += 1
+            if seen <= done:
+                continue
+            (redirects if "target" in record else articles).append(record)
+            if len(articles) + len(redirects) >= batch_size:
+                store.write_batch(articles, redirects, {progress_key: str(seen)})
+                articles, redirects = [], []
+    store.write_batch(articles, redirects, {progress_key: str(max(seen, done))})
+    return seen
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Ingest a Wikipedia dump into a local offline store."
+    )
+    parser.add_argument("dump", help="pages-articles XML or CirrusSearch JSON dump")
+    parser.add_argument("--store", required=True, help="path of the SQLite store")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--base-url", help="article URL prefix for CirrusSearch dumps")
+    parser.add_argument("--restart", action="store_true", help="ignore saved progress")
+    args = parser.parse_args(argv)
+
+    store = OfflineStore(args.store)
+    try:
+        if args.base_url:
+            store.set_site(args.base_url, site_lang(args.base_url))
+        count = ingest(
+            args.dump, store, batch_size=args.batch_size, restart=args.restart
+        )
+        print(f"Processed {count} records; store holds {len(store)} articles.")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
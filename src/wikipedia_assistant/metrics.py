@@ -0,0 +1,161 @@
+"""
+Request-path metrics, exported in the Prometheus text format.
+
+Stages of a tool call (cache, search, page, disambiguation, summarize, encode
+and the upstream requests themselves) are timed with `time.perf_counter` into
+latency histograms; cache results, upstream status codes and retries are
+counted. Metrics are off unless WIKIPEDIA_METRICS is set: then `time()`
+returns a shared no-op timer and `inc()` returns at once, so the hot path only
+pays for an attribute check.
+"""
+import os
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# Upper bounds of the latency histogram buckets, in seconds.
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+STAGE_SECONDS = "wikipedia_stage_seconds"
+TOOL_SECONDS = "wikipedia_tool_seconds"
+
+HELP = {
+    STAGE_SECONDS: "Time spent in each stage of a tool call.",
+    TOOL_SECONDS: "Time from tool call to encoded MCP content.",
+    "wikipedia_cache_requests_total": "Result cache lookups by outcome.",
+    "wikipedia_upstream_responses_total": "Upstream API responses by HTTP status.",
+    "wikipedia_upstream_retries_total": "Upstream requests retried after a throttling response.",
+}
+
+
+class Histogram:
+    """Fixed-bucket histogram; bucket counts are made cumulative on export."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Timer:
+    __slots__ = ("_metrics", "_name", "_labels", "_start")
+
+    def __init__(self, metrics: "Metrics", name: str, labels: Labels):
+        self._metrics = metrics
+        self._name = name
+        self._labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._metrics.observe(self._name, time.perf_counter() - self._start, self._labels)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """Counters and histograms keyed by metric name and label pairs."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.histograms.clear()
+
+    def inc(self, name: str, labels: Labels = (), value: float = 1.0) -> None:
+        if not self.enabled:
+            return
+        series = self.counters.setdefault(name, {})
+        series[labels] = series.get(labels, 0.0) + value
+
+    def observe(self, name: str, value: float, labels: Labels = ()) -> None:
+        if not self.enabled:
+            return
+        series = self.histograms.setdefault(name, {})
+        histogram = series.get(labels)
+        if histogram is None:
+            histogram = series[labels] = Histogram()
+        histogram.observe(value)
+
+    def time(self, value: str, name: str = STAGE_SECONDS, label: str = "stage"):
+        """Context manager recording its duration in histogram `name`{label=value}."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, ((label, value),))
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for name in sorted(self.counters):
+            _header(lines, name, "counter")
+            for labels, value in sorted(self.counters[name].items()):
+                lines.append(f"{name}{_format_labels(labels)} {_number(value)}")
+        for name in sorted(self.histograms):
+            _header(lines, name, "histogram")
+            for labels, histogram in sorted(self.histograms[name].items()):
+                cumulative = 0
+                for bound, count in zip(histogram.bounds + (None,), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound is None else _number(bound)
+                    lines.append(
+                        f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}"
+                    )
+                lines.append(f"{name}_sum{_format_labels(labels)} {_number(histogram.sum)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def _header(lines: List[str], name: str, kind: str) -> None:
+    if name in HELP:
+        lines.append(f"# HELP {name} {HELP[name]}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return repr(int(value)) if float(value).is_integer() else repr(value)
+
+
+def _enabled_from_env(value: Optional[str]) -> bool:
+    return (value or "").strip().lower() in ("1", "true", "yes", "on")
+
+
+# Process-wide registry used by the client and the server.
+METRICS = Metrics(enabled=_enabled_from_env(os.environ.get("WIKIPEDIA_METRICS")))
@@ -0,0 +1,167 @@
+"""
+Result types returned by the Wikipedia tools.
+
+Each result is a small slotted dataclass that knows its own dict and JSON
+form. The JSON text is encoded at most once per object and can be attached
+when a result is loaded from the cache, so a cache hit is answered without
+serializing the result again.
+"""
+import json
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, List, Optional, Union
+
+# Number of disambiguation options listed in an ambiguous-topic result.
+MAX_OPTIONS = 5
+
+
+class ErrorCode(str, Enum):
+    """Stable, machine-readable error codes carried in the `code` field."""
+
+    NO_RESULTS = "no_results"
+    AMBIGUOUS = "ambiguous"
+    PAGE_NOT_FOUND = "page_not_found"
+    INVALID_CURSOR = "invalid_cursor"
+    UNSUPPORTED = "unsupported"
+    UPSTREAM_ERROR = "upstream_error"
+
+
+def encode(data: Any) -> str:
+    """Encode a tool result as compact JSON."""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+class _Result:
+    __slots__ = ("_json",)
+    _json: Optional[str]
+
+    def to_dict(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def to_json(self) -> str:
+        """Return the JSON form of the result, encoding it on first use."""
+        if self._json is None:
+            self._json = encode(self.to_dict())
+        return self._json
+
+
+@dataclass
+class ArticleResult(_Result):
+    """The article that best matches a query."""
+
+    __slots__ = ("title", "summary", "url")
+    title: str
+    summary: str
+    url: str
+
+    def __post_init__(self) -> None:
+        self._json = None
+
+    @classmethod
+    def from_json(cls, text: str) -> "ArticleResult":
+        """Rebuild a result from its JSON form, keeping the text for reuse."""
+        data = json.loads(text)
+        result = cls(data["title"], data["summary"], data["url"])
+        result._json = text
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"title": self.title, "summary": self.summary, "url": self.url}
+
+
+@dataclass
+class ErrorResult(_Result):
+    """A failed lookup: a stable error code plus a human-readable message."""
+
+    __slots__ = ("code", "message")
+    code: ErrorCode
+    message: str
+
+    def __post_init__(self) -> None:
+        self._json = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"error": self.message, "code": self.code.value}
+
+
+@dataclass
+class Candidate:
+    """One meaning of an ambiguous query, with a snippet of its article."""
+
+    __slots__ = ("title", "snippet", "url", "score")
+    title: str
+    snippet: str
+    url: str
+    score: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "title": self.title,
+            "snippet": self.snippet,
+            "url": self.url,
+            "score": round(self.score, 3),
+        }
+
+
+@dataclass
+class DisambiguationResult(_Result):
+    """
+    A query that matched a disambiguation page, with its first options and,
+    when they could be loaded, ranked candidates with snippets.
+    """
+
+    __slots__ = ("title", "options", "candidates")
+    title: str
+    options: List[str]
+    candidates: List[Candidate]
+
+    def __post_init__(self) -> None:
+        self._json = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        options = self.options[:MAX_OPTIONS]
+        data: Dict[str, Any] = {
+            "error": f"Ambiguous topic. Try one of these: {', '.join(options)}",
+            "code": ErrorCode.AMBIGUOUS.value,
+            "title": self.title,
+            "options": options,
+        }
+        if self.candidates:
+            data["candidates"] = [c.to_dict() for c in self.candidates]
+        return data
+
+
+@dataclass
+class ResolvedResult(_Result):
+    """
+    The best meaning of an ambiguous query, picked by ranking the options of
+    its disambiguation page, plus the other meanings as alternatives.
+    """
+
+    __slots__ = ("title", "summary", "url", "disambiguation", "alternatives")
+    title: str
+    summary: str
+    url: str
+    disambiguation: str
+    alternatives: List[Candidate]
+
+    def __post_init__(self) -> None:
+        self._json = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "title": self.title,
+            "summary": self.summary,
+            "url": self.url,
+            "disambiguation": self.disambiguation,
+            "alternatives": [c.to_dict() for c in self.alternatives],
+        }
+
+
+Result = Union[ArticleResult, ResolvedResult, DisambiguationResult, ErrorResult]
+
+# Shared instances for the errors that carry no per-query data.
+NO_RESULTS = ErrorResult(ErrorCode.NO_RESULTS, "No results found for your query.")
+PAGE_NOT_FOUND = ErrorResult(
+    ErrorCode.PAGE_NOT_FOUND, "No Wikipedia page could be loaded for this query."
+)
@@ -0,0 +1,423 @@
+"""
+Local article store that answers fetch_wikipedia_info without the network.
+
+The store is a SQLite file that holds title, lead section and URL for each
+article, plus the redirect table. It is filled by the dump ingester in
+`wikipedia_assistant.dump`, kept current by `wikipedia_assistant.recentchanges`
+and exposes the same `lookup`/`lookup_many` coroutines as WikipediaClient,
+so the server can use either backend.
+"""
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from urllib.parse import quote
+
+from wikipedia_assistant.wikipedia_client import (
+    DisambiguationError,
+    PageError,
+    WikipediaError,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    revision INTEGER NOT NULL DEFAULT 0,
+    options TEXT
+);
+CREATE TABLE IF NOT EXISTS redirects (
+    key TEXT PRIMARY KEY,
+    target TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Search hits tried in turn when the top ones are gone from the store.
+SEARCH_HITS = 5
+
+
+def normalize_title(title: str) -> str:
+    """Return the lookup key for a title: spaces for underscores, case-folded."""
+    return " ".join(title.replace("_", " ").split()).casefold()
+
+
+def title_url(base_url: str, title: str) -> str:
+    """Build the article URL the same way MediaWiki encodes `fullurl`."""
+    return base_url + quote(title.replace(" ", "_"), safe=";@$!*(),/~:")
+
+
+class ArticleLookups:
+    """
+    The lookup coroutines of WikipediaClient, for local stores.
+
+    Subclasses provide `get(title)`, returning the article dict or None, and
+    `search_index` and `title_index` attributes.
+    """
+
+    search_index: Any = None
+    title_index: Any = None
+
+    def get(self, title: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def _resolve(self, query: str) -> Optional[Dict[str, str]]:
+        article = self.get(query)
+        if article is None and self.title_index is not None:
+            title = self.title_index.resolve(query)
+            article = self.get(title) if title is not None else None
+        if article is None and self.search_index is not None:
+            # The index may predate deletions and renames in the store, so
+            # hits without an article fall through to the next ones.
+            for hit in self.search_index.search(query, SEARCH_HITS):
+                article = self.get(hit)
+                if article is not None:
+                    break
+        if article is None:
+            return None
+        if "options" in article:
+            raise DisambiguationError(article["title"], article["options"])
+        return article
+
+    async def page(self, title: str) -> Dict[str, str]:
+        """
+        Load the article called `title`, following one redirect.
+
+        Raises PageError for missing articles and DisambiguationError for
+        disambiguation pages, like WikipediaClient.page.
+        """
+        article = self.get(title)
+        if article is None:
+            raise PageError(title)
+        if "options" in article:
+            raise DisambiguationError(article["title"], article["options"])
+        return article
+
+    async def lookup(self, query: str) -> Optional[Dict[str, str]]:
+        """
+        Resolve `query` against the local store.
+
+        Matches article titles and redirects, ignoring case, spacing and
+        underscores, then tries the title index and the search index when
+        they are attached. Returns None when nothing matches.
+        """
+        return self._resolve(query)
+
+    async def candidates(self, titles: Sequence[str]) -> List[Dict[str, str]]:
+        """Load several articles at once; see WikipediaClient.candidates."""
+        found: Dict[str, Dict[str, str]] = {}
+        for title in titles:
+            article = self.get(title)
+            if article is not None and "options" not in article:
+                found.setdefault(article["title"], article)
+        return list(found.values())
+
+    async def lookup_many(
+        self, queries: Sequence[str], concurrency: int = 8
+    ) -> List[Union[Dict[str, str], None, WikipediaError]]:
+        """Resolve many queries in order; see WikipediaClient.lookup_many."""
+        outcomes: List[Union[Dict[str, str], None, WikipediaError]] = []
+        for query in queries:
+            try:
+                outcomes.append(self._resolve(query))
+            except (DisambiguationError, PageError) as e:
+                outcomes.append(e)
+        return outcomes
+
+
+class OfflineStore(ArticleLookups):
+    """
+    SQLite-backed article store.
+
+    Disambiguation pages keep their options as a JSON list so that lookups
+    raise the same DisambiguationError as the online client.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        readonly: bool = False,
+        search_index: Any = None,
+        title_index: Any = None,
+    ):
+        self.path = path
+        # Optional SearchIndex used when a query is not an exact title.
+        self.search_index = search_index
+        # Optional TitleIndex that corrects typos in titles first.
+        self.title_index = title_index
+        self._lock = threading.Lock()
+        if readonly:
+            self._db = sqlite3.connect(
+                f"file:{path}?mode=ro", uri=True, check_same_thread=False
+            )
+        else:
+            self._db = sqlite3.connect(
+                path, isolation_level=None, check_same_thread=False
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA)
+        self.base_url = self.get_meta("base_url") or "https://en.wikipedia.org/wiki/"
+        self.lang = self.get_meta("lang") or "en"
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    async def aclose(self) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    # -- metadata ----------------------------------------------------------
+
+    def get_meta(self, name: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM meta WHERE name = ?", (name,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_site(self, base_url: str, lang: str) -> None:
+        """Record the wiki the store was built from, used for article URLs."""
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                [("base_url", base_url), ("lang", lang)],
+            )
+        self.base_url = base_url
+        self.lang = lang
+
+    # -- writes ------------------------------------------------------------
+
+    def write_batch(
+        self,
+        articles: Iterable[Dict[str, Any]],
+        redirects: Iterable[Dict[str, str]],
+        meta: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """
+        Upsert articles and redirects in one transaction.
+
+        Articles whose stored revision matches are left untouched, so
+        re-ingesting an unchanged dump does no writes. `meta` is written in the
+        same transaction, which is how the ingester records its progress.
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.executemany(
+                    "INSERT INTO articles (key, title, summary, revision, options) "
+                    "VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET title = excluded.title, "
+                    "summary = excluded.summary, revision = excluded.revision, "
+                    "options = excluded.options "
+                    "WHERE excluded.revision != articles.revision",
+                    [
+                        (
+                            normalize_title(a["title"]),
+                            a["title"],
+                            a["summary"],
+                            a.get("revision", 0),
+                            json.dumps(a["options"]) if a.get("options") else None,
+                        )
+                        for a in articles
+                    ],
+                )
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO redirects VALUES (?, ?)",
+                    [(normalize_title(r["title"]), r["target"]) for r in redirects],
+                )
+                if meta:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO meta VALUES (?, ?)", meta.items()
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def apply_changes(
+        self, changes: Iterable[Dict[str, Any]], meta: Optional[Dict[str, str]] = None
+    ) -> Dict[str, int]:
+        """
+        Apply page changes, in order, in one transaction; return counts by action.
+
+        Each change is a dict with an `action`:
+
+        - "edit": `title`, `summary`, `revision` and optional `options`; the
+          page becomes (or stays) an article.
+        - "redirect": `title`, `target`, `revision`; the page becomes a redirect.
+        - "delete": `title`.
+        - "move": `title`, `target` and `redirect`, whether a redirect is left
+          at the old title. Redirects to the old title are pointed at the new one.
+
+        Edits and redirects older than the stored revision are skipped (counted
+        as "stale"), so replaying a change log is harmless. `meta` is written in
+        the same transaction. If any change fails, nothing is applied. Readers
+        on other connections keep seeing the previous state until the commit.
+        """
+        counts: Dict[str, int] = {}
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for change in changes:
+                    action = change["action"]
+                    apply = getattr(self, f"_apply_{action}", None)
+                    if apply is None:
+                        raise ValueError(f"Unknown change action: {action!r}")
+                    if not apply(change):
+                        action = "stale"
+                    counts[action] = counts.get(action, 0) + 1
+                if meta:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO meta VALUES (?, ?)", meta.items()
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return counts
+
+    def _is_stale(self, key: str, revision: int) -> bool:
+        row = self._db.execute(
+            "SELECT revision FROM articles WHERE key = ?", (key,)
+        ).fetchone()
+        return row is not None and row[0] >= revision
+
+    def _apply_edit(self, change: Dict[str, Any]) -> bool:
+        key = normalize_title(change["title"])
+        if self._is_stale(key, change["revision"]):
+            return False
+        self._db.execute(
+            "INSERT INTO articles (key, title, summary, revision, options) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET title = excluded.title, "
+            "summary = excluded.summary, revision = excluded.revision, "
+            "options = excluded.options",
+            (
+                key,
+                change["title"],
+                change["summary"],
+                change["revision"],
+                json.dumps(change["options"]) if change.get("options") else None,
+            ),
+        )
+        self._db.execute("DELETE FROM redirects WHERE key = ?", (key,))
+        return True
+
+    def _apply_redirect(self, change: Dict[str, Any]) -> bool:
+        key = normalize_title(change["title"])
+        if self._is_stale(key, change["revision"]):
+            return False
+        self._db.execute("DELETE FROM articles WHERE key = ?", (key,))
+        self._db.execute(
+            "INSERT OR REPLACE INTO redirects VALUES (?, ?)", (key, change["target"])
+        )
+        return True
+
+    def _apply_delete(self, change: Dict[str, Any]) -> bool:
+        key = normalize_title(change["title"])
+        self._db.execute("DELETE FROM articles WHERE key = ?", (key,))
+        self._db.execute("DELETE FROM redirects WHERE key = ?", (key,))
+        return True
+
+    def _apply_move(self, change: Dict[str, Any]) -> bool:
+        old, new = change["title"], change["target"]
+        old_key, new_key = normalize_title(old), normalize_title(new)
+        if old_key != new_key:
+            # Pages can only be moved over redirects or deleted pages.
+            self._db.execute("DELETE FROM articles WHERE key = ?", (new_key,))
+            self._db.execute("DELETE FROM redirects WHERE key = ?", (new_key,))
+        moved = self._db.execute(
+            "UPDATE articles SET key = ?, title = ? WHERE key = ?", (new_key, new, old_key)
+        ).rowcount
+        if not moved:
+            self._db.execute(
+                "UPDATE redirects SET key = ? WHERE key = ?", (new_key, old_key)
+            )
+        self._db.execute("UPDATE redirects SET target = ? WHERE target = ?", (new, old))
+        if change.get("redirect") and old_key != new_key:
+            self._db.execute(
+                "INSERT OR REPLACE INTO redirects VALUES (?, ?)", (old_key, new)
+            )
+        return True
+
+    # -- reads -------------------------------------------------------------
+
+    def get(self, title: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the stored article for `title`, following one redirect.
+
+        The dict has `title`, `summary`, `url` and, for disambiguation pages,
+        `options`.
+        """
+        key = normalize_title(title)
+        with self._lock:
+            row = self._article_row(key)
+            if row is None:
+                target = self._db.execute(
+                    "SELECT target FROM redirects WHERE key = ?", (key,)
+                ).fetchone()
+                if target is not None:
+                    row = self._article_row(normalize_title(target[0]))
+        if row is None:
+            return None
+        article = {
+            "title": row[0],
+            "summary": row[1],
+            "url": title_url(self.base_url, row[0]),
+        }
+        if row[2]:
+            article["options"] = json.loads(row[2])
+        return article
+
+    def iter_articles(self) -> Iterator[Tuple[str, str]]:
+        """Yield (title, summary) for every article, in insertion order."""
+        cursor = self._db.cursor()
+        cursor.execute("SELECT title, summary FROM articles ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                return
+            yield from rows
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every article as a dict with `title`, `summary` and, for
+        disambiguation pages, `options`, ordered by lookup key.
+        """
+        cursor = self._db.cursor()
+        cursor.execute("SELECT title, summary, options FROM articles ORDER BY key")
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                return
+            for title, summary, options in rows:
+                record = {"title": title, "summary": summary}
+                if options:
+                    record["options"] = json.loads(options)
+                yield record
+
+    def iter_redirects(self) -> Iterator[Tuple[str, str]]:
+        """Yield (lookup key, target title) for every redirect."""
+        cursor = self._db.cursor()
+        cursor.execute("SELECT key, target FROM redirects ORDER BY key")
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                return
+            yield from rows
+
+    def _article_row(self, key: str) -> Optional[tuple]:
+        return self._db.execute(
+            "SELECT title, summary, options FROM articles WHERE key = ?", (key,)
+        ).fetchone()
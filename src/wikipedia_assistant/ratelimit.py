@@ -0,0 +1,145 @@
+"""
+Non-blocking, adaptive per-host rate limiting for upstream requests.
+
+Each host gets a token bucket. Waiting for a token is an `asyncio.sleep`, so a
+throttled host never stalls unrelated work on the event loop. When the server
+pushes back (429/503, Retry-After, maxlag) the bucket halves its rate and
+pauses for the requested delay, then ramps back up additively on every
+successful request.
+"""
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional, Tuple
+
+# Upstream responses that mean "slow down" rather than "this request failed".
+RETRY_STATUSES = frozenset({429, 503})
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Return the delay in seconds from a Retry-After header, if present."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when - (time.time() if now is None else now))
+
+
+def backoff_delay(
+    attempt: int,
+    retry_after: Optional[float] = None,
+    *,
+    base: float = 0.5,
+    cap: float = 30.0,
+) -> float:
+    """
+    Delay before retry number `attempt` (0-based).
+
+    Honours the server's Retry-After with up to 10% jitter on top; otherwise
+    uses exponential backoff with full jitter.
+    """
+    if retry_after is not None:
+        return retry_after * random.uniform(1.0, 1.1)
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class AdaptiveTokenBucket:
+    """
+    Token bucket whose refill rate adapts to upstream feedback.
+
+    `reserve()` takes a token immediately and returns how long the caller must
+    wait for it, so concurrent callers queue fairly without a lock.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        *,
+        min_rate: float = 1.0,
+        decrease_factor: float = 0.5,
+        increase_step: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min(min_rate, rate)
+        self.decrease_factor = decrease_factor
+        self.increase_step = rate / 20 if increase_step is None else increase_step
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._blocked_until = 0.0
+
+    def reserve(self) -> float:
+        """Take one token and return the seconds to wait before using it."""
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        return max(wait, self._blocked_until - now)
+
+    async def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def succeeded(self) -> None:
+        """Ramp the rate back up after a request went through."""
+        self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def throttled(self, delay: float) -> None:
+        """Halve the rate and hold every caller back for `delay` seconds."""
+        now = self._clock()
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self._tokens = min(self._tokens, 0.0)
+        self._blocked_until = max(self._blocked_until, now + delay)
+
+
+class RateLimiter:
+    """
+    One AdaptiveTokenBucket per upstream host.
+
+    `per_host` maps a host name to its own (rate, burst); other hosts use the
+    defaults.
+    """
+
+    def __init__(
+        self,
+        rate: float = 50.0,
+        burst: int = 20,
+        *,
+        per_host: Optional[Dict[str, Tuple[float, int]]] = None,
+        min_rate: float = 1.0,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.per_host = per_host or {}
+        self._buckets: Dict[str, AdaptiveTokenBucket] = {}
+
+    def bucket(self, host: str) -> AdaptiveTokenBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate, burst = self.per_host.get(host, (self.rate, self.burst))
+            bucket = AdaptiveTokenBucket(rate, burst, min_rate=self.min_rate)
+            self._buckets[host] = bucket
+        return bucket
+
+    async def acquire(self, host: str) -> None:
+        await self.bucket(host).acquire()
+
+    def succeeded(self, host: str) -> None:
+        self.bucket(host).succeeded()
+
+    def throttled(self, host: str, delay: float) -> None:
+        self.bucket(host).throttled(delay)
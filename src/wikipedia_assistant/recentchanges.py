@@ -0,0 +1,190 @@
+"""
+Apply recent changes to the local OfflineStore.
+
+Reads a JSONL change log in the format of the Wikimedia EventStreams
+`recentchange` stream, one event per line, and applies page edits, new pages,
+renames, redirects and deletions in the article namespace to the store that
+answers fetch_wikipedia_info. The stream itself carries no page text, so edit
+and new-page events need a `text` field with the wikitext of the revision
+(added by whatever records the stream); edits without it are skipped.
+
+Events are applied in batches, each in one transaction together with the byte
+offset of the log consumed so far. A failed batch is rolled back as a whole,
+and a later run resumes after the last committed batch. The store is in WAL
+mode, so the server keeps reading the previous state while a batch applies.
+
+Only the SQLite store is updated. The BM25 search index, title index, vector
+index and block store built from it go stale: they miss new and renamed
+articles and still return deleted titles, which lookups skip when the store
+has no such article. Rebuild them after applying changes.
+
+    python -m wikipedia_assistant.recentchanges changes.jsonl --store wiki.sqlite3
+    python -m wikipedia_assistant.recentchanges changes.jsonl --store wiki.sqlite3 --follow
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from wikipedia_assistant.offline_store import OfflineStore
+from wikipedia_assistant.wikitext import (
+    disambiguation_options,
+    is_article_title,
+    is_disambiguation,
+    wikitext_lead,
+)
+
+_REDIRECT = re.compile(r"\s*#redirect\s*:?\s*\[\[([^\]|#]+)", re.I)
+
+
+def _redirect_target(text: str) -> Optional[str]:
+    match = _REDIRECT.match(text)
+    return " ".join(match.group(1).replace("_", " ").split()) if match else None
+
+
+def to_change(event: Dict[str, Any], wiki: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Convert a recentchange event to a change for `OfflineStore.apply_changes`.
+
+    Returns None for events that do not affect the store: other wikis, other
+    namespaces, log actions other than deletions, restores and moves, and
+    edits without page text.
+    """
+    if wiki and event.get("wiki", wiki) != wiki:
+        return None
+    if event.get("namespace", 0) != 0:
+        return None
+    title = event["title"]
+    kind = event.get("type")
+    if kind == "log":
+        action = event.get("log_action")
+        params = event.get("log_params") or {}
+        if action == "delete":
+            return {"action": "delete", "title": title}
+        if action in ("move", "move_redir"):
+            target = params.get("target", "")
+            if not is_article_title(target):
+                # Moved out of the article namespace.
+                return {"action": "delete", "title": title}
+            return {
+                "action": "move",
+                "title": title,
+                "target": target,
+                "redirect": str(params.get("noredir", "0")) != "1",
+            }
+        if action != "restore":
+            return None
+    elif kind not in ("edit", "new"):
+        return None
+    text = event.get("text")
+    if text is None:
+        return None
+    revision = (event.get("revision") or {}).get("new", 0)
+    target = _redirect_target(text)
+    if target is not None:
+        return {"action": "redirect", "title": title, "target": target, "revision": revision}
+    change = {
+        "action": "edit",
+        "title": title,
+        "summary": wikitext_lead(text),
+        "revision": revision,
+    }
+    if is_disambiguation(text):
+        change["options"] = disambiguation_options(text)
+    return change
+
+
+def _read_events(path: str, offset: int) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (end offset, event) for each complete line after `offset`."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # still being written
+            offset += len(line)
+            if line.strip():
+                yield offset, json.loads(line)
+
+
+def apply_log(
+    path: str,
+    store: OfflineStore,
+    *,
+    batch_size: int = 1000,
+    restart: bool = False,
+) -> Dict[str, int]:
+    """
+    Apply the events in `path` that were not applied before; return counts by action.
+
+    Each batch commits together with the byte offset it ends at, so an
+    interrupted run resumes after the last committed batch and a second run
+    over the same log only applies lines appended since.
+    """
+    progress_key = f"recentchanges:{os.path.abspath(path)}"
+    offset = 0 if restart else int(store.get_meta(progress_key) or 0)
+    wiki = store.lang.replace("-", "_") + "wiki"
+
+    counts: Dict[str, int] = {}
+    changes: List[Dict[str, Any]] = []
+    consumed = offset
+
+    def flush() -> None:
+        for action, count in store.apply_changes(changes, {progress_key: str(consumed)}).items():
+            counts[action] = counts.get(action, 0) + count
+        changes.clear()
+
+    for consumed, event in _read_events(path, offset):
+        change = to_change(event, wiki)
+        if change is None:
+            counts["skipped"] = counts.get("skipped", 0) + 1
+            continue
+        changes.append(change)
+        if len(changes) >= batch_size:
+            flush()
+    if changes or consumed != offset:
+        flush()
+    return counts
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Apply a recentchanges event log to a local offline store."
+    )
+    parser.add_argument("log", help="recentchange events, one JSON object per line")
+    parser.add_argument("--store", required=True, help="path of the SQLite store")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--restart", action="store_true", help="ignore saved progress")
+    parser.add_argument(
+        "--follow", action="store_true", help="keep applying lines appended to the log"
+    )
+    parser.add_argument(
+        "--interval", type=float, default=5.0, help="seconds between polls with --follow"
+    )
+    args = parser.parse_args(argv)
+
+    store = OfflineStore(args.store)
+    try:
+        restart = args.restart
+        while True:
+            counts = apply_log(
+                args.log, store, batch_size=args.batch_size, restart=restart
+            )
+            restart = False
+            if counts or not args.follow:
+                summary = ", ".join(f"{n} {action}" for action, n in sorted(counts.items()))
+                print(f"Applied {summary or 'no changes'}.", file=sys.stderr, flush=True)
+            if not args.follow:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+Record/replay HTTP transport for the Wikipedia client.
+
+In "record" mode every request goes upstream and its response is added to a
+fixture file when the client closes. In "replay" mode responses come from the
+file, so runs are offline and deterministic; with `strict` (the default) a
+request that was never recorded raises UnrecordedRequestError, otherwise it
+is fetched upstream and added to the file.
+
+Requests are matched by method, URL and query parameters, independent of
+parameter order. Fixture files carry a format version and are refused when it
+does not match FIXTURE_VERSION, so they are re-recorded rather than misread.
+
+    transport = RecordReplayTransport("fixtures/lookup.json", mode="replay")
+    client = WikipediaClient(transport=transport)
+"""
+import json
+import os
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode
+
+import httpx
+
+FIXTURE_VERSION = 1
+
+# Response headers worth keeping; the body is stored already decoded.
+_KEPT_HEADERS = ("content-type", "retry-after")
+
+
+class UnrecordedRequestError(Exception):
+    """Raised in strict replay mode for a request missing from the fixtures."""
+
+    def __init__(self, key: str, path: str):
+        super().__init__(f"No recorded response for {key} in {path}")
+        self.key = key
+        self.path = path
+
+
+def request_key(request: httpx.Request) -> str:
+    """Return the fixture key of `request`, with its query parameters sorted."""
+    url = request.url
+    query = urlencode(sorted(url.params.multi_items()))
+    return f"{request.method} {url.scheme}://{url.host}{url.path}?{query}"
+
+
+class RecordReplayTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport that records upstream responses to a JSON fixture file
+    and replays them.
+
+    `transport` is the upstream transport used while recording; it defaults
+    to a regular network transport, created on first use.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = "replay",
+        *,
+        strict: bool = True,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown fixture mode: {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.strict = strict
+        self._upstream = transport
+        self._interactions: Dict[str, Dict[str, Any]] = {}
+        self._changed = False
+        if os.path.exists(path):
+            try:
+                self._interactions = load_fixtures(path)
+            except ValueError:
+                # Recording replaces a fixture file of another version.
+                if mode == "replay":
+                    raise
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = request_key(request)
+        if self.mode == "replay":
+            recorded = self._interactions.get(key)
+            if recorded is not None:
+                return _replayed_response(recorded, request)
+            if self.strict:
+                raise UnrecordedRequestError(key, self.path)
+
+        if self._upstream is None:
+            self._upstream = httpx.AsyncHTTPTransport()
+        response = await self._upstream.handle_async_request(request)
+        body = await response.aread()
+        self._interactions[key] = _recorded_response(response, body)
+        self._changed = True
+        return httpx.Response(
+            response.status_code,
+            headers=[(k, v) for k, v in response.headers.items() if k in _KEPT_HEADERS],
+            content=body,
+            request=request,
+        )
+
+    def save(self) -> None:
+        """Write the recorded interactions, if any changed, to the fixture file."""
+        if not self._changed:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": FIXTURE_VERSION, "interactions": self._interactions},
+                f, indent=1, sort_keys=True, ensure_ascii=False,
+            )
+            f.write("\n")
+        self._changed = False
+
+    async def aclose(self) -> None:
+        self.save()
+        if self._upstream is not None:
+            await self._upstream.aclose()
+
+
+def load_fixtures(path: str) -> Dict[str, Dict[str, Any]]:
+    """Read a fixture file and return its interactions by request key."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != FIXTURE_VERSION:
+        raise ValueError(
+            f"{path} has fixture version {data.get('version')}, expected "
+            f"{FIXTURE_VERSION}; record it again"
+        )
+    return data["interactions"]
+
+
+def _recorded_response(response: httpx.Response, body: bytes) -> Dict[str, Any]:
+    headers = {k: v for k, v in response.headers.items() if k in _KEPT_HEADERS}
+    recorded: Dict[str, Any] = {"status": response.status_code, "headers": headers}
+    if "json" in headers.get("content-type", ""):
+        recorded["json"] = json.loads(body)
+    else:
+        recorded["text"] = body.decode("utf-8", errors="replace")
+    return recorded
+
+
+def _replayed_response(recorded: Dict[str, Any], request: httpx.Request) -> httpx.Response:
+    if "json" in recorded:
+        content = json.dumps(recorded["json"]).encode("utf-8")
+    else:
+        content = recorded["text"].encode("utf-8")
+    return httpx.Response(
+        recorded["status"], headers=recorded["headers"], content=content, request=request
+    )
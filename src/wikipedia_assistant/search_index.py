@@ -0,0 +1,336 @@
+"""
+Local BM25 full-text search over article titles and lead sections.
+
+The index is a single read-only file that is memory-mapped when opened.
+Postings are stored per term as doc-id gaps in the narrowest unsigned integer
+type that fits them, followed by term frequencies, so a term's postings decode
+with one `np.cumsum`. Scoring is vectorized with NumPy.
+
+File layout: the magic bytes, the postings section, then the vocabulary and
+document arrays, each aligned to 8 bytes, and finally a JSON footer with the
+section offsets followed by its length and the magic bytes again.
+
+Usage:
+    python -m wikipedia_assistant.search_index build --store wiki.sqlite3 --output wiki.bm25
+    python -m wikipedia_assistant.search_index merge --output all.bm25 a.bm25 b.bm25
+"""
+import argparse
+import heapq
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+from collections import Counter
+from typing import BinaryIO, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAGIC = b"WRABM25\x01"
+
+_TOKEN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the "
+    "to was were which with".split()
+)
+_WIDTHS = {1: np.uint8, 2: np.uint16, 4: np.uint32}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word tokens of `text`, without stop words."""
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def _gap_width(gaps: np.ndarray) -> int:
+    largest = int(gaps.max()) if len(gaps) else 0
+    return 1 if largest < 1 << 8 else 2 if largest < 1 << 16 else 4
+
+
+class _IndexWriter:
+    """Writes an index file section by section."""
+
+    def __init__(self, path: str):
+        self._file: BinaryIO = open(path, "wb")
+        self._file.write(MAGIC)
+        self._sections: Dict[str, Tuple[int, int]] = {}
+        self._terms: List[str] = []
+        self._df: List[int] = []
+        self._first: List[int] = []
+        self._offsets: List[int] = []
+        self._widths: List[int] = []
+        self._postings_start = self._file.tell()
+
+    def add_postings(self, term: str, doc_ids: np.ndarray, tfs: np.ndarray) -> None:
+        """Append one term's postings; terms must arrive in sorted order."""
+        gaps = np.diff(doc_ids, prepend=doc_ids[0])
+        width = _gap_width(gaps)
+        self._terms.append(term)
+        self._df.append(len(doc_ids))
+        self._first.append(int(doc_ids[0]))
+        self._offsets.append(self._file.tell() - self._postings_start)
+        self._widths.append(width)
+        self._file.write(gaps.astype(_WIDTHS[width]).tobytes())
+        self._file.write(np.minimum(tfs, 0xFFFF).astype(np.uint16).tobytes())
+
+    def _section(self, name: str, data: bytes) -> None:
+        self._file.write(b"\0" * (-self._file.tell() % 8))
+        self._sections[name] = (self._file.tell(), len(data))
+        self._file.write(data)
+
+    def finish(self, titles: Sequence[str], doc_lengths: np.ndarray) -> None:
+        self._sections["postings"] = (
+            self._postings_start,
+            self._file.tell() - self._postings_start,
+        )
+        encoded = [t.encode("utf-8") for t in titles]
+        title_offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+        np.cumsum([len(t) for t in encoded], out=title_offsets[1:])
+        self._section("df", np.array(self._df, dtype=np.uint32).tobytes())
+        self._section("first", np.array(self._first, dtype=np.uint32).tobytes())
+        self._section("offsets", np.array(self._offsets, dtype=np.uint64).tobytes())
+        self._section("widths", np.array(self._widths, dtype=np.uint8).tobytes())
+        self._section("terms", "\n".join(self._terms).encode("utf-8"))
+        self._section("doc_lengths", doc_lengths.astype(np.uint32).tobytes())
+        self._section("title_offsets", title_offsets.tobytes())
+        self._section("titles", b"".join(encoded))
+        footer = json.dumps({
+            "doc_count": len(titles),
+            "term_count": len(self._terms),
+            "sections": self._sections,
+        }).encode("utf-8")
+        self._file.write(footer)
+        self._file.write(struct.pack("<Q", len(footer)) + MAGIC)
+        self._file.close()
+
+
+class SearchIndex:
+    """
+    Read-only, memory-mapped BM25 index.
+
+    Several processes opening the same file share its pages through the OS
+    page cache.
+    """
+
+    def __init__(self, path: str, *, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != MAGIC or self._mm[-8:] != MAGIC:
+            raise ValueError(f"{path} is not a search index")
+        (footer_len,) = struct.unpack("<Q", self._mm[-16:-8])
+        footer = json.loads(self._mm[-16 - footer_len:-16])
+        self.doc_count: int = footer["doc_count"]
+        sections = footer["sections"]
+
+        self._postings_start = sections["postings"][0]
+        self._df = self._array(sections["df"], np.uint32)
+        self._first = self._array(sections["first"], np.uint32)
+        self._offsets = self._array(sections["offsets"], np.uint64)
+        self._widths = self._array(sections["widths"], np.uint8)
+        self.doc_lengths = self._array(sections["doc_lengths"], np.uint32)
+        self._title_offsets = self._array(sections["title_offsets"], np.uint64)
+        self._titles_start = sections["titles"][0]
+        start, length = sections["terms"]
+        terms = self._mm[start:start + length].decode("utf-8").split("\n")
+        self._terms: Dict[str, int] = {t: i for i, t in enumerate(terms) if t}
+
+        avgdl = float(self.doc_lengths.mean()) if self.doc_count else 1.0
+        self._norm = (
+            k1 * (1 - b + b * self.doc_lengths / max(avgdl, 1e-9))
+        ).astype(np.float32)
+
+    def _array(self, section: Sequence[int], dtype) -> np.ndarray:
+        offset, length = section
+        count = length // np.dtype(dtype).itemsize
+        return np.frombuffer(self._mm, dtype=dtype, count=count, offset=offset)
+
+    def close(self) -> None:
+        for name in ("_df", "_first", "_offsets", "_widths", "doc_lengths", "_title_offsets"):
+            setattr(self, name, None)
+        try:
+            self._mm.close()
+        except BufferError:
+            # Arrays returned by postings() still view the map; it is
+            # released once they are garbage collected.
+            pass
+
+    def __len__(self) -> int:
+        return self.doc_count
+
+    @property
+    def terms(self) -> List[str]:
+        return sorted(self._terms, key=self._terms.__getitem__)
+
+    def title(self, doc_id: int) -> str:
+        start = self._titles_start + int(self._title_offsets[doc_id])
+        end = self._titles_start + int(self._title_offsets[doc_id + 1])
+        return self._mm[start:end].decode("utf-8")
+
+    def postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the (doc_ids, term_frequencies) arrays for `term`."""
+        index = self._terms.get(term)
+        if index is None:
+            empty = np.zeros(0, dtype=np.uint32)
+            return empty, empty.astype(np.uint16)
+        df = int(self._df[index])
+        width = int(self._widths[index])
+        start = self._postings_start + int(self._offsets[index])
+        gaps = np.frombuffer(self._mm, dtype=_WIDTHS[width], count=df, offset=start)
+        tfs = np.frombuffer(self._mm, dtype=np.uint16, count=df, offset=start + df * width)
+        doc_ids = np.cumsum(gaps, dtype=np.uint32)
+        doc_ids += self._first[index]
+        return doc_ids, tfs
+
+    def top_k(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Return up to `k` (title, score) pairs ranked by BM25."""
+        doc_parts = []
+        score_parts = []
+        for term in set(tokenize(query)):
+            doc_ids, tfs = self.postings(term)
+            if not len(doc_ids):
+                continue
+            df = len(doc_ids)
+            idf = np.log1p((self.doc_count - df + 0.5) / (df + 0.5))
+            tf = tfs.astype(np.float32)
+            doc_parts.append(doc_ids)
+            score_parts.append(idf * tf * (self.k1 + 1) / (tf + self._norm[doc_ids]))
+        if not doc_parts:
+            return []
+
+        if len(doc_parts) == 1:
+            candidates, scores = doc_parts[0], score_parts[0]
+        else:
+            # Sum per-term scores over the union of matching documents only,
+            # so cost follows the postings touched rather than corpus size.
+            candidates, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        if len(candidates) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            candidates, scores = candidates[top], scores[top]
+        # Ties are broken by doc id, so results are deterministic.
+        order = np.lexsort((candidates, -scores))
+        return [(self.title(int(candidates[i])), float(scores[i])) for i in order]
+
+    def search(self, query: str, results: int = 10) -> List[str]:
+        """Return the titles of the best matches, like WikipediaClient.search."""
+        return [title for title, _ in self.top_k(query, results)]
+
+
+def _write_segment(path: str, docs: List[Tuple[str, str]]) -> None:
+    postings: Dict[str, Tuple[List[int], List[int]]] = {}
+    lengths = np.zeros(len(docs), dtype=np.uint32)
+    for doc_id, (title, text) in enumerate(docs):
+        # Title tokens are counted twice so title matches outrank passing mentions.
+        counts = Counter(tokenize(title) * 2 + tokenize(text))
+        lengths[doc_id] = sum(counts.values())
+        for term, tf in counts.items():
+            ids, tfs = postings.setdefault(term, ([], []))
+            ids.append(doc_id)
+            tfs.append(tf)
+
+    writer = _IndexWriter(path)
+    for term in sorted(postings):
+        ids, tfs = postings[term]
+        writer.add_postings(term, np.array(ids, dtype=np.uint32), np.array(tfs))
+    writer.finish([title for title, _ in docs], lengths)
+
+
+def merge(paths: Sequence[str], output: str) -> None:
+    """Merge indexes into one, appending their documents in the given order."""
+    indexes = [SearchIndex(path) for path in paths]
+    try:
+        bases = np.cumsum([0] + [len(index) for index in indexes])
+        writer = _IndexWriter(output)
+        previous = None
+        for term in heapq.merge(*(index.terms for index in indexes)):
+            # heapq.merge yields a term once per index that has it.
+            if term == previous:
+                continue
+            previous = term
+            ids, tfs = [], []
+            for base, index in zip(bases, indexes):
+                doc_ids, term_tfs = index.postings(term)
+                if len(doc_ids):
+                    ids.append(doc_ids.astype(np.uint32) + np.uint32(base))
+                    tfs.append(term_tfs)
+            writer.add_postings(term, np.concatenate(ids), np.concatenate(tfs))
+        titles = [index.title(i) for index in indexes for i in range(len(index))]
+        writer.finish(titles, np.concatenate([index.doc_lengths for index in indexes]))
+    finally:
+        for index in indexes:
+            index.close()
+
+
+def build(
+    docs: Iterable[Tuple[str, str]], output: str, *, segment_docs: int = 100000
+) -> int:
+    """
+    Build an index from (title, text) pairs and return the document count.
+
+    Documents are indexed in segments of `segment_docs` so memory stays
+    bounded; the segments are then merged into `output`.
+    """
+    directory = os.path.dirname(os.path.abspath(output))
+    segments: List[str] = []
+    batch: List[Tuple[str, str]] = []
+    count = 0
+    try:
+        for doc in docs:
+            batch.append(doc)
+            count += 1
+            if len(batch) >= segment_docs:
+                segments.append(_flush_segment(batch, directory))
+                batch = []
+        if batch or not segments:
+            segments.append(_flush_segment(batch, directory))
+        if len(segments) == 1:
+            os.replace(segments.pop(), output)
+        else:
+            merge(segments, output)
+    finally:
+        for segment in segments:
+            os.remove(segment)
+    return count
+
+
+def _flush_segment(docs: List[Tuple[str, str]], directory: str) -> str:
+    fd, path = tempfile.mkstemp(suffix=".segment", dir=directory)
+    os.close(fd)
+    _write_segment(path, docs)
+    return path
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build or merge BM25 search indexes.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_cmd = commands.add_parser("build", help="index an offline store")
+    build_cmd.add_argument("--store", required=True, help="offline store to index")
+    build_cmd.add_argument("--output", required=True)
+    build_cmd.add_argument("--segment-docs", type=int, default=100000)
+    merge_cmd = commands.add_parser("merge", help="merge existing indexes")
+    merge_cmd.add_argument("--output", required=True)
+    merge_cmd.add_argument("inputs", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        from wikipedia_assistant.offline_store import OfflineStore
+
+        store = OfflineStore(args.store, readonly=True)
+        try:
+            count = build(
+                store.iter_articles(), args.output, segment_docs=args.segment_docs
+            )
+        finally:
+            store.close()
+        print(f"Indexed {count} articles into {args.output}.")
+    else:
+        merge(args.inputs, args.output)
+        print(f"Merged {len(args.inputs)} indexes into {args.output}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
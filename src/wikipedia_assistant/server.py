@@ -1,39 +1,905 @@
-import wikipedia
+import argparse
+import asyncio
+import base64
+import binascii
+import contextlib
+import dataclasses
+import functools
+import importlib
+import json
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional, Sequence, Set, Tuple, Union, cast
+
+import httpx
 from mcp.server.fastmcp import FastMCP
+from mcp.types import TextContent
+
+from wikipedia_assistant.block_store import BlockStore, is_block_store
+from wikipedia_assistant.cache import DEFAULT_CACHE_PATH, NegativeCache, ResultCache, make_key
+from wikipedia_assistant.metrics import METRICS, TOOL_SECONDS
+from wikipedia_assistant.models import (
+    NO_RESULTS,
+    PAGE_NOT_FOUND,
+    ArticleResult,
+    DisambiguationResult,
+    ErrorCode,
+    ErrorResult,
+    ResolvedResult,
+    Result,
+    encode,
+)
+from wikipedia_assistant.offline_store import OfflineStore
+from wikipedia_assistant.ratelimit import RateLimiter
+from wikipedia_assistant.singleflight import SingleFlight
+from wikipedia_assistant.wikipedia_client import (
+    DisambiguationError,
+    PageError,
+    WikipediaClient,
+    WikipediaError,
+)
+
+
+# Modules only tool calls need; they pull in NumPy, so they are imported on a
+# background thread once the server runs instead of before the handshake.
+_DEFERRED_IMPORTS = (
+    "wikipedia_assistant.disambiguation",
+    "wikipedia_assistant.summarizer",
+)
+
+
+def _preload() -> None:
+    for name in _DEFERRED_IMPORTS:
+        importlib.import_module(name)
+
+
+@contextlib.asynccontextmanager
+async def _lifespan(app):
+    threading.Thread(target=_preload, name="preload", daemon=True).start()
+    start_warmer()
+    yield {}
+
+
+mcp = FastMCP("WikipediaSearch", lifespan=_lifespan)
+
+Backend = Union[WikipediaClient, OfflineStore, BlockStore]
+
+# One lookup outcome: a result dict, None when nothing matched, or the error.
+Outcome = Union[dict, None, Exception]
+
+_client: Optional[Backend] = None
+# Clients for languages other than the default one, derived from _client,
+# least recently used first.
+_lang_clients: "OrderedDict[str, WikipediaClient]" = OrderedDict()
+
+# Seconds an evicted language client stays open for the calls still using it.
+EVICTED_CLIENT_GRACE = 60.0
+
+# Language codes such as "en", "simple", "zh-yue" or "be-tarask".
+_LANG_CODE = re.compile(r"[a-z]{2,12}(?:-[a-z]{2,12})*")
+
+_UNSET: Any = object()
+_cache: Any = _UNSET
+_negative_cache: Any = _UNSET
+_vector_index: Any = _UNSET
+
+# Concurrent calls for the same normalized query share one upstream lookup.
+_inflight = SingleFlight()
+
+# Upper bound on sections returned by one fetch_wikipedia_section call.
+MAX_SECTIONS_PER_PAGE = 10
+
+_CACHE_HIT = (("result", "hit"),)
+_CACHE_MISS = (("result", "miss"),)
+_CACHE_STALE = (("result", "stale"),)
+_CACHE_NEGATIVE = (("result", "negative"),)
+
+_NO_SEMANTIC_INDEX = ErrorResult(
+    ErrorCode.UNSUPPORTED,
+    "Semantic search needs a semantic index for this language (WIKIPEDIA_VECTOR_INDEX).",
+)
+
+# Failures of Wikipedia itself, reported as upstream errors.
+_UPSTREAM_ERRORS = (httpx.HTTPError, WikipediaError)
+
+# Failures that are remembered in the negative cache.
+_NEGATIVE_CODES = (ErrorCode.NO_RESULTS, ErrorCode.PAGE_NOT_FOUND)
+
+# Background tasks (cache warming and stale-entry refreshes) are referenced
+# here until they finish, so they are not garbage-collected mid-flight.
+_background: Set["asyncio.Task[Any]"] = set()
+# Cache keys with a refresh under way.
+_refreshing: Set[str] = set()
+_warm_started = False
+
+
+def create_backend(
+    backend: str = "online",
+    store: Optional[str] = None,
+    search_index: Optional[str] = None,
+    title_index: Optional[str] = None,
+) -> Backend:
+    """
+    Build the lookup backend: the live Wikipedia API, or a local store
+    produced by `python -m wikipedia_assistant.dump` or packed by
+    `python -m wikipedia_assistant.block_store`. Either one can use a local
+    BM25 index for the search step and a local title index that resolves
+    misspelled titles without a search.
+    """
+    if search_index:
+        from wikipedia_assistant.search_index import SearchIndex
+
+        index = SearchIndex(search_index)
+    else:
+        index = None
+    if title_index:
+        from wikipedia_assistant.title_index import TitleIndex
+
+        titles = TitleIndex(title_index)
+    else:
+        titles = None
+    if backend == "offline":
+        if not store:
+            raise ValueError("The offline backend needs a store path.")
+        if is_block_store(store):
+            return BlockStore(store, search_index=index, title_index=titles)
+        return OfflineStore(store, readonly=True, search_index=index, title_index=titles)
+    if backend != "online":
+        raise ValueError(f"Unknown backend: {backend!r}")
+    return WikipediaClient(
+        lang=os.environ.get("WIKIPEDIA_LANGUAGE", "en"),
+        max_connections=int(os.environ.get("WIKIPEDIA_MAX_CONNECTIONS", "20")),
+        search_index=index,
+        title_index=titles,
+        rate_limiter=RateLimiter(
+            rate=float(os.environ.get("WIKIPEDIA_RATE_LIMIT", "50")),
+            burst=int(os.environ.get("WIKIPEDIA_RATE_BURST", "20")),
+        ),
+        maxlag=int(os.environ["WIKIPEDIA_MAXLAG"]) if os.environ.get("WIKIPEDIA_MAXLAG") else None,
+        api_url=os.environ.get("WIKIPEDIA_API_URL") or None,
+    )
+
+
+def get_client(lang: Optional[str] = None) -> Backend:
+    """
+    Return the lookup backend for `lang`, creating it on first use.
+
+    WIKIPEDIA_BACKEND selects "online" (default) or "offline",
+    WIKIPEDIA_OFFLINE_STORE names the store used by the offline backend,
+    WIKIPEDIA_SEARCH_INDEX an optional local BM25 index and
+    WIKIPEDIA_TITLE_INDEX an optional local title index. Without `lang`, or
+    for the backend's own language, the shared backend is returned; other
+    languages get their own online client with a separate connection pool,
+    so mixed-language calls run in parallel. At most WIKIPEDIA_MAX_LANGUAGES
+    of those are kept (default 16); the least recently used one is closed
+    to make room. Raises ValueError for malformed language codes and for
+    other languages on the offline backend.
+    """
+    global _client
+    if _client is None:
+        _client = create_backend(
+            os.environ.get("WIKIPEDIA_BACKEND", "online"),
+            os.environ.get("WIKIPEDIA_OFFLINE_STORE"),
+            os.environ.get("WIKIPEDIA_SEARCH_INDEX"),
+            os.environ.get("WIKIPEDIA_TITLE_INDEX"),
+        )
+    if lang is None or lang == _client.lang:
+        return _client
+    if not _LANG_CODE.fullmatch(lang):
+        raise ValueError(f"Unsupported language code: {lang!r}.")
+    if not isinstance(_client, WikipediaClient):
+        raise ValueError(f"The offline store has no articles in language {lang!r}.")
+    client = _lang_clients.get(lang)
+    if client is not None:
+        _lang_clients.move_to_end(lang)
+        return client
+    client = _lang_clients[lang] = _client.for_language(lang)
+    limit = int(os.environ.get("WIKIPEDIA_MAX_LANGUAGES", "16"))
+    while len(_lang_clients) > max(limit, 1):
+        _, evicted = _lang_clients.popitem(last=False)
+        _spawn(_close_later(evicted))
+    return client
+
+
+async def _close_later(client: WikipediaClient) -> None:
+    # Calls that got the client before it was evicted may still be using it.
+    await asyncio.sleep(EVICTED_CLIENT_GRACE)
+    await client.aclose()
+
+
+def set_client(client: Optional[Backend]) -> None:
+    """Replace the shared lookup backend (used by tests and embedders)."""
+    global _client
+    _client = client
+    _lang_clients.clear()
+
+
+async def close_client() -> None:
+    """Close the shared lookup backend and its connection pools, if any."""
+    global _client
+    clients: List[Backend] = list(_lang_clients.values())
+    _lang_clients.clear()
+    if _client is not None:
+        clients.append(_client)
+        _client = None
+    for client in clients:
+        await client.aclose()
+
+
+def get_cache() -> Optional[ResultCache]:
+    """
+    Return the shared result cache, creating it on first use.
+
+    Set WIKIPEDIA_CACHE_PATH to an empty string to disable caching. Entries
+    live for WIKIPEDIA_CACHE_TTL seconds; from WIKIPEDIA_CACHE_REFRESH_AHEAD
+    seconds before expiry until WIKIPEDIA_CACHE_STALE_TTL seconds after it
+    they are still served while a background refresh runs.
+    """
+    global _cache
+    if _cache is _UNSET:
+        path = os.environ.get("WIKIPEDIA_CACHE_PATH", DEFAULT_CACHE_PATH)
+        _cache = ResultCache(
+            os.path.expanduser(path),
+            ttl=float(os.environ.get("WIKIPEDIA_CACHE_TTL", "86400")),
+            max_entries=int(os.environ.get("WIKIPEDIA_CACHE_MAX_ENTRIES", "10000")),
+            stale_ttl=float(os.environ.get("WIKIPEDIA_CACHE_STALE_TTL", "86400")),
+            refresh_ahead=float(os.environ.get("WIKIPEDIA_CACHE_REFRESH_AHEAD", "3600")),
+        ) if path else None
+    return _cache
+
+
+def set_cache(cache: Optional[ResultCache]) -> None:
+    """Replace the shared result cache; None disables caching."""
+    global _cache
+    _cache = cache
+
+
+def get_negative_cache() -> Optional[NegativeCache]:
+    """
+    Return the shared cache of failed lookups, creating it on first use.
+
+    Failures are kept for WIKIPEDIA_NEGATIVE_CACHE_TTL seconds (default 300;
+    0 disables the cache), at most WIKIPEDIA_NEGATIVE_CACHE_MAX_ENTRIES of
+    them (default 1000).
+    """
+    global _negative_cache
+    if _negative_cache is _UNSET:
+        ttl = float(os.environ.get("WIKIPEDIA_NEGATIVE_CACHE_TTL", "300"))
+        _negative_cache = NegativeCache(
+            ttl=ttl,
+            max_entries=int(os.environ.get("WIKIPEDIA_NEGATIVE_CACHE_MAX_ENTRIES", "1000")),
+        ) if ttl > 0 else None
+    return _negative_cache
+
+
+def set_negative_cache(cache: Optional[NegativeCache]) -> None:
+    """Replace the shared cache of failed lookups; None disables it."""
+    global _negative_cache
+    _negative_cache = cache
+
+
+def get_vector_index() -> Any:
+    """
+    Return the shared semantic index, opening it on first use.
+
+    WIKIPEDIA_VECTOR_INDEX names an index built by
+    `python -m wikipedia_assistant.vector_index`; without it there is no
+    semantic search. WIKIPEDIA_VECTOR_NPROBE sets the IVF lists scanned per
+    query (default 16) and WIKIPEDIA_VECTOR_MIN_SCORE the lowest similarity
+    that counts as a match (default 0.1).
+    """
+    global _vector_index
+    if _vector_index is _UNSET:
+        path = os.environ.get("WIKIPEDIA_VECTOR_INDEX")
+        if path:
+            from wikipedia_assistant.vector_index import VectorIndex
+
+            _vector_index = VectorIndex(
+                path,
+                nprobe=int(os.environ.get("WIKIPEDIA_VECTOR_NPROBE", "16")),
+                min_score=float(os.environ.get("WIKIPEDIA_VECTOR_MIN_SCORE", "0.1")),
+            )
+        else:
+            _vector_index = None
+    return _vector_index
+
+
+def set_vector_index(index: Any) -> None:
+    """Replace the shared semantic index; None disables semantic search."""
+    global _vector_index
+    _vector_index = index
+
+
+def _vector_index_for(client: Backend) -> Any:
+    index = get_vector_index()
+    return index if index is not None and index.lang == client.lang else None
+
+
+async def _semantic_outcomes(
+    client: Backend, index: Any, queries: Sequence[str]
+) -> List[Outcome]:
+    """
+    Resolve `queries` to the articles the semantic index ranks first, with
+    one outcome per query as in `client.lookup_many`.
+    """
+    loop = asyncio.get_running_loop()
+    with METRICS.time("semantic"):
+        # The matrix products release the GIL; keep them off the event loop.
+        hits = await loop.run_in_executor(None, index.search_many, list(queries), 1)
+
+    async def load(titles: List[str]) -> Outcome:
+        if not titles:
+            return None
+        try:
+            return await client.page(titles[0])
+        except _UPSTREAM_ERRORS as e:
+            return e
+
+    with METRICS.time("page"):
+        return list(await asyncio.gather(*(load(titles) for titles in hits)))
+
+
+def _is_negative(result: Result) -> bool:
+    return isinstance(result, ErrorResult) and result.code in _NEGATIVE_CODES
+
+
+def _spawn(coro) -> "asyncio.Task[Any]":
+    task = asyncio.ensure_future(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    return task
+
+
+def _refresh_later(client: Backend, cache: ResultCache, queries: Sequence[str]) -> None:
+    """Refresh the cache entries of `queries` in the background, once per key."""
+    keys = {make_key(q, client.lang): q for q in queries}
+    for key in _refreshing.intersection(keys):
+        del keys[key]
+    if keys:
+        _refreshing.update(keys)
+        _spawn(_refresh(client, cache, keys))
+
+
+async def _refresh(client: Backend, cache: ResultCache, keys: dict) -> None:
+    queries = list(keys.values())
+    try:
+        outcomes = await client.lookup_many(queries)
+        for query, outcome in zip(queries, outcomes):
+            if isinstance(outcome, dict):
+                cache.set_json(query, client.lang, _to_result(outcome).to_json())
+    except Exception as e:
+        # The stale entries keep being served until their window closes.
+        print(f"Cache refresh failed: {e!r}", file=sys.stderr)
+    finally:
+        _refreshing.difference_update(keys)
+
+
+def start_warmer() -> Optional["asyncio.Task[Any]"]:
+    """
+    Start prefetching popular articles into the cache in the background.
+
+    Runs once per process when WIKIPEDIA_WARM_FILE names a title list or
+    pageviews dump (see `wikipedia_assistant.warmer`), the online backend is
+    in use and caching is on. WIKIPEDIA_WARM_LIMIT caps the number of titles
+    (default 1000) and WIKIPEDIA_WARM_CONCURRENCY the batches in flight
+    (default 4).
+    """
+    global _warm_started
+    path = os.environ.get("WIKIPEDIA_WARM_FILE")
+    if _warm_started or not path:
+        return None
+    client, cache = get_client(), get_cache()
+    if cache is None or not isinstance(client, WikipediaClient):
+        return None
+    _warm_started = True
+    return _spawn(_warm(path, client, cache))
+
+
+async def _warm(path: str, client: WikipediaClient, cache: ResultCache) -> None:
+    from wikipedia_assistant import warmer
 
-mcp = FastMCP("WikipediaSearch")
+    try:
+        # Pageviews dumps are large; read them off the event loop.
+        titles = await asyncio.get_running_loop().run_in_executor(
+            None, warmer.read_titles, path, client.lang,
+            int(os.environ.get("WIKIPEDIA_WARM_LIMIT", "1000")),
+        )
+        count = await warmer.warm(
+            client, cache, titles,
+            concurrency=int(os.environ.get("WIKIPEDIA_WARM_CONCURRENCY", "4")),
+        )
+    except Exception as e:
+        print(f"Cache warming failed: {e!r}", file=sys.stderr)
+    else:
+        print(f"Warmed {count} of {len(titles)} popular articles", file=sys.stderr)
+
+
+def _to_result(outcome: Outcome) -> Result:
+    """Turn a client lookup outcome into the result returned by the tools."""
+    if outcome is None:
+        return NO_RESULTS
+    if isinstance(outcome, DisambiguationError):
+        return DisambiguationResult(outcome.title, outcome.options, [])
+    if isinstance(outcome, PageError):
+        return PAGE_NOT_FOUND
+    if isinstance(outcome, Exception):
+        return _upstream_error(outcome)
+    return ArticleResult(outcome["title"], outcome["summary"], outcome["url"])
+
+
+def _upstream_error(error: Exception) -> ErrorResult:
+    """Report a timeout, HTTP error or API error from Wikipedia."""
+    detail = str(error) or type(error).__name__
+    return ErrorResult(ErrorCode.UPSTREAM_ERROR, f"Wikipedia request failed: {detail}")
+
+
+async def _disambiguate(client: Backend, query: str, error: DisambiguationError) -> Result:
+    """Rank the options of `error`, or list them when their pages fail to load."""
+    from wikipedia_assistant import disambiguation
+
+    try:
+        return await disambiguation.resolve(client, query, error)
+    except _UPSTREAM_ERRORS:
+        return _to_result(error)
+
+
+def _to_dict(result: Any) -> Any:
+    if isinstance(result, list):
+        return [_to_dict(item) for item in result]
+    return result if isinstance(result, dict) else result.to_dict()
 
-@mcp.tool()
-def fetch_wikipedia_info(query: str) -> dict:
+
+def _to_content(result: Any) -> List[TextContent]:
+    if isinstance(result, list):
+        return [content for item in result for content in _to_content(item)]
+    text = encode(result) if isinstance(result, dict) else result.to_json()
+    return [TextContent(type="text", text=text)]
+
+
+def _tool(fn):
+    """
+    Register `fn` as an MCP tool.
+
+    MCP clients get each result's JSON as text content, reusing the encoded
+    form of cached results instead of going through FastMCP's generic
+    serialization. Python callers of the returned function get plain dicts.
+    """
+    @functools.wraps(fn)
+    async def call_tool(*args, **kwargs):
+        with METRICS.time(fn.__name__, TOOL_SECONDS, "tool"):
+            result = await fn(*args, **kwargs)
+            with METRICS.time("encode"):
+                return _to_content(result)
+
+    @functools.wraps(fn)
+    async def call(*args, **kwargs):
+        return _to_dict(await fn(*args, **kwargs))
+
+    mcp.tool()(call_tool)
+    return call
+
+
+def _fit_budget(
+    result: Result,
+    max_sentences: Optional[int],
+    max_chars: Optional[int],
+    max_tokens: Optional[int],
+) -> Result:
+    """
+    Shrink the summary of a successful result to the caller's size budget.
+
+    MAX_SUMMARY_LENGTH, when set, is the default character budget.
+    """
+    if max_chars is None and os.environ.get("MAX_SUMMARY_LENGTH"):
+        max_chars = int(os.environ["MAX_SUMMARY_LENGTH"])
+    if not isinstance(result, (ArticleResult, ResolvedResult)) or (
+        max_sentences is None and max_chars is None and max_tokens is None
+    ):
+        return result
+    from wikipedia_assistant.summarizer import summarize
+
+    with METRICS.time("summarize"):
+        summary = summarize(
+            result.summary,
+            max_sentences=max_sentences,
+            max_chars=max_chars,
+            max_tokens=max_tokens,
+        )
+    if summary == result.summary:
+        return result
+    return dataclasses.replace(result, summary=summary)
+
+
+@_tool
+async def fetch_wikipedia_info(
+    query: str,
+    max_sentences: Optional[int] = None,
+    max_chars: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+    resolve_disambiguation: bool = True,
+    lang: Optional[str] = None,
+    semantic: bool = False,
+) -> Result:
     """
     Search Wikipedia for a topic and return title, summary, and URL of the best match.
+
+    lang selects the Wikipedia language edition, such as "de" or "fr";
+    by default the server's configured language is used.
+
+    Set semantic to true for descriptive queries that do not name the topic,
+    such as "that thing where plants make sugar from light": the match then
+    comes from a local semantic index of titles and lead sections instead of
+    the keyword search. When the keyword search finds nothing, the semantic
+    index is tried as well. Needs a configured semantic index.
+
+    Optionally limit the summary to at most max_sentences sentences,
+    max_chars characters or roughly max_tokens tokens; the most
+    representative sentences are kept.
+
+    Ambiguous topics are resolved in the same call: the meaning that best
+    matches the query is returned with the others as "alternatives", or, when
+    no meaning stands out, an "ambiguous" error lists "candidates" with
+    snippets. Set resolve_disambiguation to false to get only the options.
+    """
+    budget = (max_sentences, max_chars, max_tokens)
+    try:
+        client = get_client(lang)
+    except ValueError as e:
+        return ErrorResult(ErrorCode.UNSUPPORTED, str(e))
+    vectors = _vector_index_for(client)
+    if semantic and vectors is None:
+        return _NO_SEMANTIC_INDEX
+    # The caches are keyed by query alone, so semantic lookups bypass them.
+    cache = None if semantic else get_cache()
+    if cache is not None:
+        with METRICS.time("cache"):
+            cached, stale = cache.lookup_json(query, client.lang)
+        if cached is not None:
+            if stale:
+                METRICS.inc("wikipedia_cache_requests_total", _CACHE_STALE)
+                _refresh_later(client, cache, [query])
+            else:
+                METRICS.inc("wikipedia_cache_requests_total", _CACHE_HIT)
+            return _fit_budget(ArticleResult.from_json(cached), *budget)
+    negative = None if semantic else get_negative_cache()
+    if negative is not None:
+        failure = negative.get(query, client.lang)
+        if failure is not None:
+            METRICS.inc("wikipedia_cache_requests_total", _CACHE_NEGATIVE)
+            return failure
+    if cache is not None:
+        METRICS.inc("wikipedia_cache_requests_total", _CACHE_MISS)
+
+    outcome: Outcome
+    try:
+        if semantic:
+            outcome = None
+        else:
+            outcome = await _inflight.do(
+                make_key(query, client.lang), lambda: client.lookup(query)
+            )
+        if outcome is None and vectors is not None:
+            (outcome,) = await _semantic_outcomes(client, vectors, [query])
+            if isinstance(outcome, Exception):
+                raise outcome
+        result = _to_result(outcome)
+    except DisambiguationError as e:
+        if resolve_disambiguation:
+            with METRICS.time("disambiguation"):
+                result = await _disambiguate(client, query, e)
+        else:
+            result = _to_result(e)
+    except _UPSTREAM_ERRORS as e:
+        result = _to_result(e)
+
+    if cache is not None and isinstance(result, ArticleResult):
+        cache.set_json(query, client.lang, result.to_json())
+    elif negative is not None and _is_negative(result):
+        negative.set(query, client.lang, result)
+    return _fit_budget(result, *budget)
+
+
+@_tool
+async def fetch_wikipedia_info_batch(
+    queries: List[str],
+    max_sentences: Optional[int] = None,
+    max_chars: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+    resolve_disambiguation: bool = True,
+    lang: Optional[str] = None,
+    semantic: bool = False,
+) -> List[Result]:
+    """
+    Look up several topics at once and return one result per query, in order.
+
+    Each result has the same shape as fetch_wikipedia_info, and the optional
+    budgets, resolve_disambiguation, lang and semantic apply to every query.
+    Prefer this tool when researching many related topics in one step.
+    """
+    try:
+        client = get_client(lang)
+    except ValueError as e:
+        return [ErrorResult(ErrorCode.UNSUPPORTED, str(e))] * len(queries)
+    vectors = _vector_index_for(client)
+    if semantic and vectors is None:
+        return [_NO_SEMANTIC_INDEX] * len(queries)
+    cache = None if semantic else get_cache()
+    negative = None if semantic else get_negative_cache()
+    results: List[Optional[Result]] = [None] * len(queries)
+    misses = []
+    stale = []
+    failures = 0
+    with METRICS.time("cache"):
+        for index, query in enumerate(queries):
+            cached, refresh = (
+                cache.lookup_json(query, client.lang) if cache is not None else (None, True)
+            )
+            failure = (
+                negative.get(query, client.lang)
+                if cached is None and negative is not None else None
+            )
+            if cached is not None:
+                results[index] = ArticleResult.from_json(cached)
+                if refresh:
+                    stale.append(query)
+            elif failure is not None:
+                results[index] = failure
+                failures += 1
+            else:
+                misses.append(index)
+    if cache is not None:
+        hits = len(queries) - len(misses) - len(stale) - failures
+        METRICS.inc("wikipedia_cache_requests_total", _CACHE_HIT, hits)
+        METRICS.inc("wikipedia_cache_requests_total", _CACHE_STALE, len(stale))
+        METRICS.inc("wikipedia_cache_requests_total", _CACHE_MISS, len(misses))
+        if stale:
+            _refresh_later(client, cache, stale)
+    if negative is not None:
+        METRICS.inc("wikipedia_cache_requests_total", _CACHE_NEGATIVE, failures)
+
+    outcomes: List[Outcome]
+    if semantic:
+        outcomes = [None] * len(misses)
+    else:
+        try:
+            outcomes = list(await client.lookup_many(
+                [queries[i] for i in misses],
+                concurrency=int(os.environ.get("WIKIPEDIA_BATCH_CONCURRENCY", "8")),
+            ))
+        except _UPSTREAM_ERRORS as e:
+            outcomes = [e] * len(misses)
+    unmatched = [n for n, outcome in enumerate(outcomes) if outcome is None]
+    if unmatched and vectors is not None:
+        # All unmatched queries are embedded and scored in one batch.
+        found = await _semantic_outcomes(
+            client, vectors, [queries[misses[n]] for n in unmatched]
+        )
+        for n, outcome in zip(unmatched, found):
+            outcomes[n] = outcome
+    for index, outcome in zip(misses, outcomes):
+        result = _to_result(outcome)
+        if cache is not None and isinstance(result, ArticleResult):
+            cache.set_json(queries[index], client.lang, result.to_json())
+        elif negative is not None and _is_negative(result):
+            negative.set(queries[index], client.lang, result)
+        results[index] = result
+
+    if resolve_disambiguation:
+        ambiguous = [
+            (index, outcome) for index, outcome in zip(misses, outcomes)
+            if isinstance(outcome, DisambiguationError)
+        ]
+        with METRICS.time("disambiguation"):
+            resolved = await asyncio.gather(*(
+                _disambiguate(client, queries[index], outcome)
+                for index, outcome in ambiguous
+            ))
+        for (index, _), result in zip(ambiguous, resolved):
+            results[index] = result
+    # Every query has its result by now.
+    return [
+        _fit_budget(cast(Result, r), max_sentences, max_chars, max_tokens) for r in results
+    ]
+
+
+def _encode_cursor(title: str, section: int) -> str:
+    payload = json.dumps([title, section], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        title, section = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(title), int(section)
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError("Invalid cursor.") from None
+
+
+_ONLINE_ONLY = ErrorResult(
+    ErrorCode.UNSUPPORTED, "Section retrieval needs the online backend."
+)
+_NO_TITLE = ErrorResult(
+    ErrorCode.INVALID_CURSOR, "Pass a title, or the next_cursor of an earlier call."
+)
+
+
+@_tool
+async def list_wikipedia_sections(title: str) -> Union[dict, Result]:
+    """
+    Return the section outline of a Wikipedia article: each section's index,
+    heading, level and size in bytes. Read sections with fetch_wikipedia_section.
     """
+    client = get_client()
+    if not isinstance(client, WikipediaClient):
+        return _ONLINE_ONLY
     try:
-        search_results = wikipedia.search(query)
-        if not search_results:
-            return {"error": "No results found for your query."}
+        return await client.sections(title)
+    except PageError:
+        return PAGE_NOT_FOUND
+    except _UPSTREAM_ERRORS as e:
+        return _upstream_error(e)
+
+
+@_tool
+async def fetch_wikipedia_section(
+    title: str = "",
+    section: int = 0,
+    count: int = 1,
+    cursor: Optional[str] = None,
+    max_chars: int = 20000,
+) -> Union[dict, Result]:
+    """
+    Read the plain text of one section of a Wikipedia article, or of up to
+    `count` consecutive sections starting at index `section` (0 is the lead).
+
+    Responses stay under roughly max_chars characters. When more sections
+    follow, pass the returned next_cursor instead of title/section to
+    continue reading.
+    """
+    client = get_client()
+    if not isinstance(client, WikipediaClient):
+        return _ONLINE_ONLY
+    if cursor:
+        try:
+            title, section = _decode_cursor(cursor)
+        except ValueError as e:
+            return ErrorResult(ErrorCode.INVALID_CURSOR, str(e))
+    elif not title.strip():
+        return _NO_TITLE
+    count = max(1, min(count, MAX_SECTIONS_PER_PAGE))
+
+    try:
+        outline = await client.sections(title)
+        # Pick sections by their wikitext size before downloading anything;
+        # plain text is never longer than its wikitext.
+        selected: List[dict] = []
+        budget = 0
+        for entry in outline["sections"]:
+            if entry["index"] < section or len(selected) == count:
+                continue
+            if selected and budget + entry["bytes"] > max_chars:
+                break
+            selected.append(entry)
+            budget += entry["bytes"]
+        texts = await asyncio.gather(
+            *(client.section(outline["title"], entry["index"]) for entry in selected)
+        )
+    except PageError:
+        return PAGE_NOT_FOUND
+    except _UPSTREAM_ERRORS as e:
+        return _upstream_error(e)
+
+    sections = []
+    for entry, text in zip(selected, texts):
+        item = {"index": entry["index"], "heading": entry["heading"], "text": text[:max_chars]}
+        if len(text) > max_chars:
+            item["truncated"] = True
+        sections.append(item)
+    last = selected[-1]["index"] if selected else section - 1
+    following = [e["index"] for e in outline["sections"] if e["index"] > last]
+    return {
+        "title": outline["title"],
+        "url": outline["url"],
+        "sections": sections,
+        "next_cursor": _encode_cursor(outline["title"], following[0]) if following else None,
+    }
+
+
+@mcp.resource("metrics://prometheus", name="metrics", mime_type="text/plain")
+def metrics_resource() -> str:
+    """
+    Request-path metrics in the Prometheus text format: per-stage latency
+    histograms, cache hits and misses, upstream status codes and retries.
+    Empty unless the server runs with WIKIPEDIA_METRICS=1 (or --metrics).
+    """
+    return METRICS.render()
+
+
+async def _metrics_endpoint(request):
+    from starlette.responses import PlainTextResponse
+
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
+def create_http_app():
+    """
+    ASGI app factory used by uvicorn for the network transports.
+
+    Each worker process builds its own app, backend and connection pool. The
+    transport comes from WIKIPEDIA_MCP_TRANSPORT ("streamable-http" or
+    "sse"); FastMCP settings such as FASTMCP_STATELESS_HTTP are read from
+    the environment when the module is imported. Metrics are served as
+    Prometheus text at /metrics.
+    """
+    from starlette.routing import Route
+
+    if os.environ.get("WIKIPEDIA_MCP_TRANSPORT", "streamable-http") == "sse":
+        app = mcp.sse_app()
+    else:
+        app = mcp.streamable_http_app()
+    app.router.routes.append(Route("/metrics", _metrics_endpoint))
+
+    inner_lifespan = app.router.lifespan_context
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        async with inner_lifespan(app):
+            start_warmer()
+            try:
+                yield
+            finally:
+                await close_client()
+
+    app.router.lifespan_context = lifespan
+    return app
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Command-line entry point when this module runs as a script.
+
+    The `wikipedia-assistant` script starts in `wikipedia_assistant.cli`
+    instead, which relays daemon-mode sessions without importing this module.
+    """
+    from wikipedia_assistant import cli
+
+    cli.main(argv, run)
+
+
+def run(args: argparse.Namespace) -> None:
+    """Serve the tools with the arguments parsed by `wikipedia_assistant.cli`."""
+    if args.metrics:
+        METRICS.enabled = True
 
-        best_match = search_results[0]
-        page = wikipedia.page(best_match)
+    if args.transport == "stdio":
+        print("Starting MCP Wikipedia Server...", file=sys.stderr)
+        mcp.run(transport="stdio")
+        return
 
-        return {
-            "title": page.title,
-            "summary": page.summary,
-            "url": page.url
-        }
+    if args.workers > 1:
+        # Sessions cannot be pinned to one worker, so every request must be
+        # self-contained.
+        os.environ["FASTMCP_STATELESS_HTTP"] = "true"
+        os.environ["FASTMCP_JSON_RESPONSE"] = "true"
+    os.environ["WIKIPEDIA_MCP_TRANSPORT"] = args.transport
 
-    except wikipedia.DisambiguationError as e:
-        return {
-            "error": f"Ambiguous topic. Try one of these: {', '.join(e.options[:5])}"
-        }
+    import uvicorn
 
-    except wikipedia.PageError:
-        return {
-            "error": "No Wikipedia page could be loaded for this query."
-        }
+    uvicorn.run(
+        "wikipedia_assistant.server:create_http_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level="info",
+    )
 
 
 # Run the MCP server
 if __name__ == "__main__":
-    print("Starting MCP Wikipedia Server...")
-    mcp.run(transport="stdio")
+    main()
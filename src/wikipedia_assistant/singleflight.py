@@ -0,0 +1,39 @@
+"""
+Single-flight deduplication of concurrent identical requests.
+
+While a fetch for a key is in flight, further callers with the same key await
+that fetch instead of starting their own, and all of them receive its result
+or its exception.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one upstream call."""
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, "asyncio.Task"] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Return the result of `fn()`, sharing one call among concurrent callers.
+
+        The shared call runs as its own task, so cancelling one waiter does not
+        cancel the fetch for the others.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: "asyncio.Task") -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
@@ -0,0 +1,128 @@
+"""
+Extractive summarization with size budgets.
+
+Sentences are scored by TF-IDF cosine similarity to the document centroid,
+with a small bonus for sentences near the start, all computed with NumPy.
+The best sentences that fit the caller's sentence, character and approximate
+token budgets are returned in their original order.
+"""
+import itertools
+import math
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from wikipedia_assistant.search_index import tokenize
+
+# Abbreviations that end with a period but do not end a sentence.
+_ABBREVIATIONS = (
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "vs", "etc",
+    "e.g", "i.e", "cf", "al", "approx", "ca", "c", "no", "vol", "fig", "jan",
+    "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+)
+_SENTENCE_END = re.compile(r"([.!?][\"')\]]*)\s+(?=[\"'(\[]?[A-Z0-9])")
+
+# Rough size of one LLM token in characters of English text.
+CHARS_PER_TOKEN = 4
+
+
+def approx_tokens(text: str) -> int:
+    """Approximate the LLM token count of `text`."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split plain text into sentences, keeping paragraph breaks as boundaries."""
+    sentences: List[str] = []
+    for paragraph in text.split("\n"):
+        start = 0
+        for match in _SENTENCE_END.finditer(paragraph):
+            candidate = paragraph[start:match.end(1)].strip()
+            if candidate.endswith("."):
+                word = candidate.rsplit(None, 1)[-1][:-1].lstrip("\"'([").lower()
+                if word in _ABBREVIATIONS or len(word) == 1:
+                    continue
+            sentences.append(candidate)
+            start = match.end()
+        rest = paragraph[start:].strip()
+        if rest:
+            sentences.append(rest)
+    return [s for s in sentences if s]
+
+
+def score_sentences(sentences: List[str], lead_bonus: float = 0.1) -> np.ndarray:
+    """Score each sentence by TF-IDF similarity to the document centroid."""
+    count = len(sentences)
+    tokenized = [tokenize(sentence) for sentence in sentences]
+    # Term ids are assigned on first sight by the defaultdict's counter.
+    vocabulary: Dict[str, int] = defaultdict(itertools.count().__next__)
+    cols = np.fromiter(
+        map(vocabulary.__getitem__, itertools.chain.from_iterable(tokenized)),
+        dtype=np.int64,
+    )
+    position = lead_bonus / (1 + np.arange(count))
+    if not vocabulary:
+        return position
+
+    # The sentence-term matrix is kept sparse as (row, col, value) triples,
+    # so the cost follows the number of tokens rather than sentences x terms.
+    size = len(vocabulary)
+    rows = np.repeat(np.arange(count), [len(tokens) for tokens in tokenized])
+    cells, tf = np.unique(rows * size + cols, return_counts=True)
+    row, col = np.divmod(cells, size)
+    df = np.bincount(col, minlength=size)
+    weight = tf * (np.log((1 + count) / (1 + df)) + 1)[col]
+    weight /= np.sqrt(np.bincount(row, weights=weight ** 2, minlength=count))[row]
+
+    totals = np.bincount(col, weights=weight, minlength=size)
+    centroid = totals / max(float(np.linalg.norm(totals)), 1e-9)
+    return np.bincount(row, weights=weight * centroid[col], minlength=count) + position
+
+
+def summarize(
+    text: str,
+    *,
+    max_sentences: Optional[int] = None,
+    max_chars: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+) -> str:
+    """
+    Return the highest-scoring sentences of `text` that fit every budget.
+
+    Without a budget the text is returned unchanged. If not even the best
+    sentence fits, it is cut at a word boundary and ends with an ellipsis.
+    """
+    if max_sentences is None and max_chars is None and max_tokens is None:
+        return text
+
+    char_limit = max_chars if max_chars is not None else math.inf
+    if max_tokens is not None:
+        char_limit = min(char_limit, max_tokens * CHARS_PER_TOKEN)
+    sentence_limit = max_sentences if max_sentences is not None else math.inf
+    if len(text) <= char_limit and sentence_limit == math.inf:
+        return text
+
+    sentences = split_sentences(text)
+    if len(sentences) <= sentence_limit and len(" ".join(sentences)) <= char_limit:
+        return " ".join(sentences)
+
+    scores = score_sentences(sentences)
+    chosen: List[int] = []
+    used = 0
+    for index in np.argsort(-scores, kind="stable"):
+        if len(chosen) >= sentence_limit:
+            break
+        length = len(sentences[index]) + (1 if chosen else 0)
+        if used + length <= char_limit:
+            chosen.append(int(index))
+            used += length
+
+    if not chosen:
+        if not sentences or char_limit < 2 or sentence_limit < 1:
+            return ""
+        best = sentences[int(np.argmax(scores))]
+        cut = best[:int(char_limit) - 1].rsplit(" ", 1)[0]
+        return cut.rstrip(",;: ") + "…"
+    return " ".join(sentences[i] for i in sorted(chosen))
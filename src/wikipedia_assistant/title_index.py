@@ -0,0 +1,540 @@
+"""
+Typo-tolerant resolution of queries to article titles, without a search.
+
+Many queries are article titles with different casing, punctuation or a typo
+or two ("python programming language", "Alan Turnig"). The title index
+answers them locally so the lookup can fetch the page straight away instead
+of running a remote search first.
+
+Titles are reduced to loose keys (case-folded, apostrophes dropped, other
+punctuation and underscores turned into spaces) and stored sorted, so exact
+and prefix matches are binary searches over the memory-mapped key table.
+Typos are matched per word with symmetric-delete (SymSpell) lookups: every
+word of every title is stored under the hashes of the strings left after
+deleting up to `max_distance` characters from its first `prefix_length`
+characters, and a query word is looked up under the hashes of its own
+deletes. The candidates are checked with an edit distance that counts
+adjacent transpositions as one edit, and the corrected words are recombined
+into keys that are looked up exactly. Corrections one edit away are tried
+first, and up to `max_distance` edits only when no title is one edit away;
+at most `MAX_CANDIDATES` words are checked per query word, so a typo costs a
+bounded number of edit distances. A title is only returned when a single one
+is closest to the query, so ambiguous queries are left to the search.
+
+File layout: the magic bytes, then the key, title and word tables, the word
+counts, lengths and character sets and the delete hashes with their word
+ids, each aligned to 8 bytes, and finally a JSON footer with the section
+offsets followed by its length and the magic bytes again.
+
+Usage:
+    python -m wikipedia_assistant.title_index build \
+        --titles enwiki-latest-all-titles-in-ns0.gz --output titles.idx
+    python -m wikipedia_assistant.title_index resolve --index titles.idx "Alan Turnig"
+"""
+import argparse
+import bisect
+import bz2
+import gzip
+import io
+import json
+import mmap
+import re
+import struct
+import sys
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, TextIO, Tuple
+
+import numpy as np
+
+from wikipedia_assistant.offline_store import normalize_title
+from wikipedia_assistant.wikitext import is_article_title
+
+MAGIC = b"WRATITL\x01"
+
+DEFAULT_MAX_DISTANCE = 2
+DEFAULT_PREFIX_LENGTH = 7
+# Corrections tried per query word, closest and most common first.
+MAX_ALTERNATIVES = 8
+# Corrected keys looked up per query before giving up.
+MAX_COMBINATIONS = 256
+# Candidate words checked per query word, and the number from which their
+# edit distances are computed as arrays.
+MAX_CANDIDATES = 128
+VECTOR_CANDIDATES = 16
+
+_APOSTROPHES = re.compile(r"['’]")
+_PUNCTUATION = re.compile(r"[^\w\s]|_")
+
+
+def title_key(title: str) -> str:
+    """Return the loose key of a title: normalized, without punctuation."""
+    return " ".join(_PUNCTUATION.sub(" ", _APOSTROPHES.sub("", normalize_title(title))).split())
+
+
+def _edits_allowed(word: str, max_distance: int) -> int:
+    # Short words are too easily turned into other words.
+    return min(max_distance, 0 if len(word) < 3 else 1 if len(word) < 6 else 2)
+
+
+def _letters(word: str) -> int:
+    """Bit set of the characters of `word`, folded into 32 bits."""
+    mask = 0
+    for char in word:
+        mask |= 1 << (ord(char) & 31)
+    return mask
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    return np.unpackbits(values.astype("<u4").view(np.uint8)).reshape(-1, 32).sum(axis=1)
+
+
+def _deletes(word: str, distance: int) -> Set[str]:
+    """`word` and every string left after deleting up to `distance` characters."""
+    found = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+        found |= frontier
+    return found
+
+
+def _hashes(strings: Iterable[str]) -> np.ndarray:
+    # crc32 rather than hash(), which is salted per process.
+    return np.array([zlib.crc32(s.encode("utf-8")) for s in strings], dtype=np.uint32)
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Return the edit distance between `a` and `b`, or `limit + 1` when it
+    exceeds `limit`. An adjacent transposition counts as one edit.
+    """
+    # Only the differing middle needs the dynamic programme.
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) <= 1 and len(b) <= 1:
+        return max(len(a), len(b))
+    if len(a) == len(b) == 2 and a == b[::-1]:
+        return 1
+    if not a or not b:
+        return max(len(a), len(b))
+    before: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            value = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (a[i - 1] != b[j - 1]),
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, before[j - 2] + 1)
+            current[j] = value
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+def edit_distances(word: str, candidates: Sequence[str], limit: int) -> np.ndarray:
+    """
+    `edit_distance` from `word` to each of `candidates` at once, as an array.
+
+    The dynamic programme runs one query character at a time over all
+    candidates, so its cost follows the length of `word` rather than the
+    number of candidates. Few candidates are checked one by one instead,
+    which costs less than setting up the arrays.
+    """
+    if len(candidates) < VECTOR_CANDIDATES:
+        return np.array([edit_distance(word, c, limit) for c in candidates], dtype=np.int64)
+    width = max(len(candidate) for candidate in candidates)
+    # Padding is NUL, which matches no character of a title key.
+    codes = np.array(candidates, dtype=f"<U{width}").view(np.uint32).reshape(-1, width)
+    columns = np.arange(width + 1)
+    previous = np.tile(columns, (len(candidates), 1))
+    before = previous
+    for i, char in enumerate(word, 1):
+        code = ord(char)
+        current = np.empty_like(previous)
+        current[:, 0] = i
+        # Deletions and substitutions; insertions follow below.
+        np.minimum(previous[:, 1:] + 1, previous[:, :-1] + (codes != code), out=current[:, 1:])
+        if i > 1:
+            swapped = (codes[:, :-1] == code) & (codes[:, 1:] == ord(word[i - 2]))
+            transposed = np.where(swapped, before[:, :-2] + 1, width + 1)
+            np.minimum(current[:, 2:], transposed, out=current[:, 2:])
+        # current[j] = min(current[j], current[j - 1] + 1), for every j at once.
+        current = np.minimum.accumulate(current - columns, axis=1) + columns
+        before, previous = previous, current
+    lengths = np.array([len(candidate) for candidate in candidates])
+    return np.minimum(previous[np.arange(len(candidates)), lengths], limit + 1)
+
+
+def _combinations(
+    options: Sequence[List[Tuple[str, int]]], budget: int
+) -> Iterator[Tuple[int, List[str]]]:
+    """Every choice of one option per word whose distances add up to at most `budget`."""
+    if not options:
+        yield 0, []
+        return
+    for word, distance in options[0]:
+        if distance <= budget:
+            for rest, words in _combinations(options[1:], budget - distance):
+                yield distance + rest, [word] + words
+
+
+def _open_text(path: str) -> TextIO:
+    if path.endswith(".bz2"):
+        return io.TextIOWrapper(bz2.open(path, "rb"), encoding="utf-8", errors="replace")
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace")
+
+
+def read_titles(path: str) -> Iterator[str]:
+    """
+    Yield the article titles of an all-titles list file.
+
+    Accepts Wikimedia's `all-titles-in-ns0` (one title per line) and
+    `all-titles` (namespace, tab, title) dumps, optionally `.gz`/`.bz2`;
+    header lines, other namespaces and non-article titles are skipped.
+    """
+    with _open_text(path) as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if "\t" in line:
+                namespace, _, line = line.partition("\t")
+                if namespace != "0":
+                    continue
+            # Wikimedia dumps start with a "page_title" header line.
+            title = " ".join(line.replace("_", " ").split())
+            if title and line != "page_title" and is_article_title(title):
+                yield title
+
+
+def _section(f, sections: Dict[str, Tuple[int, int]], name: str, data: bytes) -> None:
+    f.write(b"\0" * (-f.tell() % 8))
+    sections[name] = (f.tell(), len(data))
+    f.write(data)
+
+
+def _strings(f, sections: Dict[str, Tuple[int, int]], name: str, values: Sequence[str]) -> None:
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    _section(f, sections, f"{name}_offsets", offsets.tobytes())
+    _section(f, sections, name, b"".join(encoded))
+
+
+def build(
+    titles: Iterable[str],
+    output: str,
+    *,
+    lang: str = "en",
+    max_distance: int = DEFAULT_MAX_DISTANCE,
+    prefix_length: int = DEFAULT_PREFIX_LENGTH,
+) -> int:
+    """
+    Write a title index for `titles` and return the number of titles in it.
+
+    Titles without any letters or digits cannot be resolved and are left
+    out, as are duplicates.
+    """
+    entries = sorted({(key, title) for key, title in ((title_key(t), t) for t in titles) if key})
+    words = Counter(word for key, _ in entries for word in set(key.split()))
+    vocabulary = sorted(words)
+
+    delete_hashes, delete_words = [], []
+    for word_id, word in enumerate(vocabulary):
+        hashes = _hashes(_deletes(word[:prefix_length], max_distance))
+        delete_hashes.append(hashes)
+        delete_words.append(np.full(len(hashes), word_id, dtype=np.uint32))
+    hashes = np.concatenate(delete_hashes) if delete_hashes else np.zeros(0, dtype=np.uint32)
+    word_ids = np.concatenate(delete_words) if delete_words else np.zeros(0, dtype=np.uint32)
+    order = np.lexsort((word_ids, hashes))
+
+    sections: Dict[str, Tuple[int, int]] = {}
+    with open(output, "wb") as f:
+        f.write(MAGIC)
+        _strings(f, sections, "keys", [key for key, _ in entries])
+        _strings(f, sections, "titles", [title for _, title in entries])
+        _strings(f, sections, "words", vocabulary)
+        counts = np.array([words[word] for word in vocabulary], dtype=np.uint32)
+        _section(f, sections, "word_counts", counts.tobytes())
+        lengths = np.minimum([len(word) for word in vocabulary], 255).astype(np.uint8)
+        _section(f, sections, "word_lengths", lengths.tobytes())
+        letters = np.array([_letters(word) for word in vocabulary], dtype=np.uint32)
+        _section(f, sections, "word_letters", letters.tobytes())
+        _section(f, sections, "delete_hashes", hashes[order].tobytes())
+        _section(f, sections, "delete_words", word_ids[order].tobytes())
+        footer = json.dumps({
+            "count": len(entries),
+            "word_count": len(vocabulary),
+            "lang": lang,
+            "max_distance": max_distance,
+            "prefix_length": prefix_length,
+            "sections": sections,
+        }).encode("utf-8")
+        f.write(footer)
+        f.write(struct.pack("<Q", len(footer)) + MAGIC)
+    return len(entries)
+
+
+class _Strings(Sequence):
+    """Sorted strings stored as an offsets array and their UTF-8 data."""
+
+    def __init__(self, mm: mmap.mmap, offsets: memoryview, start: int):
+        self._mm = mm
+        self._offsets = offsets
+        self._start = start
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        start = self._start + self._offsets[index]
+        return self._mm[start:self._start + self._offsets[index + 1]]
+
+    def range(self, value: bytes, prefix: bool = False) -> Tuple[int, int]:
+        """Positions of the strings equal to, or starting with, `value`."""
+        lo = bisect.bisect_left(self, value)
+        if prefix:
+            # No UTF-8 string continues with 0xff, so this bounds every extension.
+            return lo, bisect.bisect_left(self, value + b"\xff", lo)
+        return lo, bisect.bisect_right(self, value, lo)
+
+
+class TitleIndex:
+    """
+    Read-only, memory-mapped title index.
+
+    Opening it reads only the footer; lookups touch a few pages of the map,
+    so several processes share it through the OS page cache. Safe to share
+    between threads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != MAGIC or self._mm[-8:] != MAGIC:
+            raise ValueError(f"{path} is not a title index")
+        (footer_len,) = struct.unpack("<Q", self._mm[-16:-8])
+        self.footer = json.loads(self._mm[-16 - footer_len:-16])
+        self.lang: str = self.footer["lang"]
+        self.max_distance: int = self.footer["max_distance"]
+        self.prefix_length: int = self.footer["prefix_length"]
+        sections = self.footer["sections"]
+
+        self._keys = self._strings(sections, "keys")
+        self._titles = self._strings(sections, "titles")
+        self._words = self._strings(sections, "words")
+        self._word_counts = self._array(sections["word_counts"], np.uint32)
+        self._word_lengths = self._array(sections["word_lengths"], np.uint8)
+        self._word_letters = self._array(sections["word_letters"], np.uint32)
+        self._delete_hashes = self._array(sections["delete_hashes"], np.uint32)
+        self._delete_words = self._array(sections["delete_words"], np.uint32)
+
+    def _array(self, section: Sequence[int], dtype) -> np.ndarray:
+        offset, length = section
+        count = length // np.dtype(dtype).itemsize
+        return np.frombuffer(self._mm, dtype=dtype, count=count, offset=offset)
+
+    def _strings(self, sections: Dict[str, Sequence[int]], name: str) -> _Strings:
+        offset, length = sections[f"{name}_offsets"]
+        # A memoryview yields Python ints, which bisect compares fastest.
+        offsets = memoryview(self._mm)[offset:offset + length].cast("Q")
+        return _Strings(self._mm, offsets, sections[name][0])
+
+    def close(self) -> None:
+        for name in ("_keys", "_titles", "_words"):
+            getattr(self, name)._offsets.release()
+        for name in (
+            "_word_counts", "_word_lengths", "_word_letters", "_delete_hashes", "_delete_words"
+        ):
+            setattr(self, name, None)
+        self._mm.close()
+
+    def __len__(self) -> int:
+        return self.footer["count"]
+
+    def title(self, row: int) -> str:
+        return self._titles[row].decode("utf-8")
+
+    def complete(self, prefix: str, limit: int = 10) -> List[str]:
+        """Return up to `limit` titles whose key starts with the key of `prefix`."""
+        key = title_key(prefix)
+        if not key:
+            return []
+        lo, hi = self._keys.range(key.encode("utf-8"), prefix=True)
+        return [self.title(row) for row in range(lo, min(hi, lo + limit))]
+
+    def _known(self, word: str) -> bool:
+        lo, hi = self._words.range(word.encode("utf-8"))
+        return hi > lo
+
+    def _corrections(self, word: str, most: int) -> List[Tuple[str, int]]:
+        """The closest known corrections of `word` within `most` edits, most common first."""
+        limit = min(most, _edits_allowed(word, self.max_distance))
+        if not limit:
+            return []
+        hashes = _hashes(_deletes(word[:self.prefix_length], limit))
+        starts = np.searchsorted(self._delete_hashes, hashes, "left")
+        ends = np.searchsorted(self._delete_hashes, hashes, "right")
+        ids = np.concatenate(
+            [self._delete_words[s:e] for s, e in zip(starts, ends)] + [np.zeros(0, np.uint32)]
+        )
+        # Sorted and deduplicated by hand: np.unique imports numpy.ma on first
+        # use, which would add milliseconds to the first typo.
+        ids.sort()
+        distinct = np.ones(len(ids), dtype=bool)
+        np.not_equal(ids[1:], ids[:-1], out=distinct[1:])
+        ids = ids[distinct]
+        # Words whose length is too different cannot be within the limit, nor
+        # can words with more than `limit` characters the other one lacks:
+        # each edit adds at most one character and removes at most one.
+        letters = np.uint32(_letters(word))
+        candidate_letters = self._word_letters[ids]
+        bound = np.maximum.reduce([
+            np.abs(self._word_lengths[ids].astype(np.int64) - len(word)),
+            _popcount(candidate_letters & ~letters),
+            _popcount(letters & ~candidate_letters),
+        ])
+        ids, bound = ids[bound <= limit], bound[bound <= limit]
+        if len(ids) > MAX_CANDIDATES:
+            # Check the words the bound puts closest first, then the most common.
+            ids = ids[np.lexsort((-self._word_counts[ids].astype(np.int64), bound))]
+            ids = ids[:MAX_CANDIDATES]
+        candidates = [self._words[int(word_id)].decode("utf-8") for word_id in ids]
+        distances = edit_distances(word, candidates, limit)
+        found = sorted(
+            (int(distance), -int(count), candidate)
+            for distance, count, candidate in zip(distances, self._word_counts[ids], candidates)
+            if 0 < distance <= limit
+        )
+        return [(candidate, distance) for distance, _, candidate in found[:MAX_ALTERNATIVES]]
+
+    def _pick(self, lo: int, hi: int, query: str) -> Optional[str]:
+        """The title among rows `lo:hi`, which share a key, that `query` means."""
+        if hi - lo == 1:
+            return self.title(lo)
+        normalized = normalize_title(query)
+        exact = [self.title(row) for row in range(lo, hi)]
+        exact = [title for title in exact if normalize_title(title) == normalized]
+        return exact[0] if len(exact) == 1 else None
+
+    def resolve(self, query: str) -> Optional[str]:
+        """
+        Return the title `query` confidently refers to, or None.
+
+        Exact key matches win; otherwise the title whose key is the fewest
+        word corrections away, within `max_distance` edits in total, is
+        returned if no other title is as close.
+        """
+        key = title_key(query)
+        if not key:
+            return None
+        lo, hi = self._keys.range(key.encode("utf-8"))
+        if hi > lo:
+            return self._pick(lo, hi, query)
+
+        words = key.split()
+        known = [self._known(word) for word in words]
+        matches: List[Tuple[int, int]] = []
+        # Most typos are single edits, whose corrections are far fewer and
+        # cheaper to check; a match one edit away cannot be beaten, so the
+        # wider search only runs when there is none.
+        for most in sorted({1, self.max_distance}):
+            fixes = {
+                word: self._corrections(word, most)
+                for word, is_known in zip(words, known) if not is_known
+            }
+            # Known words are only corrected when correcting the others finds nothing.
+            options = [
+                [(word, 0)] if is_known else fixes[word]
+                for word, is_known in zip(words, known)
+            ]
+            best, matches = self._closest(options) if fixes else (0, [])
+            if not matches:
+                for word in words:
+                    if word not in fixes:
+                        fixes[word] = self._corrections(word, most)
+                options = [
+                    ([(word, 0)] if is_known else []) + fixes[word]
+                    for word, is_known in zip(words, known)
+                ]
+                best, matches = self._closest(options)
+            if best == 1:
+                break
+        # Several equally close titles are ambiguous.
+        return self._pick(*matches[0], query) if len(matches) == 1 else None
+
+    def _closest(
+        self, options: Sequence[List[Tuple[str, int]]]
+    ) -> Tuple[int, List[Tuple[int, int]]]:
+        """The distance and key rows of the existing corrected keys closest to the query."""
+        if not all(options):
+            return 0, []
+        candidates = sorted(
+            (distance, " ".join(words))
+            for distance, words in _combinations(options, self.max_distance)
+            if distance
+        )
+        best: Optional[int] = None
+        matches: List[Tuple[int, int]] = []
+        for distance, candidate in candidates[:MAX_COMBINATIONS]:
+            if best is not None and distance > best:
+                break
+            lo, hi = self._keys.range(candidate.encode("utf-8"))
+            if hi > lo:
+                best = distance
+                matches.append((lo, hi))
+        return best or 0, matches
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build or query a typo-tolerant title index.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_cmd = commands.add_parser("build", help="index an all-titles list")
+    build_cmd.add_argument(
+        "--titles", required=True, help="all-titles file, one title per line (.gz/.bz2 too)"
+    )
+    build_cmd.add_argument("--output", required=True)
+    build_cmd.add_argument("--lang", default="en")
+    build_cmd.add_argument(
+        "--max-distance", type=int, default=DEFAULT_MAX_DISTANCE,
+        help="largest number of typos corrected",
+    )
+    build_cmd.add_argument(
+        "--prefix-length", type=int, default=DEFAULT_PREFIX_LENGTH,
+        help="leading characters of each word that typos are indexed in",
+    )
+    resolve_cmd = commands.add_parser("resolve", help="resolve queries to titles")
+    resolve_cmd.add_argument("--index", required=True)
+    resolve_cmd.add_argument("queries", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        count = build(
+            read_titles(args.titles), args.output, lang=args.lang,
+            max_distance=args.max_distance, prefix_length=args.prefix_length,
+        )
+        print(f"Indexed {count} titles into {args.output}.")
+    else:
+        index = TitleIndex(args.index)
+        for query in args.queries:
+            print(f"{query}\t{index.resolve(query) or '-'}")
+        index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
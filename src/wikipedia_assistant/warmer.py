@@ -0,0 +1,149 @@
+"""
+Cache warmer for the most popular articles.
+
+Reads a list of titles and loads their articles into the result cache through
+packed multi-title requests, a few batches at a time, so a fresh server
+process answers popular topics from the cache. The title file is either one
+title per line, optionally followed by a tab and a view count, or a Wikimedia
+pageviews dump (`domain title views ...` lines, optionally `.gz`/`.bz2`), in
+which case the counts of the language's desktop and mobile sites are added up
+and the most viewed titles come first. Titles whose cached entry is still
+fresh are skipped.
+
+    python -m wikipedia_assistant.warmer pageviews-20240101-000000.gz --limit 5000
+"""
+import argparse
+import asyncio
+import bz2
+import gzip
+import io
+import re
+import sys
+from typing import Dict, List, Optional, Sequence, TextIO
+
+import httpx
+
+from wikipedia_assistant.cache import DEFAULT_CACHE_PATH, ResultCache
+from wikipedia_assistant.models import ArticleResult
+from wikipedia_assistant.wikitext import is_article_title
+from wikipedia_assistant.wikipedia_client import (
+    MAX_TITLES_PER_QUERY,
+    WikipediaClient,
+    WikipediaError,
+)
+
+# "en Alan_Turing 1234 0" or "en.m.wikipedia Alan_Turing 1234 ..."
+_PAGEVIEWS_LINE = re.compile(r"([a-z][a-z0-9-]*(?:\.[a-z]+)*) (\S+) (\d+)(?: |$)")
+
+# Domain suffixes of Wikipedia itself, as opposed to its sister projects
+# ("en.b" is Wikibooks, "en.d" Wiktionary, ...).
+_WIKIPEDIA_SUFFIXES = ("", "m", "wikipedia", "m.wikipedia")
+
+_SKIPPED_TITLES = ("-", "Main Page")
+
+
+def _open_text(path: str) -> TextIO:
+    if path.endswith(".bz2"):
+        return io.TextIOWrapper(bz2.open(path, "rb"), encoding="utf-8", errors="replace")
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace")
+
+
+def read_titles(path: str, lang: str = "en", limit: Optional[int] = None) -> List[str]:
+    """
+    Return the article titles listed in `path`, most viewed first.
+
+    Titles without a view count keep their file order after the counted ones.
+    """
+    views: Dict[str, int] = {}
+    with _open_text(path) as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            match = _PAGEVIEWS_LINE.match(line)
+            if match:
+                domain, title, count = match.group(1), match.group(2), int(match.group(3))
+                code, _, suffix = domain.partition(".")
+                if code != lang or suffix not in _WIKIPEDIA_SUFFIXES:
+                    continue
+            elif "\t" in line:
+                title, _, count_text = line.partition("\t")
+                count = int(count_text) if count_text.strip().isdigit() else 0
+            else:
+                title, count = line, 0
+            title = " ".join(title.replace("_", " ").split())
+            if not title or title in _SKIPPED_TITLES or not is_article_title(title):
+                continue
+            views[title] = views.get(title, 0) + count
+    ranked = sorted(views, key=lambda title: -views[title])
+    return ranked[:limit] if limit is not None else ranked
+
+
+async def warm(
+    client: WikipediaClient,
+    cache: ResultCache,
+    titles: Sequence[str],
+    *,
+    batch_size: int = MAX_TITLES_PER_QUERY,
+    concurrency: int = 4,
+) -> int:
+    """
+    Fetch the articles for `titles` and store them in `cache`, keyed by title.
+
+    Titles are requested `batch_size` per request with at most `concurrency`
+    requests in flight. Missing and disambiguation pages are skipped, and a
+    batch that fails is left for the regular lookups to fill in. Returns the
+    number of cache entries written.
+    """
+    pending = [t for t in titles if cache.lookup_json(t, client.lang)[1]]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def warm_batch(batch: Sequence[str]) -> int:
+        async with semaphore:
+            try:
+                pages = await client.pages(batch)
+            except (httpx.HTTPError, WikipediaError):
+                return 0
+        written = 0
+        for title in batch:
+            page = pages.get(title)
+            if page is None or "disambiguation" in page.get("pageprops", {}):
+                continue
+            result = ArticleResult(page["title"], page.get("extract", ""), page["fullurl"])
+            cache.set_json(title, client.lang, result.to_json())
+            written += 1
+        return written
+
+    counts = await asyncio.gather(*(
+        warm_batch(pending[start:start + batch_size])
+        for start in range(0, len(pending), batch_size)
+    ))
+    return sum(counts)
+
+
+async def _run(args: argparse.Namespace) -> int:
+    titles = read_titles(args.titles, args.lang, args.limit)
+    cache = ResultCache(args.cache)
+    try:
+        async with WikipediaClient(lang=args.lang) as client:
+            return await warm(client, cache, titles, concurrency=args.concurrency)
+    finally:
+        cache.close()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Prefetch popular articles into the cache")
+    parser.add_argument("titles", help="title list or pageviews dump")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH)
+    parser.add_argument("--lang", default="en")
+    parser.add_argument("--limit", type=int, default=1000, help="number of titles to warm")
+    parser.add_argument("--concurrency", type=int, default=4, help="batches in flight")
+    args = parser.parse_args(argv)
+    count = asyncio.run(_run(args))
+    print(f"Warmed {count} cache entries", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,492 @@
+"""
+Async Wikipedia client built on a pooled httpx.AsyncClient.
+
+Replaces the blocking `wikipedia` package on the request path so that one slow
+upstream call no longer stalls every other tool call on the MCP event loop.
+"""
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import httpx
+
+from wikipedia_assistant.metrics import METRICS
+from wikipedia_assistant.ratelimit import (
+    RETRY_STATUSES,
+    RateLimiter,
+    backoff_delay,
+    parse_retry_after,
+)
+from wikipedia_assistant.wikitext import disambiguation_options, section_text, strip_tags
+
+DEFAULT_USER_AGENT = (
+    "wikipedia-research-assistant/0.1.0 "
+    "(https://github.com/shuhaimiao/wikipedia-research-assistant)"
+)
+
+# Query parameters that return the intro extract, canonical URL and
+# disambiguation flag of every page in the result set.
+PAGE_PROPS = {
+    "prop": "extracts|info|pageprops",
+    "exintro": 1,
+    "explaintext": 1,
+    "inprop": "url",
+    "ppprop": "disambiguation",
+    "redirects": 1,
+}
+
+# API endpoint of a language edition; `{lang}` is replaced by the language code.
+DEFAULT_API_URL = "https://{lang}.wikipedia.org/w/api.php"
+
+# The API accepts at most this many titles in one `titles=A|B|C` request.
+MAX_TITLES_PER_QUERY = 50
+
+
+class WikipediaError(Exception):
+    """Base error raised by the Wikipedia client."""
+
+
+class PageError(WikipediaError):
+    """Raised when no page exists for the requested title."""
+
+    def __init__(self, title: str):
+        super().__init__(f"Page id {title!r} does not match any pages.")
+        self.title = title
+
+
+class DisambiguationError(WikipediaError):
+    """Raised when the requested title resolves to a disambiguation page."""
+
+    def __init__(self, title: str, options: List[str]):
+        super().__init__(f"{title!r} may refer to: {', '.join(options)}")
+        self.title = title
+        self.options = options
+
+
+class WikipediaClient:
+    """
+    Minimal async MediaWiki API client.
+
+    One instance owns one connection pool for one language edition; reuse it
+    for the lifetime of the server instead of creating a client per call, and
+    use `for_language()` to get a client for another edition.
+    """
+
+    def __init__(
+        self,
+        lang: str = "en",
+        *,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 10.0,
+        user_agent: str = DEFAULT_USER_AGENT,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        search_index: Any = None,
+        title_index: Any = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_retries: int = 3,
+        maxlag: Optional[int] = None,
+        api_url: Optional[str] = None,
+    ):
+        self.lang = lang
+        # Optional local SearchIndex that replaces the remote search step.
+        self.search_index = search_index
+        # Optional local TitleIndex that resolves near-exact titles without a search.
+        self.title_index = title_index
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.maxlag = maxlag
+        # api_url points the client at another MediaWiki, such as a local
+        # mock server in the benchmarks; it may contain a `{lang}` placeholder.
+        self._api_url_template = api_url or DEFAULT_API_URL
+        self.api_url = self._api_url_template.format(lang=lang)
+        self.host = httpx.URL(self.api_url).host
+        # Kept for for_language(), whose clients get pools of their own.
+        self._max_connections = max_connections
+        self._max_keepalive_connections = max_keepalive_connections
+        self._keepalive_expiry = keepalive_expiry
+        self._timeout = timeout
+        self._user_agent = user_agent
+        self._transport = transport
+        self._http = httpx.AsyncClient(
+            headers={"User-Agent": user_agent},
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            transport=transport,
+        )
+
+    async def __aenter__(self) -> "WikipediaClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the underlying connection pool."""
+        await self._http.aclose()
+
+    def for_language(self, lang: str) -> "WikipediaClient":
+        """
+        Return a client for another language edition with the same settings.
+
+        The new client has its own connection pool. It shares the rate
+        limiter, whose buckets are per host and so per language; the local
+        search and title indexes are language-specific and are not carried
+        over.
+        """
+        return WikipediaClient(
+            lang,
+            rate_limiter=self.rate_limiter,
+            max_retries=self.max_retries,
+            maxlag=self.maxlag,
+            api_url=self._api_url_template,
+            max_connections=self._max_connections,
+            max_keepalive_connections=self._max_keepalive_connections,
+            keepalive_expiry=self._keepalive_expiry,
+            timeout=self._timeout,
+            user_agent=self._user_agent,
+            transport=self._transport,
+        )
+
+    async def _query(self, **params: Any) -> Dict[str, Any]:
+        """
+        Run one `action=query` request and return the decoded JSON body.
+
+        429/503 responses and maxlag errors are retried up to `max_retries`
+        times with jittered backoff. With a rate limiter, the backoff is
+        applied to the whole host so concurrent requests slow down too.
+        """
+        params.setdefault("action", "query")
+        params.update(format="json", formatversion="2")
+        if self.maxlag is not None:
+            params["maxlag"] = self.maxlag
+
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(self.host)
+            with METRICS.time("upstream"):
+                response = await self._http.get(self.api_url, params=params)
+            if METRICS.enabled:
+                METRICS.inc(
+                    "wikipedia_upstream_responses_total",
+                    (("status", str(response.status_code)),),
+                )
+            last = attempt == self.max_retries
+            if response.status_code not in RETRY_STATUSES:
+                response.raise_for_status()
+                data = response.json()
+                if last or data.get("error", {}).get("code") != "maxlag":
+                    return self._checked(data, params)
+            elif last:
+                # 429 and 503 always raise here.
+                response.raise_for_status()
+
+            METRICS.inc("wikipedia_upstream_retries_total")
+            delay = backoff_delay(
+                attempt, parse_retry_after(response.headers.get("Retry-After"))
+            )
+            if self.rate_limiter is not None:
+                self.rate_limiter.throttled(self.host, delay)
+            else:
+                await asyncio.sleep(delay)
+            attempt += 1
+
+    def _checked(self, data: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+        """Raise the API error in `data`, if any, or record a successful request."""
+        if "error" in data:
+            if data["error"].get("code") == "missingtitle":
+                raise PageError(params.get("page", ""))
+            raise WikipediaError(data["error"].get("info", "Unknown API error"))
+        if self.rate_limiter is not None:
+            self.rate_limiter.succeeded(self.host)
+        return data
+
+    async def search(self, query: str, results: int = 10) -> List[str]:
+        """Return the titles of the best full-text matches for `query`."""
+        data = await self._query(
+            list="search", srsearch=query, srlimit=results, srprop=""
+        )
+        return [hit["title"] for hit in data.get("query", {}).get("search", [])]
+
+    async def page(self, title: str) -> Dict[str, str]:
+        """
+        Load the lead section and canonical URL of the page called `title`.
+
+        Redirects are followed. Raises PageError for missing pages and
+        DisambiguationError for disambiguation pages.
+        """
+        data = await self._query(titles=title, **PAGE_PROPS)
+        pages = data.get("query", {}).get("pages", [])
+        if not pages or pages[0].get("missing") or pages[0].get("invalid"):
+            raise PageError(title)
+        return await self._page_result(pages[0])
+
+    async def lookup(self, query: str) -> Optional[Dict[str, str]]:
+        """
+        Resolve `query` to its best match in a single round-trip.
+
+        Runs the search as a generator so that title, intro extract, URL and
+        disambiguation flag arrive in one response. Falls back to the
+        multi-step path only for disambiguation pages (to collect options) or
+        when the extract is missing. Returns None when nothing matches.
+
+        With a local title index, a query that is a title up to case,
+        punctuation and a typo or two is fetched directly. With a local
+        search index, the best local hit is fetched directly too, and the
+        remote search only runs when neither index has a usable match.
+        """
+        if self.title_index is not None:
+            with METRICS.time("resolve"):
+                title = self.title_index.resolve(query)
+            if title is not None:
+                try:
+                    with METRICS.time("page"):
+                        return await self.page(title)
+                except PageError:
+                    pass
+
+        if self.search_index is not None:
+            with METRICS.time("search"):
+                hits = self.search_index.search(query, 1)
+            if hits:
+                try:
+                    with METRICS.time("page"):
+                        return await self.page(hits[0])
+                except PageError:
+                    pass
+
+        # Search and page resolution share this round trip.
+        with METRICS.time("search"):
+            data = await self._query(
+                generator="search", gsrsearch=query, gsrlimit=1, **PAGE_PROPS
+            )
+        pages = data.get("query", {}).get("pages", [])
+        if not pages:
+            return None
+
+        page = min(pages, key=lambda p: p.get("index", 0))
+        if "extract" not in page or "fullurl" not in page:
+            with METRICS.time("page"):
+                return await self.page(page["title"])
+        return await self._page_result(page)
+
+    async def lookup_many(
+        self, queries: Sequence[str], concurrency: int = 8
+    ) -> List[Union[Dict[str, str], None, WikipediaError]]:
+        """
+        Resolve many queries, returning one outcome per query in order.
+
+        Queries the local title or search index resolves skip the remote
+        search; the others are searched concurrently, at most `concurrency`
+        at a time. The distinct best matches are then fetched through packed
+        multi-title requests, and the options of the disambiguation pages
+        among them are loaded concurrently. As in `lookup`, a locally resolved
+        title that no longer exists upstream falls back to the remote search. Each
+        outcome is a result dict, None when the search found nothing, or the
+        PageError/DisambiguationError for that query.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        def local_title(query: str) -> Optional[str]:
+            if self.title_index is not None:
+                title = self.title_index.resolve(query)
+                if title is not None:
+                    return title
+            if self.search_index is not None:
+                hits = self.search_index.search(query, 1)
+                if hits:
+                    return hits[0]
+            return None
+
+        async def remote_title(query: str) -> Optional[str]:
+            async with semaphore:
+                hits = await self.search(query, results=1)
+            return hits[0] if hits else None
+
+        async def links(title: str) -> List[str]:
+            async with semaphore:
+                return await self._links(title)
+
+        async def fetch(titles: Sequence[Optional[str]]) -> Dict[str, Dict[str, Any]]:
+            with METRICS.time("page"):
+                return await self.pages([t for t in dict.fromkeys(titles) if t is not None])
+
+        titles = [local_title(query) for query in queries]
+        local = [title is not None for title in titles]
+        remote = [n for n, title in enumerate(titles) if title is None]
+        with METRICS.time("search"):
+            found = await asyncio.gather(*(remote_title(queries[n]) for n in remote))
+        for n, title in zip(remote, found):
+            titles[n] = title
+        pages = await fetch(titles)
+
+        stale = [n for n, title in enumerate(titles) if local[n] and title not in pages]
+        if stale:
+            with METRICS.time("search"):
+                found = await asyncio.gather(*(remote_title(queries[n]) for n in stale))
+            for n, title in zip(stale, found):
+                titles[n] = title
+            pages.update(await fetch([t for t in found if t not in pages]))
+
+        outcomes: List[Union[Dict[str, str], None, WikipediaError]] = []
+        ambiguous: Dict[int, str] = {}
+        for title in titles:
+            if title is None:
+                outcomes.append(None)
+            elif title not in pages:
+                outcomes.append(PageError(title))
+            elif "disambiguation" in pages[title].get("pageprops", {}):
+                ambiguous[len(outcomes)] = pages[title]["title"]
+                outcomes.append(None)
+            else:
+                outcomes.append(await self._page_result(pages[title]))
+
+        names = list(dict.fromkeys(ambiguous.values()))
+        options = dict(zip(names, await asyncio.gather(*(links(name) for name in names))))
+        for n, name in ambiguous.items():
+            outcomes[n] = DisambiguationError(name, options[name])
+        return outcomes
+
+    async def candidates(self, titles: Sequence[str]) -> List[Dict[str, str]]:
+        """
+        Load title, intro extract and URL for several titles at once.
+
+        Used to rank the options of a disambiguation page; the titles are
+        fetched through packed multi-title requests. Missing pages, nested
+        disambiguation pages and duplicates after redirects are skipped, and
+        the order of `titles` is kept.
+        """
+        pages = await self.pages(titles)
+        found: Dict[str, Dict[str, str]] = {}
+        for title in titles:
+            page = pages.get(title)
+            if page is None or "disambiguation" in page.get("pageprops", {}):
+                continue
+            found.setdefault(page["title"], {
+                "title": page["title"],
+                "summary": page.get("extract", ""),
+                "url": page["fullurl"],
+            })
+        return list(found.values())
+
+    async def pages(self, titles: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch the API page objects for many titles.
+
+        Titles are packed up to MAX_TITLES_PER_QUERY per request and the
+        chunks are requested concurrently. The result maps each requested
+        title to its page after normalization and redirects; missing pages
+        are left out.
+        """
+        chunks = [
+            titles[start:start + MAX_TITLES_PER_QUERY]
+            for start in range(0, len(titles), MAX_TITLES_PER_QUERY)
+        ]
+        found: Dict[str, Dict[str, Any]] = {}
+        for chunk_pages in await asyncio.gather(*(self._pages_chunk(c) for c in chunks)):
+            found.update(chunk_pages)
+        return found
+
+    async def _pages_chunk(self, titles: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch one multi-title request, following extract continuations."""
+        params: Dict[str, Any] = dict(PAGE_PROPS, titles="|".join(titles), exlimit="max")
+        aliases: Dict[str, str] = {}
+        merged: Dict[str, Dict[str, Any]] = {}
+        while True:
+            data = await self._query(**params)
+            query = data.get("query", {})
+            for alias in query.get("normalized", []) + query.get("redirects", []):
+                aliases[alias["from"]] = alias["to"]
+            for page in query.get("pages", []):
+                merged.setdefault(page["title"], {}).update(page)
+            if "continue" not in data:
+                break
+            params.update(data["continue"])
+
+        found = {}
+        for title in titles:
+            # Normalization happens before redirects, so at most two hops.
+            target = aliases.get(title, title)
+            target = aliases.get(target, target)
+            page = merged.get(target)
+            if page and not page.get("missing") and not page.get("invalid"):
+                found[title] = page
+        return found
+
+    async def sections(self, title: str) -> Dict[str, Any]:
+        """
+        Return the section outline of `title` without downloading its text.
+
+        Each section has its `index` (0 is the lead), `heading`, `level` and
+        size in `bytes` of wikitext. Raises PageError for missing pages.
+        """
+        parsed, info = await asyncio.gather(
+            self._query(action="parse", page=title, prop="sections", redirects=1),
+            self._query(titles=title, prop="info", inprop="url", redirects=1),
+        )
+        pages = info.get("query", {}).get("pages", [])
+        if not pages or pages[0].get("missing") or pages[0].get("invalid"):
+            raise PageError(title)
+
+        # Sections transcluded from templates have indexes like "T-1" and no
+        # offset in this page, so they cannot be fetched by index.
+        own = [s for s in parsed["parse"]["sections"] if str(s["index"]).isdigit()]
+        offsets = [0] + [s["byteoffset"] for s in own] + [pages[0]["length"]]
+        outline = [{"index": 0, "heading": "(Lead)", "level": 1, "bytes": offsets[1]}]
+        for position, section in enumerate(own, start=1):
+            outline.append({
+                "index": int(section["index"]),
+                "heading": strip_tags(section["line"]),
+                "level": int(section["level"]),
+                "bytes": offsets[position + 1] - offsets[position],
+            })
+        return {
+            "title": parsed["parse"]["title"],
+            "url": pages[0]["fullurl"],
+            "bytes": pages[0]["length"],
+            "sections": outline,
+        }
+
+    async def section(self, title: str, index: int) -> str:
+        """Return the plain text of section `index` of `title`, without subsections."""
+        data = await self._query(
+            action="parse", page=title, prop="wikitext", section=index, redirects=1
+        )
+        return section_text(data["parse"]["wikitext"])
+
+    async def _page_result(self, page: Dict[str, Any]) -> Dict[str, str]:
+        """Convert one API page object into the tool's result dict."""
+        if "disambiguation" in page.get("pageprops", {}):
+            raise DisambiguationError(
+                page["title"], await self._links(page["title"])
+            )
+        return {
+            "title": page["title"],
+            "summary": page.get("extract", ""),
+            "url": page["fullurl"],
+        }
+
+    async def _links(self, title: str) -> List[str]:
+        """
+        Return the options listed on disambiguation page `title`, in page order.
+
+        `prop=links` sorts links alphabetically, so the wikitext is parsed
+        instead to keep the common meanings the page lists first. Pages
+        without list items fall back to their article links.
+        """
+        data = await self._query(action="parse", page=title, prop="wikitext", redirects=1)
+        options = disambiguation_options(data.get("parse", {}).get("wikitext", ""))
+        if options:
+            return options
+        data = await self._query(
+            titles=title, prop="links", plnamespace=0, pllimit="max"
+        )
+        pages = data.get("query", {}).get("pages", [])
+        if not pages:
+            return []
+        return [link["title"] for link in pages[0].get("links", [])]
@@ -0,0 +1,110 @@
+"""
+Conversion of MediaWiki wikitext to plain text.
+
+Used by the dump ingester for lead sections and by the section tools for
+article sections. The conversion drops templates, tables, references, files
+and markup and keeps the visible text of links.
+"""
+import re
+from typing import List
+
+_DISAMBIGUATION = re.compile(
+    r"\{\{\s*(?:disambiguation|disambig|dab|hndis|geodis|set index)\b", re.I
+)
+_COMMENT = re.compile(r"<!--.*?-->", re.S)
+_REF = re.compile(r"<ref[^>]*/>|<ref[^>]*>.*?</ref>", re.S | re.I)
+_TAG = re.compile(r"<[^>]+>")
+HEADING = re.compile(r"^(=+)\s*([^=\n]+?)\s*\1\s*$", re.M)
+_EXTERNAL_LINK = re.compile(r"\[(?:https?:)?//[^\s\]]+\s*([^\]]*)\]")
+_LINK = re.compile(r"\[\[(?:[^|\]]*\|)?([^\]]*)\]\]")
+_QUOTES = re.compile(r"'{2,}")
+_LIST_LINK = re.compile(r"^\*+[^\[\n]*\[\[([^|\]#]+)", re.M)
+_SKIPPED_LINK = re.compile(r"(?:file|image|category|media):", re.I)
+
+# Title prefixes of the English Wikipedia namespaces other than articles.
+NON_ARTICLE_NAMESPACES = frozenset((
+    "Talk", "User", "User talk", "Wikipedia", "Wikipedia talk", "File", "File talk",
+    "MediaWiki", "MediaWiki talk", "Template", "Template talk", "Help", "Help talk",
+    "Category", "Category talk", "Portal", "Portal talk", "Draft", "Draft talk",
+    "TimedText", "TimedText talk", "Module", "Module talk", "Special", "Media",
+))
+
+
+def _remove_nested(text: str, opener: str, closer: str, skip_link: bool = False) -> str:
+    """
+    Remove balanced `opener ... closer` spans, such as templates or tables.
+
+    With `skip_link`, only `[[...]]` spans pointing at files or categories are
+    removed and ordinary links are kept.
+    """
+    out: List[str] = []
+    depth = 0
+    kept = 0
+    for match in re.finditer(f"{re.escape(opener)}|{re.escape(closer)}", text):
+        if match.group() == opener:
+            if depth == 0:
+                if skip_link and not _SKIPPED_LINK.match(text, match.end()):
+                    continue
+                out.append(text[kept:match.start()])
+            depth += 1
+        elif depth:
+            depth -= 1
+            if depth == 0:
+                kept = match.end()
+    if depth == 0:
+        out.append(text[kept:])
+    return "".join(out)
+
+
+def wikitext_to_text(text: str) -> str:
+    """Convert wikitext to plain paragraphs separated by newlines."""
+    text = _COMMENT.sub("", text)
+    text = _REF.sub("", text)
+    text = _remove_nested(text, "{{", "}}")
+    text = _remove_nested(text, "{|", "|}")
+    text = _remove_nested(text, "[[", "]]", skip_link=True)
+    text = _EXTERNAL_LINK.sub(r"\1", text)
+    text = _LINK.sub(r"\1", text)
+    text = _QUOTES.sub("", text)
+    text = _TAG.sub("", text)
+    paragraphs = (" ".join(line.split()) for line in text.split("\n"))
+    return "\n".join(p for p in paragraphs if p)
+
+
+def wikitext_lead(text: str) -> str:
+    """Convert the lead section of an article's wikitext to plain text."""
+    heading = HEADING.search(text)
+    return wikitext_to_text(text[:heading.start()] if heading else text)
+
+
+def section_text(text: str) -> str:
+    """
+    Convert the wikitext of one section to plain text.
+
+    The section's own heading is dropped and its subsections are cut off,
+    since they are separate sections with their own index.
+    """
+    heading = HEADING.match(text.lstrip())
+    if heading:
+        text = text.lstrip()[heading.end():]
+    return wikitext_lead(text)
+
+
+def strip_tags(text: str) -> str:
+    """Remove HTML tags, as found in the section headings returned by the API."""
+    return _TAG.sub("", text)
+
+
+def is_disambiguation(text: str) -> bool:
+    return bool(_DISAMBIGUATION.search(text))
+
+
+def disambiguation_options(text: str) -> List[str]:
+    """Return the first link of each list item on a disambiguation page."""
+    return [link.strip() for link in _LIST_LINK.findall(text)]
+
+
+def is_article_title(title: str) -> bool:
+    """Return whether `title` is in the article namespace, judging by its prefix."""
+    namespace, colon, _ = title.partition(":")
+    return not colon or namespace.strip() not in NON_ARTICLE_NAMESPACES
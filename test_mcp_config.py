@@ -62,7 +62,7 @@ def test_mcp_configuration():
         env['PYTHONPATH'] = pythonpath_env
         result = subprocess.run([
             python_path, '-c', 
-            'import wikipedia, mcp; from wikipedia_assistant.server import fetch_wikipedia_info; print("All imports successful")'
+            'import httpx, mcp; from wikipedia_assistant.server import fetch_wikipedia_info; print("All imports successful")'
         ], capture_output=True, text=True, env=env, cwd=project_root)
         
         if result.returncode == 0:
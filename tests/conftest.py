@@ -0,0 +1,262 @@
+"""Shared fixtures: an in-process stand-in for the MediaWiki action API."""
+import os
+import re
+import sys
+from typing import Dict, List, Optional
+
+import httpx
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from wikipedia_assistant import server  # noqa: E402
+from wikipedia_assistant.replay import RecordReplayTransport  # noqa: E402
+from wikipedia_assistant.wikipedia_client import WikipediaClient  # noqa: E402
+
+HTTP_FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "http")
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-slow", action="store_true",
+        help="also run the tests marked slow, which spawn Python processes",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "slow: spawns Python processes; skipped unless --run-slow is given"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-slow"):
+        return
+    skip = pytest.mark.skip(reason="slow; run with --run-slow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip)
+
+
+class FakeMediaWiki:
+    """
+    Serves a tiny article set through httpx.MockTransport.
+
+    Only the API features the client uses are implemented. Every request is
+    recorded in `requests` so tests can assert on round-trip counts. Like the
+    real API, intro extracts are returned for at most 20 pages per response.
+    """
+
+    MAX_EXTRACTS = 20
+
+    def __init__(self, lang: str = "en"):
+        self.lang = lang
+        self.pages: Dict[str, dict] = {}
+        self.redirects: Dict[str, str] = {}
+        self.requests: List[httpx.Request] = []
+
+    def add_page(
+        self,
+        title: str,
+        extract: str,
+        *,
+        disambiguation: bool = False,
+        links: Optional[List[str]] = None,
+        keywords: str = "",
+        wikitext: Optional[str] = None,
+    ) -> None:
+        self.pages[title] = {
+            "pageid": len(self.pages) + 1,
+            "extract": extract,
+            "wikitext": self._wikitext(extract, links) if wikitext is None else wikitext,
+            "disambiguation": disambiguation,
+            "links": links or [],
+            "keywords": keywords,
+        }
+
+    @staticmethod
+    def _wikitext(extract: str, links: Optional[List[str]]) -> str:
+        # Disambiguation pages list their options as "* [[Title]]" items.
+        return "\n".join([extract] + [f"* [[{link}]]" for link in links or []])
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    def client(self, **kwargs) -> WikipediaClient:
+        return WikipediaClient(lang=self.lang, transport=self.transport(), **kwargs)
+
+    def url(self, title: str) -> str:
+        return f"https://{self.lang}.wikipedia.org/wiki/{title.replace(' ', '_')}"
+
+    # -- request handling -------------------------------------------------
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        params = dict(request.url.params)
+        if params.get("action") == "parse":
+            return httpx.Response(200, json=self._parse(params))
+        if params.get("list") == "search":
+            hits = self._search(params["srsearch"], int(params.get("srlimit", 10)))
+            return httpx.Response(
+                200, json={"query": {"search": [{"title": t} for t in hits]}}
+            )
+        if params.get("generator") == "search":
+            hits = self._search(params["gsrsearch"], int(params.get("gsrlimit", 10)))
+            return httpx.Response(200, json=self._pages_response(hits, params, True))
+        if "titles" in params:
+            titles = params["titles"].split("|")
+            return httpx.Response(200, json=self._pages_response(titles, params))
+        return httpx.Response(
+            200, json={"error": {"code": "badparams", "info": "Unsupported request"}}
+        )
+
+    def _parse(self, params: dict) -> dict:
+        title = self.redirects.get(params["page"], params["page"])
+        page = self.pages.get(title)
+        if page is None:
+            return {"error": {"code": "missingtitle", "info": "The page doesn't exist."}}
+        text = page["wikitext"]
+        headings = list(re.finditer(r"^(=+)\s*([^=\n]+?)\s*\1\s*$", text, re.M))
+        if params["prop"] == "sections":
+            sections = [
+                {
+                    "index": str(number),
+                    "line": match.group(2),
+                    "level": str(len(match.group(1))),
+                    "byteoffset": len(text[:match.start()].encode("utf-8")),
+                }
+                for number, match in enumerate(headings, start=1)
+            ]
+            return {"parse": {"title": title, "sections": sections}}
+        # Like the real API, a section's wikitext runs up to the next heading
+        # of the same or a higher level, so it includes its subsections.
+        if "section" not in params:
+            return {"parse": {"title": title, "wikitext": text}}
+        number = int(params["section"])
+        if number == 0:
+            end = headings[0].start() if headings else len(text)
+            return {"parse": {"title": title, "wikitext": text[:end]}}
+        start = headings[number - 1]
+        level = len(start.group(1))
+        end = next(
+            (m.start() for m in headings[number:] if len(m.group(1)) <= level), len(text)
+        )
+        return {"parse": {"title": title, "wikitext": text[start.start():end]}}
+
+    def _search(self, query: str, limit: int) -> List[str]:
+        words = set(query.lower().split())
+        scored = []
+        for title, page in self.pages.items():
+            haystack = set(f"{title} {page['keywords']}".lower().split())
+            score = len(words & haystack)
+            if score:
+                scored.append((-score, page["pageid"], title))
+        return [title for _, _, title in sorted(scored)[:limit]]
+
+    def _pages_response(self, titles: List[str], params: dict, ranked: bool = False) -> dict:
+        props = set(params.get("prop", "").split("|"))
+        query: dict = {"pages": []}
+        redirects = []
+        extract_offset = int(params.get("excontinue", 0))
+        extracts_sent = 0
+        for index, requested in enumerate(titles, start=1):
+            title = requested
+            if title in self.redirects:
+                title = self.redirects[title]
+                redirects.append({"from": requested, "to": title})
+            page = self.pages.get(title)
+            if page is None:
+                query["pages"].append({"ns": 0, "title": title, "missing": True})
+                continue
+            entry = {"pageid": page["pageid"], "ns": 0, "title": title}
+            if ranked:
+                entry["index"] = index
+            if "extracts" in props and index > extract_offset:
+                if extracts_sent < self.MAX_EXTRACTS:
+                    entry["extract"] = page["extract"]
+                extracts_sent += 1
+            if "info" in props:
+                entry["fullurl"] = self.url(title)
+                entry["length"] = len(page["wikitext"].encode("utf-8"))
+            if "pageprops" in props and page["disambiguation"]:
+                entry["pageprops"] = {"disambiguation": ""}
+            if "links" in props:
+                entry["links"] = [{"ns": 0, "title": link} for link in page["links"]]
+            query["pages"].append(entry)
+        if redirects:
+            query["redirects"] = redirects
+        if not query["pages"]:
+            return {"batchcomplete": True}
+        if extracts_sent > self.MAX_EXTRACTS:
+            return {
+                "continue": {
+                    "excontinue": extract_offset + self.MAX_EXTRACTS,
+                    "continue": "||",
+                },
+                "query": query,
+            }
+        return {"batchcomplete": True, "query": query}
+
+
+@pytest.fixture(autouse=True)
+def isolated_server_state():
+    """Keep tests from touching the on-disk cache in the home directory."""
+    server.set_cache(None)
+    server.set_negative_cache(None)
+    server.set_vector_index(None)
+    yield
+    server.set_cache(None)
+    server.set_negative_cache(None)
+    server.set_vector_index(None)
+
+
+@pytest.fixture
+def fake_wiki() -> FakeMediaWiki:
+    wiki = FakeMediaWiki()
+    wiki.add_page(
+        "Python (programming language)",
+        "Python is a high-level, general-purpose programming language. "
+        "Its design philosophy emphasizes code readability.",
+        keywords="python programming language",
+    )
+    wiki.add_page(
+        "Alan Turing",
+        "Alan Mathison Turing was an English mathematician and computer scientist.",
+        keywords="alan turing mathematician",
+    )
+    wiki.add_page(
+        "Mercury",
+        "Mercury may refer to:",
+        disambiguation=True,
+        links=[
+            "Mercury (planet)",
+            "Mercury (element)",
+            "Mercury (mythology)",
+            "Mercury Records",
+            "Freddie Mercury",
+            "Mercury, Nevada",
+        ],
+        keywords="mercury",
+    )
+    wiki.add_page(
+        "Mercury (planet)",
+        "Mercury is the first planet from the Sun and the smallest in the Solar System.",
+        keywords="mercury planet",
+    )
+    wiki.redirects["Turing"] = "Alan Turing"
+    return wiki
+
+
+@pytest.fixture
+def replay_transport(request):
+    """
+    Factory for transports that replay tests/fixtures/http/<test module>.json.
+
+    Replay is strict, so a request missing from the file fails the test. Run
+    with WIKIPEDIA_FIXTURES=record to record the file again from Wikipedia.
+    """
+    name = request.module.__name__.rsplit(".", 1)[-1]
+    path = os.path.join(HTTP_FIXTURES, f"{name}.json")
+    mode = os.environ.get("WIKIPEDIA_FIXTURES", "replay")
+    return lambda: RecordReplayTransport(path, mode)
@@ -0,0 +1,155 @@
+"""Test the offline benchmark suite and its mock MediaWiki server."""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from benchmarks import bench_startup, bench_store, bench_titles
+from benchmarks.bench_fetch import compare, make_queries, report, run_benchmark
+from benchmarks.mock_mediawiki import MockMediaWiki, create_app, generate_corpus
+from wikipedia_assistant.wikipedia_client import WikipediaClient
+
+
+def test_mock_server_answers_client_lookups():
+    """The mock API serves search, extracts and disambiguation flags."""
+    corpus = generate_corpus(50)
+    app = create_app(MockMediaWiki(corpus))
+    title = corpus[0]["title"]
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with WikipediaClient(api_url="http://mock/w/api.php", transport=transport) as client:
+            return await client.lookup(title.lower())
+
+    result = asyncio.run(run())
+    assert result["title"] == title
+    assert result["summary"] == corpus[0]["extract"]
+
+
+def test_mock_server_injects_errors():
+    """With an error rate of 1 every request fails with the configured status."""
+    app = create_app(MockMediaWiki(generate_corpus(10)), error_rate=1.0, error_status=503)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app)) as http:
+            return await http.get("http://mock/w/api.php", params={"list": "search"})
+
+    assert asyncio.run(run()).status_code == 503
+
+
+def test_compare_flags_regressions_past_threshold():
+    """Slower latency, lower throughput, errors and more memory count as regressions."""
+    level = {
+        "concurrency": 8, "requests": 100, "errors": 0,
+        "p95_ms": 10.0, "p99_ms": 20.0, "throughput_rps": 100.0,
+    }
+    baseline = {"levels": [level], "peak_rss_mb": 50.0}
+    same = {"levels": [dict(level, p95_ms=11.0)], "peak_rss_mb": 55.0}
+    assert compare(same, baseline, 0.2) == []
+    worse = {"levels": [dict(level, p95_ms=13.0, throughput_rps=70.0)], "peak_rss_mb": 70.0}
+    assert len(compare(worse, baseline, 0.2)) == 3
+    failing = {"levels": [dict(level, errors=1, error_rate=0.01)], "peak_rss_mb": 50.0}
+    assert compare(failing, baseline, 0.2) == ["c=8 errors: 0 -> 1"]
+
+
+def test_query_mix_is_deterministic():
+    """The same seed always produces the same queries."""
+    corpus = generate_corpus(100)
+    assert make_queries(corpus, 50, seed=1) == make_queries(corpus, 50, seed=1)
+
+
+def test_benchmark_run_and_report(tmp_path):
+    """A small in-process run reports every level and fails a faster baseline."""
+    corpus = generate_corpus(100)
+    transport = httpx.ASGITransport(app=create_app(MockMediaWiki(corpus)))
+    levels = asyncio.run(run_benchmark(
+        "http://mock/w/api.php", make_queries(corpus, 20), [1, 4], 0, transport
+    ))
+    assert [level["concurrency"] for level in levels] == [1, 4]
+    assert levels[0]["requests"] == 20
+    assert levels[0]["errors"] == 0
+
+    results = {"levels": levels, "peak_rss_mb": 50.0}
+    output = tmp_path / "bench.json"
+    assert report(results, str(output), None, 0.2) == 0
+    assert json.loads(output.read_text()) == results
+
+    fast = dict(results, levels=[dict(level, p95_ms=0.001) for level in levels])
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(fast))
+    assert report(results, str(output), str(baseline), 0.2) == 1
+
+
+def test_benchmark_counts_upstream_error_results():
+    """Tool results reporting an upstream failure are counted as errors."""
+    corpus = generate_corpus(100)
+    app = create_app(MockMediaWiki(corpus), error_rate=1.0)
+    levels = asyncio.run(run_benchmark(
+        "http://mock/w/api.php", make_queries(corpus, 10), [2], 0, httpx.ASGITransport(app=app)
+    ))
+    assert levels[0]["errors"] == 10
+    assert levels[0]["error_rate"] == 1.0
+
+
+def test_parse_importtime_and_startup_regressions():
+    """Importtime rows are parsed and slower startup figures are flagged."""
+    rows = bench_startup.parse_importtime(
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   json.decoder\n"
+        "import time:      5000 |       5120 | wikipedia_assistant.server\n"
+    )
+    assert rows == [("json.decoder", 120, 120), ("wikipedia_assistant.server", 5000, 5120)]
+    baseline = {"import_ms": 100.0, "initialize_ms": 200.0, "tools_list_ms": 210.0}
+    results = dict(baseline, initialize_ms=260.0)
+    assert bench_startup.compare(results, baseline, 0.2) == ["initialize_ms: 200.0 -> 260.0"]
+
+
+@pytest.mark.slow
+def test_server_import_defers_numpy():
+    """Importing the server module does not load NumPy-backed modules."""
+    modules = {name for name, _, _ in bench_startup.measure_import()}
+    assert "wikipedia_assistant.server" in modules
+    assert "numpy" not in modules
+    assert "wikipedia_assistant.summarizer" not in modules
+
+
+@pytest.mark.slow
+def test_stdio_handshake_is_timed():
+    """The spawned stdio server answers initialize and lists the tools."""
+    result = bench_startup.measure_handshake()
+    assert result["tools"] == 4
+    assert 0 < result["initialize_ms"] <= result["tools_list_ms"]
+
+
+def test_store_benchmark_measures_every_store(tmp_path):
+    """Each store reports its size and lookup latency; larger files regress."""
+    store = bench_store.make_store(str(tmp_path / "wiki.sqlite3"), 60)
+    try:
+        results = bench_store.run_benchmark(store, str(tmp_path), lookups=20)
+    finally:
+        store.close()
+    stores = results["stores"]
+    assert {"sqlite", "zlib-4k", "zlib-16k-dict"} <= set(stores)
+    assert stores["zlib-4k"]["file_bytes"] < stores["sqlite"]["file_bytes"]
+    assert stores["zlib-4k"]["compression_ratio"] > 1
+    assert bench_store.compare(results, results, 0.2) == []
+
+    smaller = {"stores": {"zlib-4k": dict(stores["zlib-4k"], file_bytes=1)}}
+    assert len(bench_store.compare(results, smaller, 0.2)) == 1
+
+
+def test_title_benchmark_times_typos(tmp_path):
+    """Typos resolve in well under a few milliseconds; slower runs regress."""
+    titles = bench_titles.make_titles(3000)
+    results = bench_titles.run_benchmark(titles, str(tmp_path), lookups=50)
+    kinds = results["kinds"]
+    assert set(kinds) == {"exact", "one_typo", "two_typos"}
+    assert kinds["one_typo"]["p50_us"] < 2000
+    assert kinds["two_typos"]["p50_us"] < 5000
+    assert bench_titles.compare(results, results, 0.2) == []
+
+    faster = {"kinds": {"one_typo": dict(kinds["one_typo"], p50_us=0.1)}}
+    assert bench_titles.compare(results, faster, 0.2) == [
+        f"one_typo p50_us: 0.1 -> {kinds['one_typo']['p50_us']}"
+    ]
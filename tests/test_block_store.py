@@ -0,0 +1,104 @@
+"""Test the compressed, memory-mapped block store."""
+import asyncio
+import os
+
+import pytest
+
+from wikipedia_assistant import server
+from wikipedia_assistant.block_store import BlockStore, build, is_block_store, main
+from wikipedia_assistant.dump import ingest
+from wikipedia_assistant.offline_store import OfflineStore
+
+XML_DUMP = os.path.join(os.path.dirname(__file__), "fixtures", "sample-pages-articles.xml.bz2")
+
+
+@pytest.fixture
+def sqlite_store(tmp_path):
+    store = OfflineStore(str(tmp_path / "wiki.sqlite3"))
+    ingest(XML_DUMP, store)
+    yield store
+    store.close()
+
+
+def _articles(count):
+    # Keys sort like the titles: "article 00000", "article 00001", ...
+    return [
+        {
+            "title": f"Article {i:05d}",
+            "summary": f"Article {i} is one of many similar articles. " * 5,
+        }
+        for i in range(count)
+    ]
+
+
+def test_pack_matches_the_sqlite_store(sqlite_store, tmp_path):
+    """Every title and redirect resolves to the same article as in SQLite."""
+    path = str(tmp_path / "wiki.blocks")
+    assert main(["--store", sqlite_store.path, "--output", path]) == 0
+    assert is_block_store(path) and not is_block_store(sqlite_store.path)
+
+    blocks = BlockStore(path)
+    assert len(blocks) == len(sqlite_store) == 4
+    for title in ("Alan Turing", "turing", "Python_programming_language", "Mercury", "Nope"):
+        assert blocks.get(title) == sqlite_store.get(title)
+    assert blocks.get("Mercury")["options"][0] == "Mercury (planet)"
+    assert [title for title, _ in blocks.iter_articles()] == sorted(
+        title for title, _ in sqlite_store.iter_articles()
+    )
+    blocks.close()
+
+
+@pytest.mark.parametrize("dictionary_size", [0, 4096])
+def test_random_access_across_blocks(tmp_path, dictionary_size):
+    """Articles in any block decode, with or without a dictionary."""
+    path = str(tmp_path / "many.blocks")
+    articles = _articles(500)
+    build(
+        articles, [("Alias", "Article 00250"), ("Dangling", "Missing")], path,
+        block_size=1024, dictionary_size=dictionary_size,
+    )
+    store = BlockStore(path)
+    assert store.footer["block_count"] > 50
+    assert store.footer["sections"]["blocks"][1] < store.footer["raw_bytes"] / 4
+    for i in (0, 1, 137, 250, 499):
+        assert store.get(f"article {i:05d}")["summary"] == articles[i]["summary"]
+    assert store.get("alias")["title"] == "Article 00250"
+    assert store.get("Dangling") is None
+    store.close()
+
+
+def test_build_rejects_unsorted_articles(tmp_path):
+    """Articles must arrive in key order, as OfflineStore.iter_records yields them."""
+    with pytest.raises(ValueError):
+        build(list(reversed(_articles(3))), [], str(tmp_path / "bad.blocks"))
+
+
+def test_zstd_codec(tmp_path):
+    """The zstd codec round-trips with a trained dictionary."""
+    pytest.importorskip("zstandard")
+    path = str(tmp_path / "zstd.blocks")
+    articles = _articles(2000)
+    build(articles, [], path, codec="zstd", block_size=2048, dictionary_size=8192)
+    store = BlockStore(path)
+    assert store.get("Article 01999")["summary"] == articles[1999]["summary"]
+    store.close()
+
+
+def test_block_store_backend_serves_the_tool(sqlite_store, tmp_path):
+    """create_backend recognizes a block store and the tool answers from it."""
+    path = str(tmp_path / "wiki.blocks")
+    main(["--store", sqlite_store.path, "--output", path])
+    backend = server.create_backend("offline", path)
+    assert isinstance(backend, BlockStore)
+
+    async def run(*queries):
+        server.set_client(backend)
+        try:
+            return [await server.fetch_wikipedia_info(q) for q in queries]
+        finally:
+            server.set_client(None)
+            await backend.aclose()
+
+    turing, mercury = asyncio.run(run("Turing", "Mercury"))
+    assert turing["url"] == "https://en.wikipedia.org/wiki/Alan_Turing"
+    assert mercury["disambiguation"] == "Mercury"
@@ -0,0 +1,139 @@
+"""Test the persistent SQLite result cache."""
+import multiprocessing
+import sqlite3
+import time
+
+import pytest
+
+from wikipedia_assistant import cache as cache_module
+from wikipedia_assistant.cache import NegativeCache, ResultCache, make_key
+
+RESULT = {"title": "Alan Turing", "summary": "Mathematician.", "url": "https://x"}
+
+
+def test_make_key_normalizes_case_and_spacing():
+    """Casing and whitespace variants map to the same key."""
+    assert make_key("  Alan   TURING ", "en") == make_key("alan turing", "en")
+    assert make_key("alan turing", "de") != make_key("alan turing", "en")
+
+
+def test_round_trip_survives_reopen(tmp_path):
+    """Entries written by one instance are visible to a new one."""
+    path = str(tmp_path / "cache.sqlite3")
+    first = ResultCache(path)
+    first.set("Alan Turing", "en", RESULT)
+    first.close()
+
+    second = ResultCache(path)
+    assert second.get("alan turing", "en") == RESULT
+    assert second.get("alan turing", "de") is None
+
+
+def test_expired_entries_are_misses(tmp_path):
+    """Entries past their TTL are not returned."""
+    cache = ResultCache(str(tmp_path / "cache.sqlite3"))
+    cache.set("Alan Turing", "en", RESULT, ttl=-1)
+    assert cache.get("Alan Turing", "en") is None
+
+
+def test_size_cap_evicts_least_recently_used(tmp_path, monkeypatch):
+    """Inserting past max_entries drops the least recently used entry."""
+    monkeypatch.setattr(cache_module, "ACCESS_GRANULARITY", 0.0)
+    cache = ResultCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.set("a", "en", RESULT)
+    cache.set("b", "en", RESULT)
+    assert cache.get("a", "en") == RESULT
+    cache.set("c", "en", RESULT)
+
+    assert len(cache) == 2
+    assert cache.get("b", "en") is None
+    assert cache.get("a", "en") == RESULT
+
+
+def test_size_is_checked_every_hundredth_of_the_cap(tmp_path):
+    """The entry count is only checked every max_entries // 100 writes."""
+    cache = ResultCache(str(tmp_path / "cache.sqlite3"), max_entries=200)
+    for i in range(201):
+        cache.set(f"q{i}", "en", RESULT)
+    assert len(cache) == 201
+    cache.set("q201", "en", RESULT)
+    assert len(cache) == 200
+
+
+def test_writes_are_skipped_while_another_writer_holds_the_lock(tmp_path):
+    """A locked file costs a write the busy timeout, not seconds, and reads go on."""
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResultCache(path)
+    cache.set("a", "en", RESULT)
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.monotonic()
+        cache.set("b", "en", RESULT)
+        assert time.monotonic() - started < 1.0
+        assert cache.get("a", "en") == RESULT
+    finally:
+        other.execute("ROLLBACK")
+        other.close()
+    assert cache.get("b", "en") is None
+    cache.set("b", "en", RESULT)
+    assert cache.get("b", "en") == RESULT
+
+
+def _write_entries(path, prefix):
+    # Every write must land, so wait for the other writers instead of skipping.
+    cache = ResultCache(path, timeout=5.0)
+    for i in range(50):
+        cache.set(f"{prefix}{i}", "en", RESULT)
+    cache.close()
+
+
+@pytest.mark.slow
+def test_concurrent_processes_share_the_file(tmp_path):
+    """Several processes can write the same cache file at once."""
+    path = str(tmp_path / "cache.sqlite3")
+    ResultCache(path).close()
+    workers = [
+        multiprocessing.Process(target=_write_entries, args=(path, prefix))
+        for prefix in "xyz"
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert all(worker.exitcode == 0 for worker in workers)
+    assert len(ResultCache(path)) == 150
+
+
+def test_stale_entries_are_served_and_flagged(tmp_path):
+    """Entries near or past expiry are returned with the refresh flag set."""
+    cache = ResultCache(str(tmp_path / "cache.sqlite3"), stale_ttl=60, refresh_ahead=30)
+    cache.set_json("fresh", "en", '"f"', ttl=3600)
+    cache.set_json("expiring", "en", '"e"', ttl=10)
+    cache.set_json("expired", "en", '"x"', ttl=-10)
+    cache.set_json("gone", "en", '"g"', ttl=-120)
+
+    assert cache.lookup_json("fresh", "en") == ('"f"', False)
+    assert cache.lookup_json("expiring", "en") == ('"e"', True)
+    assert cache.lookup_json("expired", "en") == ('"x"', True)
+    assert cache.lookup_json("gone", "en") == (None, True)
+    assert cache.lookup_json("missing", "en") == (None, True)
+    assert cache.get_json("expired", "en") is None
+
+
+def test_negative_cache_expires_and_stays_bounded(monkeypatch):
+    """Failures expire after their TTL and the oldest are dropped past the cap."""
+    clock = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: clock[0])
+    cache = NegativeCache(ttl=60, max_entries=2)
+    cache.set("junk 1", "en", "no results")
+    cache.set("junk 2", "en", "no results")
+    assert cache.get("JUNK 1", "en") == "no results"
+    cache.set("junk 3", "en", "no results")
+
+    assert len(cache) == 2
+    assert cache.get("junk 2", "en") is None
+    assert cache.get("junk 1", "de") is None
+    clock[0] += 61
+    assert cache.get("junk 1", "en") is None
@@ -0,0 +1,275 @@
+"""Test the async Wikipedia client against the fake MediaWiki API."""
+import asyncio
+
+import httpx
+import pytest
+
+from wikipedia_assistant.ratelimit import RateLimiter
+from wikipedia_assistant.wikipedia_client import (
+    DisambiguationError,
+    PageError,
+    WikipediaClient,
+)
+
+
+def test_search_returns_titles(fake_wiki):
+    """Search returns matching titles in rank order."""
+    async def run():
+        async with fake_wiki.client() as client:
+            return await client.search("python programming")
+
+    assert asyncio.run(run()) == ["Python (programming language)"]
+
+
+def test_page_follows_redirects(fake_wiki):
+    """Page lookups follow redirects to the canonical article."""
+    async def run():
+        async with fake_wiki.client() as client:
+            return await client.page("Turing")
+
+    result = asyncio.run(run())
+    assert result["title"] == "Alan Turing"
+    assert result["url"] == "https://en.wikipedia.org/wiki/Alan_Turing"
+    assert result["summary"].startswith("Alan Mathison Turing")
+
+
+def test_page_errors(fake_wiki):
+    """Missing and disambiguation pages raise the matching errors."""
+    async def run(title):
+        async with fake_wiki.client() as client:
+            return await client.page(title)
+
+    with pytest.raises(PageError):
+        asyncio.run(run("Does not exist"))
+    with pytest.raises(DisambiguationError) as excinfo:
+        asyncio.run(run("Mercury"))
+    assert excinfo.value.options[0] == "Mercury (planet)"
+
+
+def test_disambiguation_options_keep_page_order(fake_wiki):
+    """Options follow the page's list items, not the alphabetical link order."""
+    fake_wiki.add_page(
+        "Jaguar (disambiguation)", "Jaguar may refer to:", disambiguation=True,
+        links=["Jaguar", "Jaguar Cars", "Atari Jaguar"],
+    )
+    fake_wiki.add_page(
+        "Puma (disambiguation)", "Puma may refer to:", disambiguation=True,
+        links=["Puma (brand)", "Cougar"], wikitext="Puma may refer to [[Cougar]].",
+    )
+
+    async def run(title):
+        async with fake_wiki.client() as client:
+            with pytest.raises(DisambiguationError) as excinfo:
+                await client.page(title)
+            return excinfo.value.options
+
+    assert asyncio.run(run("Jaguar (disambiguation)")) == [
+        "Jaguar", "Jaguar Cars", "Atari Jaguar"
+    ]
+    # Without list items the article links are used.
+    assert asyncio.run(run("Puma (disambiguation)")) == ["Puma (brand)", "Cougar"]
+
+
+def test_client_uses_configured_pool_limits(fake_wiki):
+    """Connection limits are passed through to the pooled transport."""
+    async def run():
+        async with fake_wiki.client(max_connections=7, timeout=3.0) as client:
+            return client._http.timeout.read
+
+    assert asyncio.run(run()) == 3.0
+
+
+def test_lookup_is_a_single_round_trip(fake_wiki):
+    """Lookup fetches title, extract and URL with one request."""
+    async def run():
+        async with fake_wiki.client() as client:
+            return await client.lookup("alan turing")
+
+    result = asyncio.run(run())
+    assert result["title"] == "Alan Turing"
+    assert result["url"] == "https://en.wikipedia.org/wiki/Alan_Turing"
+    assert len(fake_wiki.requests) == 1
+    assert fake_wiki.requests[0].url.params["generator"] == "search"
+
+
+def test_lookup_no_results_and_disambiguation(fake_wiki):
+    """Lookup returns None without hits and falls back for disambiguation."""
+    async def run(query):
+        async with fake_wiki.client() as client:
+            return await client.lookup(query)
+
+    assert asyncio.run(run("xyznonexistent")) is None
+    with pytest.raises(DisambiguationError) as excinfo:
+        asyncio.run(run("mercury"))
+    assert "Mercury (planet)" in excinfo.value.options
+
+
+def test_lookup_many_packs_titles(fake_wiki):
+    """Batched lookups keep order and share one packed page request."""
+    for i in range(30):
+        fake_wiki.add_page(f"Topic {i}", f"Extract {i}.", keywords=f"topic{i}")
+
+    async def run():
+        async with fake_wiki.client() as client:
+            return await client.lookup_many(
+                [f"topic{i}" for i in range(30)] + ["nothing here", "mercury"]
+            )
+
+    outcomes = asyncio.run(run())
+    assert [o["title"] for o in outcomes[:30]] == [f"Topic {i}" for i in range(30)]
+    assert all(o["summary"] == f"Extract {i}." for i, o in enumerate(outcomes[:30]))
+    assert outcomes[30] is None
+    assert isinstance(outcomes[31], DisambiguationError)
+
+    page_requests = [r for r in fake_wiki.requests if "titles" in r.url.params]
+    # One packed request plus one extract continuation; the disambiguation
+    # options come from the page's wikitext.
+    assert len(page_requests) == 2
+    assert len(page_requests[0].url.params["titles"].split("|")) == 31
+
+
+def test_lookup_many_loads_disambiguation_options_concurrently(fake_wiki):
+    """The options of several disambiguation pages are fetched in parallel."""
+    for name in ("Jaguar", "Puma", "Lynx"):
+        fake_wiki.add_page(
+            f"{name} (disambiguation)", f"{name} may refer to:", disambiguation=True,
+            links=[f"{name} (animal)", f"{name} (brand)"], keywords=name.lower(),
+        )
+    in_flight = 0
+    peak = 0
+    handle = fake_wiki.handle
+
+    async def slow_handle(request):
+        nonlocal in_flight, peak
+        parse = request.url.params.get("action") == "parse"
+        in_flight += parse
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= parse
+        return handle(request)
+
+    async def run():
+        async with WikipediaClient(transport=httpx.MockTransport(slow_handle)) as client:
+            return await client.lookup_many(["jaguar", "puma", "lynx", "jaguar"])
+
+    outcomes = asyncio.run(run())
+    assert all(isinstance(o, DisambiguationError) for o in outcomes)
+    assert outcomes[1].options == ["Puma (animal)", "Puma (brand)"]
+    assert outcomes[3].options == outcomes[0].options
+    parses = [r for r in fake_wiki.requests if r.url.params.get("action") == "parse"]
+    assert len(parses) == 3
+    assert peak == 3
+
+
+def test_pages_splits_at_fifty_titles(fake_wiki):
+    """More than fifty titles are split across several requests."""
+    titles = [f"Missing {i}" for i in range(120)] + ["Turing"]
+
+    async def run():
+        async with fake_wiki.client() as client:
+            return await client.pages(titles)
+
+    found = asyncio.run(run())
+    assert list(found) == ["Turing"]
+    assert found["Turing"]["title"] == "Alan Turing"
+    assert len(fake_wiki.requests) == 3
+
+
+def test_lookup_uses_local_search_index(fake_wiki, tmp_path):
+    """With a local index, lookup skips the remote search request."""
+    from wikipedia_assistant.search_index import SearchIndex, build
+
+    path = str(tmp_path / "wiki.bm25")
+    build([("Alan Turing", "computer scientist codebreaker")], path)
+
+    async def run():
+        async with fake_wiki.client(search_index=SearchIndex(path)) as client:
+            return await client.lookup("codebreaker")
+
+    assert asyncio.run(run())["title"] == "Alan Turing"
+    assert "generator" not in fake_wiki.requests[0].url.params
+    assert len(fake_wiki.requests) == 1
+
+
+def test_lookup_many_uses_local_search_index(fake_wiki, tmp_path):
+    """Batch lookups search the local index first, too."""
+    from wikipedia_assistant.search_index import SearchIndex, build
+
+    path = str(tmp_path / "wiki.bm25")
+    build([("Alan Turing", "computer scientist codebreaker")], path)
+
+    async def run():
+        async with fake_wiki.client(search_index=SearchIndex(path)) as client:
+            return await client.lookup_many(["codebreaker", "python programming"])
+
+    outcomes = asyncio.run(run())
+    assert [o["title"] for o in outcomes] == ["Alan Turing", "Python (programming language)"]
+    searches = [r for r in fake_wiki.requests if "list" in r.url.params]
+    # Only the query without a local hit was searched remotely.
+    assert [r.url.params["srsearch"] for r in searches] == ["python programming"]
+
+
+ENIGMA = """'''Enigma''' was a [[cipher]] machine.{{Infobox machine}}
+== Design ==
+The rotors ''stepped'' on every key press.<ref>Source</ref>
+=== Rotors ===
+Each rotor had 26 contacts.
+== History ==
+It was used in the Second World War.
+"""
+
+
+def test_sections_outline_and_section_text(fake_wiki):
+    """The outline lists sections with sizes; sections come back as plain text."""
+    fake_wiki.add_page("Enigma machine", "Enigma was a cipher machine.", wikitext=ENIGMA)
+
+    async def run():
+        async with fake_wiki.client() as client:
+            outline = await client.sections("Enigma machine")
+            texts = [await client.section("Enigma machine", i) for i in range(4)]
+            return outline, texts
+
+    outline, texts = asyncio.run(run())
+    assert [s["heading"] for s in outline["sections"]] == [
+        "(Lead)", "Design", "Rotors", "History"
+    ]
+    assert [s["level"] for s in outline["sections"]] == [1, 2, 3, 2]
+    assert sum(s["bytes"] for s in outline["sections"]) == outline["bytes"]
+    assert texts == [
+        "Enigma was a cipher machine.",
+        "The rotors stepped on every key press.",
+        "Each rotor had 26 contacts.",
+        "It was used in the Second World War.",
+    ]
+
+
+def test_sections_missing_page(fake_wiki):
+    """Outlines and sections of missing pages raise PageError."""
+    async def run(call):
+        async with fake_wiki.client() as client:
+            return await call(client)
+
+    with pytest.raises(PageError):
+        asyncio.run(run(lambda c: c.sections("Does not exist")))
+    with pytest.raises(PageError):
+        asyncio.run(run(lambda c: c.section("Does not exist", 0)))
+
+
+def test_for_language_keeps_settings_with_its_own_pool():
+    """Per-language clients get their own pool, host and URL from the template."""
+    # A transport of its own spares each pool the default SSL context setup.
+    transport = httpx.MockTransport(lambda request: httpx.Response(200))
+
+    async def run():
+        limiter = RateLimiter()
+        async with WikipediaClient(
+            timeout=3.0, rate_limiter=limiter, api_url="http://mock/{lang}/api.php",
+            transport=transport,
+        ) as client:
+            async with client.for_language("de") as german:
+                assert german._http is not client._http
+                assert german.rate_limiter is limiter
+                return german.lang, german.api_url, german._http.timeout.read
+
+    assert asyncio.run(run()) == ("de", "http://mock/de/api.php", 3.0)
+    assert WikipediaClient(transport=transport).for_language("fr").host == "fr.wikipedia.org"
@@ -0,0 +1,113 @@
+"""Test the shared backend daemon and its stdio shim."""
+import json
+import os
+import signal
+import socket
+import stat
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from wikipedia_assistant import daemon
+
+
+def test_relay_forwards_both_ways_and_half_closes():
+    """The shim copies bytes unchanged and passes end of input on."""
+    shim_side, daemon_side = socket.socketpair()
+    stdin_read, stdin_write = os.pipe()
+    stdout_read, stdout_write = os.pipe()
+
+    def fake_daemon():
+        received = b""
+        while True:
+            data = daemon_side.recv(1024)
+            if not data:
+                break
+            received += data
+        daemon_side.sendall(received.upper())
+        daemon_side.close()
+
+    thread = threading.Thread(target=fake_daemon)
+    thread.start()
+    os.write(stdin_write, b'{"id":1}\n{"id":2}\n')
+    os.close(stdin_write)
+    daemon.relay(shim_side, stdin_read, stdout_write)
+    thread.join()
+    os.close(stdout_write)
+
+    with os.fdopen(stdout_read, "rb") as f:
+        assert f.read() == b'{"ID":1}\n{"ID":2}\n'
+    shim_side.close()
+    os.close(stdin_read)
+
+
+def _request(sock_file, message):
+    sock_file.write(json.dumps(message) + "\n")
+    sock_file.flush()
+    return json.loads(sock_file.readline())
+
+
+def _handshake(sock):
+    with sock.makefile("rw", encoding="utf-8") as f:
+        _request(f, {
+            "jsonrpc": "2.0", "id": 1, "method": "initialize",
+            "params": {
+                "protocolVersion": "2025-03-26",
+                "capabilities": {},
+                "clientInfo": {"name": "test", "version": "0"},
+            },
+        })
+        f.write(json.dumps({"jsonrpc": "2.0", "method": "notifications/initialized"}) + "\n")
+        return _request(f, {"jsonrpc": "2.0", "id": 2, "method": "tools/list"})["result"]
+
+
+@pytest.mark.slow
+@pytest.mark.skipif(not hasattr(socket, "SO_PEERCRED"), reason="needs SO_PEERCRED")
+def test_sessions_share_one_daemon(tmp_path, monkeypatch):
+    """The first connect starts the daemon; later sessions reuse it."""
+    monkeypatch.setenv("WIKIPEDIA_CACHE_PATH", "")
+    path = str(tmp_path / "d.sock")
+    pids = []
+    try:
+        for _ in range(2):
+            with daemon.connect(path) as sock:
+                creds = sock.getsockopt(
+                    socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+                )
+                pids.append(struct.unpack("3i", creds)[0])
+                assert len(_handshake(sock)["tools"]) == 4
+        # Other users cannot connect to the socket.
+        assert stat.S_IMODE(os.stat(path).st_mode) & 0o077 == 0
+    finally:
+        for pid in set(pids):
+            os.kill(pid, signal.SIGTERM)
+
+    assert pids[0] == pids[1]
+    deadline = time.monotonic() + 10
+    while os.path.exists(path) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert not os.path.exists(path)
+    with open(path + ".log") as log:
+        assert log.read().count("Listening on") == 1
+
+
+@pytest.mark.slow
+def test_daemon_flag_relays_before_importing_the_server():
+    """The command-line entry point starts the shim without the MCP server."""
+    script = (
+        "import sys\n"
+        "from wikipedia_assistant import cli, daemon\n"
+        "daemon.run_shim = lambda: print('shim')\n"
+        "cli.main(['--daemon'])\n"
+        "print(sorted(m for m in ('mcp', 'httpx', 'wikipedia_assistant.server')"
+        " if m in sys.modules))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True,
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+    ).stdout
+    assert output.splitlines() == ["shim", "[]"]
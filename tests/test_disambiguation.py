@@ -0,0 +1,26 @@
+"""Test candidate ranking for ambiguous queries."""
+from wikipedia_assistant.disambiguation import rank_candidates, snippet
+
+
+def candidate(title, summary):
+    return {"title": title, "summary": summary, "url": f"https://x/{title}"}
+
+
+def test_rank_prefers_query_terms_in_title_then_extract():
+    """Title matches outrank extract matches; listing order breaks ties."""
+    candidates = [
+        candidate("Java (island)", "Java is an island of Indonesia."),
+        candidate("Java (programming language)", "Java is a programming language."),
+        candidate("Java coffee", "Coffee grown on the island of Java."),
+    ]
+    ranked = [c["title"] for _, c in rank_candidates("java programming", candidates)]
+    assert ranked[0] == "Java (programming language)"
+    ranked = [c["title"] for _, c in rank_candidates("java", candidates)]
+    assert ranked == ["Java (island)", "Java (programming language)", "Java coffee"]
+
+
+def test_snippet_is_first_sentence_within_limit():
+    """Snippets keep the first sentence and cut long ones at a word."""
+    assert snippet("One sentence here. Another one.") == "One sentence here."
+    assert snippet("word " * 100, limit=20) == "word word word…"
+    assert snippet("") == ""
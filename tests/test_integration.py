@@ -0,0 +1,67 @@
+"""Test the network transport end to end through the ASGI app."""
+import json
+
+import pytest
+from starlette.testclient import TestClient
+
+from wikipedia_assistant import server
+
+HEADERS = {"Accept": "application/json, text/event-stream"}
+
+
+def rpc(method, params, request_id=1):
+    return {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+
+
+@pytest.fixture
+def http_client(fake_wiki, monkeypatch):
+    monkeypatch.setattr(server.mcp.settings, "stateless_http", True)
+    monkeypatch.setattr(server.mcp.settings, "json_response", True)
+    monkeypatch.setattr(server.mcp, "_session_manager", None)
+    server.set_client(fake_wiki.client())
+    with TestClient(server.create_http_app()) as client:
+        yield client
+    server.set_client(None)
+
+
+def test_streamable_http_tool_call(http_client):
+    """A stateless HTTP request can initialize and call the tool."""
+    init = http_client.post(
+        "/mcp/",
+        headers=HEADERS,
+        json=rpc("initialize", {
+            "protocolVersion": "2025-03-26",
+            "capabilities": {},
+            "clientInfo": {"name": "test", "version": "0"},
+        }),
+    )
+    assert init.status_code == 200
+    assert init.json()["result"]["serverInfo"]["name"] == "WikipediaSearch"
+
+    call = http_client.post(
+        "/mcp/",
+        headers=HEADERS,
+        json=rpc("tools/call", {
+            "name": "fetch_wikipedia_info",
+            "arguments": {"query": "Alan Turing"},
+        }, request_id=2),
+    )
+    content = call.json()["result"]["content"]
+    assert json.loads(content[0]["text"])["title"] == "Alan Turing"
+
+
+def test_shutdown_closes_backend(fake_wiki, monkeypatch):
+    """Leaving the app lifespan closes the shared backend."""
+    monkeypatch.setattr(server.mcp, "_session_manager", None)
+    client = fake_wiki.client()
+    server.set_client(client)
+    with TestClient(server.create_http_app()):
+        pass
+    assert client._http.is_closed
+    assert server._client is None
+
+
+def test_sse_rejects_multiple_workers():
+    """SSE sessions live in one process, so several workers are refused."""
+    with pytest.raises(SystemExit):
+        server.main(["--transport", "sse", "--workers", "2"])
@@ -0,0 +1,80 @@
+"""Test request-path metrics and their Prometheus export."""
+import asyncio
+
+import pytest
+from starlette.testclient import TestClient
+
+from wikipedia_assistant import server
+from wikipedia_assistant.cache import ResultCache
+from wikipedia_assistant.metrics import METRICS, Metrics
+
+
+@pytest.fixture
+def metrics():
+    METRICS.enabled = True
+    METRICS.reset()
+    yield METRICS
+    METRICS.enabled = False
+    METRICS.reset()
+
+
+def test_render_prometheus_text():
+    """Counters and cumulative histogram buckets use the exposition format."""
+    m = Metrics(enabled=True)
+    m.inc("requests_total", (("status", "200"),))
+    m.inc("requests_total", (("status", "200"),))
+    m.observe("wikipedia_stage_seconds", 0.003, (("stage", "search"),))
+    m.observe("wikipedia_stage_seconds", 20.0, (("stage", "search"),))
+    text = m.render()
+    assert '# TYPE requests_total counter\nrequests_total{status="200"} 2\n' in text
+    assert 'wikipedia_stage_seconds_bucket{stage="search",le="0.0025"} 0' in text
+    assert 'wikipedia_stage_seconds_bucket{stage="search",le="0.005"} 1' in text
+    assert 'wikipedia_stage_seconds_bucket{stage="search",le="+Inf"} 2' in text
+    assert 'wikipedia_stage_seconds_count{stage="search"} 2' in text
+
+
+def test_disabled_metrics_record_nothing():
+    """With metrics off, timers are shared no-ops and nothing is stored."""
+    m = Metrics()
+    with m.time("search"):
+        pass
+    m.inc("requests_total")
+    assert m.time("a") is m.time("b")
+    assert m.render() == ""
+
+
+def test_tool_call_records_stages_and_cache(fake_wiki, tmp_path, metrics):
+    """A tool call times its stages and counts cache hits, misses and statuses."""
+    server.set_cache(ResultCache(str(tmp_path / "cache.sqlite3")))
+
+    async def run():
+        async with fake_wiki.client() as client:
+            server.set_client(client)
+            try:
+                await server.mcp.call_tool("fetch_wikipedia_info", {"query": "Alan Turing"})
+                await server.mcp.call_tool("fetch_wikipedia_info", {"query": "Alan Turing"})
+            finally:
+                server.set_client(None)
+
+    asyncio.run(run())
+    stages = {labels[0][1] for labels in metrics.histograms["wikipedia_stage_seconds"]}
+    assert {"cache", "search", "upstream", "encode"} <= stages
+    cache = metrics.counters["wikipedia_cache_requests_total"]
+    assert cache == {(("result", "hit"),): 1, (("result", "miss"),): 1}
+    assert metrics.counters["wikipedia_upstream_responses_total"] == {(("status", "200"),): 1}
+    tool = metrics.histograms["wikipedia_tool_seconds"][(("tool", "fetch_wikipedia_info"),)]
+    assert tool.count == 2
+
+
+def test_metrics_resource_and_http_endpoint(fake_wiki, metrics, monkeypatch):
+    """Metrics are readable as an MCP resource and over HTTP at /metrics."""
+    metrics.inc("wikipedia_upstream_retries_total")
+    contents = asyncio.run(server.mcp.read_resource("metrics://prometheus"))
+    assert "wikipedia_upstream_retries_total 1" in list(contents)[0].content
+
+    monkeypatch.setattr(server.mcp, "_session_manager", None)
+    with TestClient(server.create_http_app()) as client:
+        response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "wikipedia_upstream_retries_total 1" in response.text
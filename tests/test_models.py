@@ -0,0 +1,44 @@
+"""Test the tool result types and their JSON encoding."""
+import json
+
+from wikipedia_assistant.models import (
+    NO_RESULTS,
+    ArticleResult,
+    DisambiguationResult,
+    ErrorCode,
+)
+
+
+def test_article_json_is_encoded_once():
+    """The JSON form is computed on first use and then reused."""
+    result = ArticleResult("Zürich", "A city.", "https://en.wikipedia.org/wiki/Z%C3%BCrich")
+    text = result.to_json()
+    assert json.loads(text) == result.to_dict()
+    assert "Zürich" in text
+    assert result.to_json() is text
+
+
+def test_article_from_json_keeps_text():
+    """Results loaded from the cache reuse the stored JSON text."""
+    text = '{"title":"A","summary":"B","url":"C"}'
+    result = ArticleResult.from_json(text)
+    assert result == ArticleResult("A", "B", "C")
+    assert result.to_json() is text
+
+
+def test_results_are_slotted():
+    """Result objects carry no per-instance __dict__."""
+    assert not hasattr(ArticleResult("A", "B", "C"), "__dict__")
+    assert not hasattr(NO_RESULTS, "__dict__")
+
+
+def test_error_shapes():
+    """Errors keep the readable message and add a stable code."""
+    assert NO_RESULTS.to_dict() == {
+        "error": "No results found for your query.",
+        "code": ErrorCode.NO_RESULTS.value,
+    }
+    ambiguous = DisambiguationResult("Mercury", [f"Option {i}" for i in range(8)], []).to_dict()
+    assert ambiguous["code"] == "ambiguous"
+    assert ambiguous["options"] == [f"Option {i}" for i in range(5)]
+    assert ambiguous["error"].endswith("Option 3, Option 4")
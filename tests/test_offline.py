@@ -0,0 +1,87 @@
+"""Test dump ingestion and the offline backend."""
+import asyncio
+import os
+
+import pytest
+
+from wikipedia_assistant import server
+from wikipedia_assistant.dump import ingest, main, wikitext_lead
+from wikipedia_assistant.offline_store import OfflineStore
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+XML_DUMP = os.path.join(FIXTURES, "sample-pages-articles.xml.bz2")
+CIRRUS_DUMP = os.path.join(FIXTURES, "sample-cirrussearch.json")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = OfflineStore(str(tmp_path / "wiki.sqlite3"))
+    ingest(XML_DUMP, store)
+    yield store
+    store.close()
+
+
+def test_wikitext_lead_strips_markup():
+    """Templates, refs, files and link markup are removed from the lead."""
+    text = (
+        "{{Infobox|a={{b}}}}[[File:X.jpg|thumb|A [[c]]]]'''Bold''' [[a|b]] c"
+        "<ref>{{cite}}</ref> [https://x.org site]\n== Heading ==\nbody"
+    )
+    assert wikitext_lead(text) == "Bold b c site"
+
+
+def test_xml_dump_ingestion(store):
+    """Articles, redirects and disambiguation pages land in the store."""
+    assert len(store) == 4
+    assert store.lang == "en"
+
+    turing = store.get("turing")
+    assert turing["title"] == "Alan Turing"
+    assert turing["url"] == "https://en.wikipedia.org/wiki/Alan_Turing"
+    assert turing["summary"].startswith("Alan Mathison Turing (23 June 1912")
+    assert "ref" not in turing["summary"]
+    assert store.get("Mercury")["options"][0] == "Mercury (planet)"
+    assert store.get("Talk:Alan Turing") is None
+
+
+def test_ingestion_is_restartable(tmp_path):
+    """A second run over a finished dump skips every record."""
+    path = str(tmp_path / "wiki.sqlite3")
+    store = OfflineStore(path)
+    assert ingest(XML_DUMP, store, batch_size=2) == 6
+    writes = store._db.total_changes
+    ingest(XML_DUMP, store, batch_size=2)
+    # Only the site info and progress rows are rewritten.
+    assert store._db.total_changes - writes <= 4
+    assert len(store) == 4
+
+
+def test_cirrus_dump_ingestion(tmp_path):
+    """CirrusSearch documents and their redirects are ingested."""
+    path = str(tmp_path / "wiki.sqlite3")
+    assert main([CIRRUS_DUMP, "--store", path, "--base-url", "https://de.wikipedia.org/wiki/"]) == 0
+    store = OfflineStore(path, readonly=True)
+    assert store.lang == "de"
+    assert store.get("A. M. Turing")["url"] == "https://de.wikipedia.org/wiki/Alan_Turing"
+    assert store.get("Mercury")["options"] == ["Mercury (planet)", "Mercury (element)"]
+
+
+def test_offline_backend_serves_the_tool(store):
+    """fetch_wikipedia_info answers from the offline store."""
+    backend = server.create_backend("offline", store.path)
+
+    async def run(*queries):
+        server.set_client(backend)
+        try:
+            return [await server.fetch_wikipedia_info(q) for q in queries]
+        finally:
+            server.set_client(None)
+
+    python, mercury, missing = asyncio.run(
+        run("python programming language", "Mercury", "Nothing here")
+    )
+    assert python["url"] == "https://en.wikipedia.org/wiki/Python_(programming_language)"
+    # Only one option of the disambiguation page is in the store.
+    assert mercury["title"] == "Mercury (planet)"
+    assert mercury["disambiguation"] == "Mercury"
+    assert missing == {"error": "No results found for your query.", "code": "no_results"}
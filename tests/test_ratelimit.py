@@ -0,0 +1,114 @@
+"""Test the adaptive rate limiter and the client's retry handling."""
+import asyncio
+
+import httpx
+import pytest
+
+from wikipedia_assistant.ratelimit import (
+    AdaptiveTokenBucket,
+    RateLimiter,
+    backoff_delay,
+    parse_retry_after,
+)
+from wikipedia_assistant.wikipedia_client import WikipediaClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_allows_burst_then_spaces_requests():
+    """A full bucket serves `burst` requests at once, then one per 1/rate."""
+    clock = FakeClock()
+    bucket = AdaptiveTokenBucket(10.0, 2, clock=clock)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1)
+    assert bucket.reserve() == pytest.approx(0.2)
+    clock.now += 1.0
+    assert bucket.reserve() == 0
+
+
+def test_throttle_shrinks_rate_and_blocks_until_delay():
+    """Throttling halves the rate, pauses callers and then ramps back up."""
+    clock = FakeClock()
+    bucket = AdaptiveTokenBucket(10.0, 5, min_rate=2.0, clock=clock)
+    bucket.throttled(3.0)
+    assert bucket.rate == 5.0
+    assert bucket.reserve() == pytest.approx(3.0)
+
+    for _ in range(3):
+        bucket.throttled(0.0)
+    assert bucket.rate == 2.0
+
+    for _ in range(100):
+        bucket.succeeded()
+    assert bucket.rate == 10.0
+
+
+def test_per_host_buckets_are_independent():
+    """Throttling one host leaves the others at full speed."""
+    limiter = RateLimiter(rate=10.0, burst=1, per_host={"de.wikipedia.org": (2.0, 1)})
+    limiter.throttled("en.wikipedia.org", 60.0)
+    assert limiter.bucket("fr.wikipedia.org").reserve() == 0
+    assert limiter.bucket("de.wikipedia.org").rate == 2.0
+    assert limiter.bucket("en.wikipedia.org").reserve() >= 59.0
+
+
+def test_retry_after_and_backoff():
+    """Retry-After seconds and dates are parsed; backoff adds jitter."""
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", now=1445412470.0) == 10.0
+    assert parse_retry_after("soon") is None
+    assert 2.0 <= backoff_delay(0, 2.0) <= 2.2
+    assert 0 <= backoff_delay(3) <= 4.0
+
+
+def test_client_backs_off_on_429_and_maxlag(fake_wiki):
+    """Throttled responses are retried and slow the host's bucket down."""
+    replies = [
+        httpx.Response(429, headers={"Retry-After": "0"}),
+        httpx.Response(200, json={"error": {"code": "maxlag", "info": "lagged"}},
+                       headers={"Retry-After": "0"}),
+    ]
+
+    def handle(request):
+        if replies:
+            return replies.pop(0)
+        return fake_wiki.handle(request)
+
+    limiter = RateLimiter(rate=100.0, burst=10)
+
+    async def run():
+        async with WikipediaClient(
+            transport=httpx.MockTransport(handle), rate_limiter=limiter, maxlag=5
+        ) as client:
+            return await client.lookup("alan turing")
+
+    assert asyncio.run(run())["title"] == "Alan Turing"
+    assert fake_wiki.requests[0].url.params["maxlag"] == "5"
+    assert limiter.bucket("en.wikipedia.org").rate < 100.0
+
+
+def test_client_gives_up_after_max_retries():
+    """Persistent 503s surface as an HTTP error after the retries."""
+    calls = 0
+
+    def handle(request):
+        nonlocal calls
+        calls += 1
+        return httpx.Response(503, headers={"Retry-After": "0"})
+
+    async def run():
+        async with WikipediaClient(
+            transport=httpx.MockTransport(handle), max_retries=2
+        ) as client:
+            return await client.lookup("anything")
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(run())
+    assert calls == 3
@@ -0,0 +1,135 @@
+"""Test applying a recentchanges event log to the offline store."""
+import asyncio
+import json
+import os
+import sqlite3
+
+import pytest
+
+from wikipedia_assistant.dump import ingest
+from wikipedia_assistant.offline_store import OfflineStore
+from wikipedia_assistant.recentchanges import apply_log, to_change
+from wikipedia_assistant.search_index import SearchIndex, build
+
+XML_DUMP = os.path.join(os.path.dirname(__file__), "fixtures", "sample-pages-articles.xml.bz2")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = OfflineStore(str(tmp_path / "wiki.sqlite3"))
+    ingest(XML_DUMP, store)
+    yield store
+    store.close()
+
+
+def _edit(title, revision, text, kind="edit", wiki="enwiki"):
+    return {
+        "type": kind, "wiki": wiki, "namespace": 0, "title": title,
+        "revision": {"old": revision - 1, "new": revision}, "text": text,
+    }
+
+
+def _log(action, title, **params):
+    return {
+        "type": "log", "wiki": "enwiki", "namespace": 0, "title": title,
+        "log_action": action, "log_params": params,
+    }
+
+
+def _write_log(path, events):
+    with open(path, "a", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+    return str(path)
+
+
+def test_to_change_skips_unrelated_events():
+    """Other wikis, namespaces, categorizations and text-less edits are ignored."""
+    assert to_change(_edit("A", 2, "a", wiki="dewiki"), "enwiki") is None
+    assert to_change(dict(_edit("A", 2, "a"), namespace=1), "enwiki") is None
+    assert to_change(dict(_edit("A", 2, "a"), type="categorize"), "enwiki") is None
+    assert to_change(dict(_edit("A", 2, "a"), text=None), "enwiki") is None
+    assert to_change(_log("protect", "A"), "enwiki") is None
+    assert to_change(_log("move", "A", target="Draft:A"))["action"] == "delete"
+
+
+def test_apply_log(store, tmp_path):
+    """Edits, new pages, renames, redirects and deletions reach the store."""
+    log = _write_log(tmp_path / "changes.jsonl", [
+        _edit("Alan Turing", 1187654322, "'''Alan Turing''' was a mathematician."),
+        # Older than the dump's revision: ignored.
+        _edit("Mercury (planet)", 1, "Outdated."),
+        _edit("Ada Lovelace", 5, "'''Ada Lovelace''' was a mathematician.", kind="new"),
+        _log("move", "Python (programming language)", target="Python (language)", noredir="0"),
+        _edit("Mercury", 1180000001, "#REDIRECT [[Mercury (planet)]]"),
+        _log("delete", "Turing"),
+        dict(_edit("Talk:Ada Lovelace", 6, "Chat."), namespace=1),
+    ])
+    counts = apply_log(log, store)
+    assert counts == {"edit": 2, "stale": 1, "move": 1, "redirect": 1, "delete": 1, "skipped": 1}
+
+    assert store.get("Alan Turing")["summary"] == "Alan Turing was a mathematician."
+    assert store.get("Mercury (planet)")["summary"] != "Outdated."
+    assert store.get("ada lovelace")["title"] == "Ada Lovelace"
+    assert store.get("Python (programming language)")["title"] == "Python (language)"
+    # Redirects to the old title follow the move.
+    assert store.get("Python programming language")["title"] == "Python (language)"
+    assert store.get("Mercury")["title"] == "Mercury (planet)"
+    assert "options" not in store.get("Mercury")
+    assert store.get("Turing") is None
+
+
+def test_stale_search_hits_are_skipped(store, tmp_path):
+    """Hits for articles deleted since the index was built fall through to the next."""
+    index = str(tmp_path / "wiki.bm25")
+    build(store.iter_articles(), index)
+    store.search_index = SearchIndex(index)
+    assert asyncio.run(store.lookup("programming computer"))["title"] == (
+        "Python (programming language)"
+    )
+
+    apply_log(_write_log(tmp_path / "changes.jsonl", [
+        _log("delete", "Python (programming language)"),
+    ]), store)
+    assert asyncio.run(store.lookup("programming computer"))["title"] == "Alan Turing"
+
+
+def test_apply_log_resumes_and_rolls_back(store, tmp_path):
+    """Applied lines are not replayed, and a failing batch changes nothing."""
+    path = tmp_path / "changes.jsonl"
+    _write_log(path, [_edit("Alan Turing", 1187654322, "First.")])
+    assert apply_log(str(path), store) == {"edit": 1}
+    assert apply_log(str(path), store) == {}
+
+    # An incomplete trailing line is left for the next run.
+    _write_log(path, [_edit("Alan Turing", 1187654323, "Second."), _log("delete", "Turing")])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"type": "log"')
+    assert apply_log(str(path), store) == {"edit": 1, "delete": 1}
+    assert store.get("Alan Turing")["summary"] == "Second."
+
+    # A malformed event stops the run before its batch commits.
+    bad = _write_log(tmp_path / "bad.jsonl", [
+        _edit("Alan Turing", 1187654324, "Third."), {"type": "edit", "namespace": 0},
+    ])
+    with pytest.raises(KeyError):
+        apply_log(bad, store)
+    assert store.get_meta(f"recentchanges:{bad}") is None
+
+    # A change that fails mid-transaction undoes the ones before it.
+    with pytest.raises(ValueError):
+        store.apply_changes([{"action": "delete", "title": "Alan Turing"}, {"action": "purge"}])
+    assert store.get("Alan Turing")["summary"] == "Second."
+
+
+def test_readers_are_not_blocked_by_updates(store):
+    """A reader sees the committed state while an update transaction is open."""
+    store._db.execute("BEGIN IMMEDIATE")
+    store._db.execute("DELETE FROM articles")
+    try:
+        reader = sqlite3.connect(store.path, timeout=0)
+        count = reader.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+        reader.close()
+    finally:
+        store._db.execute("ROLLBACK")
+    assert count == 4
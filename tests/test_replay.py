@@ -0,0 +1,63 @@
+"""Test the record/replay transport."""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from wikipedia_assistant.replay import RecordReplayTransport, UnrecordedRequestError
+from wikipedia_assistant.wikipedia_client import WikipediaClient
+
+
+def search(transport, query):
+    async def run():
+        async with WikipediaClient(transport=transport) as client:
+            return await client.search(query)
+
+    return asyncio.run(run())
+
+
+def test_record_then_replay(fake_wiki, tmp_path):
+    """Recorded responses are replayed without touching the upstream."""
+    path = str(tmp_path / "fixtures.json")
+    recorder = RecordReplayTransport(path, "record", transport=fake_wiki.transport())
+    assert search(recorder, "alan turing") == ["Alan Turing"]
+    assert json.loads(open(path).read())["version"] == 1
+
+    fake_wiki.requests.clear()
+    assert search(RecordReplayTransport(path), "alan turing") == ["Alan Turing"]
+    assert fake_wiki.requests == []
+
+
+def test_strict_replay_rejects_unrecorded_requests(fake_wiki, tmp_path):
+    """Strict replay fails; lenient replay records the missing response."""
+    path = str(tmp_path / "fixtures.json")
+    search(RecordReplayTransport(path, "record", transport=fake_wiki.transport()), "alan turing")
+
+    with pytest.raises(UnrecordedRequestError):
+        search(RecordReplayTransport(path), "mercury")
+    lenient = RecordReplayTransport(path, strict=False, transport=fake_wiki.transport())
+    assert search(lenient, "mercury")[0] == "Mercury"
+    assert search(RecordReplayTransport(path), "mercury")[0] == "Mercury"
+
+
+def test_requests_match_regardless_of_parameter_order(tmp_path):
+    """Query parameters are compared as a sorted set."""
+    path = str(tmp_path / "fixtures.json")
+    upstream = httpx.MockTransport(lambda request: httpx.Response(200, json={"ok": True}))
+
+    async def get(transport, params):
+        async with httpx.AsyncClient(transport=transport) as http:
+            return (await http.get("https://x.org/api", params=params)).json()
+
+    asyncio.run(get(RecordReplayTransport(path, "record", transport=upstream), {"a": 1, "b": 2}))
+    assert asyncio.run(get(RecordReplayTransport(path), {"b": 2, "a": 1})) == {"ok": True}
+
+
+def test_fixture_version_mismatch_is_refused(tmp_path):
+    """Fixtures of another format version must be recorded again."""
+    path = tmp_path / "fixtures.json"
+    path.write_text(json.dumps({"version": 0, "interactions": {}}))
+    with pytest.raises(ValueError):
+        RecordReplayTransport(str(path))
+    RecordReplayTransport(str(path), "record")
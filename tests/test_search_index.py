@@ -0,0 +1,97 @@
+"""Test the local BM25 search index."""
+import asyncio
+import os
+
+import numpy as np
+
+from wikipedia_assistant import server
+from wikipedia_assistant.dump import ingest
+from wikipedia_assistant.offline_store import OfflineStore
+from wikipedia_assistant.search_index import SearchIndex, _IndexWriter, build, main, tokenize
+
+DOCS = [
+    ("Alan Turing", "English mathematician and computer scientist."),
+    ("Python (programming language)", "A high-level general-purpose programming language."),
+    ("Photosynthesis", "Process by which plants use light to make sugar."),
+    ("Mercury (planet)", "The smallest planet in the Solar System."),
+]
+
+
+def test_tokenize_drops_stopwords_and_case():
+    """Tokens are lower-cased word characters without stop words."""
+    assert tokenize("The Python programming-language, of 1991") == [
+        "python", "programming", "language", "1991"
+    ]
+
+
+def test_build_and_search(tmp_path):
+    """The best BM25 match comes first and unknown terms find nothing."""
+    path = str(tmp_path / "wiki.bm25")
+    assert build(DOCS, path) == 4
+    index = SearchIndex(path)
+    assert index.search("plants light sugar")[0] == "Photosynthesis"
+    assert index.search("python programming")[0] == "Python (programming language)"
+    assert index.search("smallest planet", 1) == ["Mercury (planet)"]
+    assert index.search("zzzz") == []
+    index.close()
+
+
+def test_segments_merge_to_the_same_index(tmp_path):
+    """Building in several segments gives the same postings as one pass."""
+    single = str(tmp_path / "single.bm25")
+    segmented = str(tmp_path / "segmented.bm25")
+    build(DOCS, single)
+    build(DOCS, segmented, segment_docs=1)
+
+    a, b = SearchIndex(single), SearchIndex(segmented)
+    assert a.terms == b.terms
+    for term in a.terms:
+        for left, right in zip(a.postings(term), b.postings(term)):
+            np.testing.assert_array_equal(left, right)
+    assert [b.title(i) for i in range(len(b))] == [title for title, _ in DOCS]
+    assert not [p for p in os.listdir(tmp_path) if p.endswith(".segment")]
+
+
+def test_large_gaps_use_wider_postings(tmp_path):
+    """Doc-id gaps beyond 16 bits still decode correctly."""
+    path = str(tmp_path / "wide.bm25")
+    # Written directly: building 70000 documents just for the gap is slow.
+    writer = _IndexWriter(path)
+    writer.add_postings("needle", np.array([0, 70001], dtype=np.uint32), np.array([1, 2]))
+    writer.finish([""] * 70002, np.ones(70002, dtype=np.uint32))
+    index = SearchIndex(path)
+    assert index._widths.tolist() == [4]
+    doc_ids, tfs = index.postings("needle")
+    assert doc_ids.tolist() == [0, 70001]
+    assert tfs.tolist() == [1, 2]
+
+
+def test_merge_cli_and_offline_search(tmp_path):
+    """Indexes merge through the CLI and back the offline tool search."""
+    store_path = str(tmp_path / "wiki.sqlite3")
+    store = OfflineStore(store_path)
+    ingest(
+        os.path.join(os.path.dirname(__file__), "fixtures", "sample-pages-articles.xml.bz2"), store
+    )
+    store.close()
+
+    part = str(tmp_path / "part.bm25")
+    merged = str(tmp_path / "merged.bm25")
+    assert main(["build", "--store", store_path, "--output", part]) == 0
+    build(DOCS[2:3], str(tmp_path / "extra.bm25"))
+    assert main(["merge", "--output", merged, part, str(tmp_path / "extra.bm25")]) == 0
+
+    backend = server.create_backend("offline", store_path, merged)
+
+    async def run(query):
+        server.set_client(backend)
+        try:
+            return await server.fetch_wikipedia_info(query)
+        finally:
+            server.set_client(None)
+
+    assert asyncio.run(run("cryptanalyst logician"))["title"] == "Alan Turing"
+    # The extra index document has no article in the store.
+    assert asyncio.run(run("plants light sugar")) == {
+        "error": "No results found for your query.", "code": "no_results"
+    }
@@ -0,0 +1,427 @@
+"""Test the MCP tool with the fake MediaWiki API."""
+import asyncio
+
+import httpx
+
+from wikipedia_assistant import server
+from wikipedia_assistant.cache import NegativeCache, ResultCache
+from wikipedia_assistant.wikipedia_client import WikipediaClient
+
+
+def run_with_client(client, body):
+    """Await `body()` with `client` as the shared backend, then close every client."""
+    async def run():
+        async with client:
+            server.set_client(client)
+            try:
+                return await body()
+            finally:
+                await server.close_client()
+
+    return asyncio.run(run())
+
+
+def call_tool(fake_wiki, tool, *args, **kwargs):
+    """Call one of the tools with a client bound to `fake_wiki`."""
+    return run_with_client(fake_wiki.client(), lambda: tool(*args, **kwargs))
+
+
+def run_tool(fake_wiki, *args, **kwargs):
+    """Call fetch_wikipedia_info with a client bound to `fake_wiki`."""
+    return call_tool(fake_wiki, server.fetch_wikipedia_info, *args, **kwargs)
+
+
+def test_fetch_success(fake_wiki):
+    """The best search match is returned as title, summary and URL."""
+    result = run_tool(fake_wiki, "Python programming language")
+    assert result == {
+        "title": "Python (programming language)",
+        "summary": fake_wiki.pages["Python (programming language)"]["extract"],
+        "url": "https://en.wikipedia.org/wiki/Python_(programming_language)",
+    }
+
+
+def test_fetch_no_results(fake_wiki):
+    """Queries without hits return the no-results error."""
+    result = run_tool(fake_wiki, "xyznonexistentquery123456")
+    assert result == {"error": "No results found for your query.", "code": "no_results"}
+
+
+def test_fetch_disambiguation(fake_wiki):
+    """Without resolution, disambiguation pages list the first five options."""
+    result = run_tool(fake_wiki, "Mercury", resolve_disambiguation=False)
+    assert result["error"].startswith("Ambiguous topic. Try one of these: ")
+    assert "Mercury (planet)" in result["error"]
+    assert "Mercury, Nevada" not in result["error"]
+    assert result["code"] == "ambiguous"
+    assert result["options"][0] == "Mercury (planet)"
+    assert len(result["options"]) == 5
+
+
+def test_concurrent_calls_overlap(fake_wiki):
+    """Tool calls run concurrently instead of one at a time."""
+    in_flight = 0
+    peak = 0
+    handle = fake_wiki.handle
+
+    async def slow_handle(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return handle(request)
+
+    queries = ["Alan Turing", "turing", "mathematician", "turing mathematician", "alan"]
+    results = run_with_client(
+        WikipediaClient(transport=httpx.MockTransport(slow_handle)),
+        lambda: asyncio.gather(*(server.fetch_wikipedia_info(q) for q in queries)),
+    )
+    assert all(r["title"] == "Alan Turing" for r in results)
+    assert peak == 5
+
+
+def test_fetch_is_served_from_cache(fake_wiki, tmp_path):
+    """A second call for the same topic is answered without the network."""
+    server.set_cache(ResultCache(str(tmp_path / "cache.sqlite3")))
+    first = run_tool(fake_wiki, "Alan Turing")
+    requests_after_first = len(fake_wiki.requests)
+    second = run_tool(fake_wiki, "  alan TURING")
+
+    assert second == first
+    assert len(fake_wiki.requests) == requests_after_first
+
+
+def test_fetch_batch_keeps_order_and_uses_cache(fake_wiki, tmp_path):
+    """Batch results come back in query order and reuse cached entries."""
+    server.set_cache(ResultCache(str(tmp_path / "cache.sqlite3")))
+    run_tool(fake_wiki, "Alan Turing")
+    fake_wiki.requests.clear()
+
+    results = call_tool(
+        fake_wiki, server.fetch_wikipedia_info_batch,
+        ["python programming", "nothing at all", "Alan Turing"],
+    )
+    assert results[0]["title"] == "Python (programming language)"
+    assert results[1]["code"] == "no_results"
+    assert results[2]["title"] == "Alan Turing"
+    searched = [r.url.params.get("srsearch") for r in fake_wiki.requests]
+    assert "Alan Turing" not in searched
+
+
+def test_identical_concurrent_queries_share_one_lookup(fake_wiki):
+    """Concurrent calls for the same topic send one upstream request."""
+    results = run_with_client(fake_wiki.client(), lambda: asyncio.gather(
+        server.fetch_wikipedia_info("Alan Turing"),
+        server.fetch_wikipedia_info("alan  turing"),
+        server.fetch_wikipedia_info("ALAN TURING"),
+    ))
+    assert all(r["title"] == "Alan Turing" for r in results)
+    assert len(fake_wiki.requests) == 1
+
+
+def test_fetch_with_summary_budget(fake_wiki, tmp_path):
+    """A size budget shortens the summary without touching the cached copy."""
+    cache = ResultCache(str(tmp_path / "cache.sqlite3"))
+    server.set_cache(cache)
+    result = run_tool(fake_wiki, "Python programming language", max_sentences=1)
+    assert result["summary"] == "Python is a high-level, general-purpose programming language."
+    assert cache.get("Python programming language", "en")["summary"].endswith("readability.")
+
+
+def add_long_article(fake_wiki):
+    body = "\n".join(
+        f"== Part {i} ==\nParagraph number {i} of the article." for i in range(1, 13)
+    )
+    fake_wiki.add_page("Long article", "Lead.", wikitext="Lead.\n" + body)
+
+
+def test_fetch_sections_outline(fake_wiki):
+    """The outline tool returns headings without section text."""
+    add_long_article(fake_wiki)
+    result = call_tool(fake_wiki, server.list_wikipedia_sections, "Long article")
+    assert result["url"] == "https://en.wikipedia.org/wiki/Long_article"
+    assert [s["index"] for s in result["sections"]] == list(range(13))
+    assert "text" not in result["sections"][1]
+
+
+def test_fetch_section_pages_with_cursor(fake_wiki):
+    """Section ranges are capped per call and continue through next_cursor."""
+    add_long_article(fake_wiki)
+    first = call_tool(
+        fake_wiki, server.fetch_wikipedia_section, "Long article", section=2, count=50
+    )
+    assert [s["index"] for s in first["sections"]] == list(range(2, 12))
+    assert first["sections"][0]["text"] == "Paragraph number 2 of the article."
+    rest = call_tool(
+        fake_wiki, server.fetch_wikipedia_section, cursor=first["next_cursor"], count=50
+    )
+    assert [s["index"] for s in rest["sections"]] == [12]
+    assert rest["next_cursor"] is None
+
+
+def test_fetch_section_respects_max_chars(fake_wiki):
+    """A small max_chars returns fewer sections, truncating a single one."""
+    add_long_article(fake_wiki)
+    result = call_tool(
+        fake_wiki, server.fetch_wikipedia_section, "Long article",
+        section=1, count=5, max_chars=10,
+    )
+    assert result["sections"] == [
+        {"index": 1, "heading": "Part 1", "text": "Paragraph ", "truncated": True}
+    ]
+    assert result["next_cursor"] is not None
+
+
+def test_fetch_section_errors(fake_wiki):
+    """Missing pages, malformed cursors and missing titles return error dicts."""
+    missing = call_tool(fake_wiki, server.fetch_wikipedia_section, "Nope")
+    assert missing == {
+        "error": "No Wikipedia page could be loaded for this query.",
+        "code": "page_not_found",
+    }
+    bad = call_tool(fake_wiki, server.fetch_wikipedia_section, cursor="%%%")
+    assert bad == {"error": "Invalid cursor.", "code": "invalid_cursor"}
+    sent = len(fake_wiki.requests)
+    nothing = call_tool(fake_wiki, server.fetch_wikipedia_section)
+    assert nothing["code"] == "invalid_cursor"
+    assert len(fake_wiki.requests) == sent
+
+
+def test_cache_hit_sends_stored_json(fake_wiki, tmp_path):
+    """MCP clients receive the cached JSON text without re-encoding."""
+    cache = ResultCache(str(tmp_path / "cache.sqlite3"))
+    server.set_cache(cache)
+    run_tool(fake_wiki, "Alan Turing")
+    stored = cache.get_json("Alan Turing", "en")
+
+    content = call_tool(
+        fake_wiki, server.mcp.call_tool, "fetch_wikipedia_info", {"query": "Alan Turing"}
+    )
+    assert [c.text for c in content] == [stored]
+    assert len(fake_wiki.requests) == 1
+
+
+def add_mercury_meanings(fake_wiki):
+    fake_wiki.add_page(
+        "Mercury (element)",
+        "Mercury is a chemical element with the symbol Hg. It is a heavy, silvery metal.",
+    )
+    fake_wiki.add_page(
+        "Freddie Mercury",
+        "Freddie Mercury was a British singer and songwriter who led the band Queen.",
+    )
+
+
+def test_ambiguous_query_returns_ranked_candidates(fake_wiki):
+    """Without a clear winner, candidates come back with snippets in one call."""
+    add_mercury_meanings(fake_wiki)
+    result = run_tool(fake_wiki, "Mercury")
+    assert result["code"] == "ambiguous"
+    assert [c["title"] for c in result["candidates"]] == [
+        "Mercury (planet)", "Mercury (element)", "Freddie Mercury"
+    ]
+    assert result["candidates"][1]["snippet"] == "Mercury is a chemical element with the symbol Hg."
+    # Search, disambiguation links, then one packed request for the extracts.
+    assert len(fake_wiki.requests) == 3
+    assert fake_wiki.requests[2].url.params["titles"].count("|") == 5
+
+
+def test_ambiguous_query_resolves_clear_best_match(fake_wiki):
+    """Query words found in one candidate's extract pick it as the answer."""
+    add_mercury_meanings(fake_wiki)
+    result = run_tool(fake_wiki, "Mercury singer")
+    assert result["title"] == "Freddie Mercury"
+    assert result["disambiguation"] == "Mercury"
+    assert [a["title"] for a in result["alternatives"]] == [
+        "Mercury (planet)", "Mercury (element)"
+    ]
+
+
+def test_stale_entry_is_served_while_refreshing(fake_wiki):
+    """A stale cache entry answers at once and is refreshed in the background."""
+    cache = ResultCache(":memory:", stale_ttl=3600)
+    server.set_cache(cache)
+    old = '{"title":"Alan Turing","summary":"Old.","url":"u"}'
+    cache.set_json("Alan Turing", "en", old, ttl=-1)
+
+    async def fetch():
+        results = await asyncio.gather(
+            server.fetch_wikipedia_info("Alan Turing"),
+            server.fetch_wikipedia_info("alan turing"),
+        )
+        await asyncio.gather(*server._background)
+        return results
+
+    results = run_with_client(fake_wiki.client(), fetch)
+    assert [r["summary"] for r in results] == ["Old.", "Old."]
+    assert len(fake_wiki.requests) == 2
+    assert cache.lookup_json("Alan Turing", "en")[1] is False
+    assert cache.get("Alan Turing", "en")["summary"].startswith("Alan Mathison Turing")
+
+
+def test_stale_batch_entries_are_refreshed_without_negative_cache(fake_wiki):
+    """The batch tool refreshes stale entries even with the negative cache off."""
+    cache = ResultCache(":memory:", stale_ttl=3600)
+    server.set_cache(cache)
+    old = '{"title":"Alan Turing","summary":"Old.","url":"u"}'
+    cache.set_json("Alan Turing", "en", old, ttl=-1)
+
+    async def fetch():
+        results = await server.fetch_wikipedia_info_batch(["Alan Turing"])
+        await asyncio.gather(*server._background)
+        return results
+
+    assert run_with_client(fake_wiki.client(), fetch)[0]["summary"] == "Old."
+    assert cache.get("Alan Turing", "en")["summary"].startswith("Alan Mathison Turing")
+
+
+def test_warmer_starts_once_from_environment(fake_wiki, tmp_path, monkeypatch):
+    """WIKIPEDIA_WARM_FILE prefetches its titles in the background, once."""
+    path = tmp_path / "top.txt"
+    path.write_text("Alan Turing\nPython (programming language)\n", encoding="utf-8")
+    monkeypatch.setenv("WIKIPEDIA_WARM_FILE", str(path))
+    monkeypatch.setattr(server, "_warm_started", False)
+    cache = ResultCache(":memory:")
+    server.set_cache(cache)
+
+    async def warm():
+        task = server.start_warmer()
+        assert server.start_warmer() is None
+        await task
+
+    run_with_client(fake_wiki.client(), warm)
+    assert len(cache) == 2
+    assert len(fake_wiki.requests) == 1
+
+
+def test_failed_lookups_are_cached_briefly(fake_wiki, tmp_path):
+    """Repeated failing queries are answered from the negative cache."""
+    server.set_cache(ResultCache(str(tmp_path / "cache.sqlite3")))
+    negative = NegativeCache(ttl=60)
+    server.set_negative_cache(negative)
+    first = run_tool(fake_wiki, "xyznonexistentquery123456")
+    sent = len(fake_wiki.requests)
+    second = run_tool(fake_wiki, "XYZnonexistentquery123456")
+
+    batch = call_tool(fake_wiki, server.fetch_wikipedia_info_batch, ["xyznonexistentquery123456"])
+
+    assert second == first == {"error": "No results found for your query.", "code": "no_results"}
+    assert batch == [first]
+    assert len(fake_wiki.requests) == sent
+    assert len(negative) == 1
+    assert len(server.get_cache()) == 0
+
+
+def test_languages_are_served_in_parallel_with_separate_caches(fake_wiki, tmp_path):
+    """Each language has its own client and cache entries; calls overlap."""
+    german = type(fake_wiki)(lang="de")
+    german.add_page(
+        "Alan Turing",
+        "Alan Mathison Turing war ein britischer Mathematiker.",
+        keywords="alan turing",
+    )
+    wikis = {"en.wikipedia.org": fake_wiki, "de.wikipedia.org": german}
+    in_flight = 0
+    peak = 0
+
+    async def handle(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return wikis[request.url.host].handle(request)
+
+    server.set_cache(ResultCache(str(tmp_path / "cache.sqlite3")))
+
+    english, deutsch = run_with_client(
+        WikipediaClient(transport=httpx.MockTransport(handle)),
+        lambda: asyncio.gather(
+            server.fetch_wikipedia_info("Alan Turing"),
+            server.fetch_wikipedia_info("Alan Turing", lang="de"),
+        ),
+    )
+    assert english["summary"].startswith("Alan Mathison Turing was")
+    assert deutsch["summary"].startswith("Alan Mathison Turing war")
+    assert deutsch["url"] == "https://de.wikipedia.org/wiki/Alan_Turing"
+    assert peak == 2
+    assert server.get_cache().get("alan turing", "de")["summary"] == deutsch["summary"]
+
+
+def test_language_clients_are_bounded(fake_wiki, monkeypatch):
+    """The least recently used language client is evicted and closed."""
+    monkeypatch.setenv("WIKIPEDIA_MAX_LANGUAGES", "2")
+    monkeypatch.setattr(server, "EVICTED_CLIENT_GRACE", 0)
+
+    async def switch():
+        french = server.get_client("fr")
+        german = server.get_client("de")
+        assert server.get_client("fr") is french
+        server.get_client("it")
+        await asyncio.sleep(0.01)
+        closed = [c._http.is_closed for c in (french, german)]
+        return closed, list(server._lang_clients)
+
+    closed, languages = run_with_client(fake_wiki.client(), switch)
+    assert languages == ["fr", "it"]
+    assert closed == [False, True]
+
+
+def test_unsupported_language_codes(fake_wiki):
+    """Malformed language codes return an error instead of a request."""
+    result = run_tool(fake_wiki, "Alan Turing", lang="../evil")
+    assert result["code"] == "unsupported"
+    assert fake_wiki.requests == []
+
+
+def test_upstream_failures_return_upstream_errors(tmp_path):
+    """Timeouts, HTTP errors and API errors become upstream_error results."""
+    failures = {
+        "timeout": httpx.ReadTimeout("timed out"),
+        "status": httpx.Response(500, json={}),
+        "api": httpx.Response(200, json={"error": {"code": "internal_api_error"}}),
+    }
+    failure = None
+
+    def handle(request):
+        if isinstance(failure, Exception):
+            raise failure
+        return failure
+
+    server.set_cache(ResultCache(str(tmp_path / "cache.sqlite3")))
+    server.set_negative_cache(NegativeCache(ttl=60))
+
+    async def fetch():
+        return (
+            await server.fetch_wikipedia_info("Alan Turing"),
+            await server.fetch_wikipedia_info_batch(["Alan Turing", "Python"]),
+            await server.list_wikipedia_sections("Alan Turing"),
+            await server.fetch_wikipedia_section("Alan Turing"),
+        )
+
+    for failure in failures.values():
+        client = WikipediaClient(transport=httpx.MockTransport(handle))
+        single, batch, outline, section = run_with_client(client, fetch)
+        for result in [single, *batch, outline, section]:
+            assert result["code"] == "upstream_error"
+            assert result["error"].startswith("Wikipedia request failed: ")
+    # Upstream failures are retried on the next call, not remembered.
+    assert len(server.get_cache()) == 0
+    assert len(server.get_negative_cache()) == 0
+
+
+def test_disambiguation_lists_options_when_candidates_fail(fake_wiki):
+    """A failed candidate fetch falls back to the plain option list."""
+    def handle(request):
+        if "|" in request.url.params.get("titles", ""):
+            raise httpx.ConnectError("connection refused")
+        return fake_wiki.handle(request)
+
+    result = run_with_client(
+        WikipediaClient(transport=httpx.MockTransport(handle)),
+        lambda: server.fetch_wikipedia_info("Mercury"),
+    )
+    assert result["code"] == "ambiguous"
+    assert result["options"][0] == "Mercury (planet)"
+    assert "candidates" not in result
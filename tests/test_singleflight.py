@@ -0,0 +1,68 @@
+"""Test single-flight coalescing of concurrent identical calls."""
+import asyncio
+
+import pytest
+
+from wikipedia_assistant.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    """Callers with the same key get one shared result."""
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"title": "Alan Turing"}
+
+    async def run():
+        flights = SingleFlight()
+        results = await asyncio.gather(*(flights.do("k", fetch) for _ in range(10)))
+        return results, len(flights)
+
+    results, pending = asyncio.run(run())
+    assert calls == 1
+    assert all(r == {"title": "Alan Turing"} for r in results)
+    assert pending == 0
+
+
+def test_errors_are_shared_and_not_cached():
+    """Every waiter sees the error, and the next call starts fresh."""
+    calls = 0
+
+    async def fail():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def run():
+        flights = SingleFlight()
+        results = await asyncio.gather(
+            *(flights.do("k", fail) for _ in range(3)), return_exceptions=True
+        )
+        with pytest.raises(ValueError):
+            await flights.do("k", fail)
+        return results
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert calls == 2
+
+
+def test_cancelled_waiter_does_not_cancel_others():
+    """Cancelling one waiter leaves the shared call running for the rest."""
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        flights = SingleFlight()
+        first = asyncio.ensure_future(flights.do("k", fetch))
+        second = asyncio.ensure_future(flights.do("k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "done"
@@ -0,0 +1,50 @@
+"""Test the extractive summarizer and its size budgets."""
+from wikipedia_assistant.summarizer import approx_tokens, split_sentences, summarize
+
+ARTICLE = (
+    "Alan Turing was an English mathematician and computer scientist. "
+    "Turing was born in Maida Vale, London, in 1912. "
+    "He is widely considered to be the father of theoretical computer science. "
+    "During the Second World War, Turing worked at Bletchley Park on codebreaking. "
+    "Turing enjoyed long-distance running.\n"
+    "His work on computation and computable numbers shaped computer science."
+)
+
+
+def test_split_sentences_respects_abbreviations():
+    """Titles, initials and paragraph breaks are handled."""
+    text = 'Dr. Smith met A. M. Turing in the U.S. in 1950. "It works." Yes!\nNew line'
+    assert split_sentences(text) == [
+        "Dr. Smith met A. M. Turing in the U.S. in 1950.",
+        '"It works."',
+        "Yes!",
+        "New line",
+    ]
+
+
+def test_no_budget_returns_text_unchanged():
+    """Without a budget the summary is passed through."""
+    assert summarize(ARTICLE) == ARTICLE
+
+
+def test_sentence_budget_keeps_central_sentences_in_order():
+    """The most representative sentences are kept in article order."""
+    summary = summarize(ARTICLE, max_sentences=2)
+    sentences = split_sentences(summary)
+    assert len(sentences) == 2
+    assert sentences[0].startswith("Alan Turing was")
+    assert "long-distance running" not in summary
+    assert [ARTICLE.index(s) for s in sentences] == sorted(ARTICLE.index(s) for s in sentences)
+
+
+def test_char_and_token_budgets():
+    """Character and approximate token budgets are both respected."""
+    assert len(summarize(ARTICLE, max_chars=150)) <= 150
+    assert approx_tokens(summarize(ARTICLE, max_tokens=30)) <= 30
+
+
+def test_budget_smaller_than_any_sentence_truncates():
+    """A budget below the shortest sentence yields a cut sentence."""
+    summary = summarize(ARTICLE, max_chars=25)
+    assert len(summary) <= 25
+    assert summary.endswith("…")
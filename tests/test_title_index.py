@@ -0,0 +1,184 @@
+"""Test the typo-tolerant title index."""
+import asyncio
+import gzip
+import os
+
+from wikipedia_assistant import server
+from wikipedia_assistant.dump import ingest
+from wikipedia_assistant.offline_store import OfflineStore
+from wikipedia_assistant.title_index import (
+    TitleIndex,
+    build,
+    edit_distance,
+    edit_distances,
+    main,
+    read_titles,
+    title_key,
+)
+
+TITLES = [
+    "Alan Turing",
+    "Alan Turner",
+    "Alan Tudyk",
+    "Turing machine",
+    "Python (programming language)",
+    "Python",
+    "Mercury (planet)",
+    "Schrödinger's cat",
+    "C++",
+    "C",
+    "Cat",
+    "Bat",
+]
+
+
+def _index(tmp_path, titles=TITLES):
+    path = str(tmp_path / "titles.idx")
+    build(titles, path)
+    return TitleIndex(path)
+
+
+def test_title_key_ignores_case_and_punctuation():
+    """Keys fold case, drop apostrophes and turn other punctuation into spaces."""
+    assert title_key("Python_(programming language)") == "python programming language"
+    assert title_key("Schrödinger's  Cat") == "schrödingers cat"
+    assert title_key("AC/DC") == "ac dc"
+    assert title_key("!!!") == ""
+
+
+def test_edit_distance_counts_transpositions_once():
+    """Insertions, deletions, substitutions and adjacent swaps cost one edit."""
+    assert edit_distance("turing", "turnig", 2) == 1
+    assert edit_distance("turing", "turin", 2) == 1
+    assert edit_distance("kitten", "sitting", 3) == 3
+    assert edit_distance("kitten", "sitting", 2) == 3
+    assert edit_distance("same", "same", 2) == 0
+
+
+def test_edit_distances_match_the_scalar_distance():
+    """The array version agrees with edit_distance, with few and many candidates."""
+    words = ["turing", "turnig", "turin", "tuning", "during", "ruting", "t", "", "tturing"]
+    for candidates in (words, words * 3):
+        for limit in (1, 2):
+            assert edit_distances("turing", candidates, limit).tolist() == [
+                edit_distance("turing", candidate, limit) for candidate in candidates
+            ]
+
+
+def test_resolve_exact_titles_and_typos(tmp_path):
+    """Case, punctuation and up to two typos resolve to one title."""
+    index = _index(tmp_path)
+    assert len(index) == len(TITLES)
+    assert index.resolve("alan turing") == "Alan Turing"
+    assert index.resolve("python programming language") == "Python (programming language)"
+    assert index.resolve("Alan Turnig") == "Alan Turing"
+    assert index.resolve("Alan Tuner") == "Alan Turner"
+    assert index.resolve("Turing machin") == "Turing machine"
+    assert index.resolve("Pyhton") == "Python"
+    assert index.resolve("schrodingers cat") == "Schrödinger's cat"
+    # Punctuation-only titles differ from their loose key.
+    assert index.resolve("c++") == "C++"
+    assert index.resolve("C") == "C"
+    index.close()
+
+
+def test_ambiguous_and_distant_queries_are_left_to_the_search(tmp_path):
+    """Queries without a single closest title resolve to nothing."""
+    index = _index(tmp_path)
+    # "Alan Tur" is two edits from "Alan Turing" and "Alan Turner" alike.
+    assert index.resolve("Alan Tur") is None
+    # Short words are not corrected: "Cat" and "Bat" are one edit from "Hat".
+    assert index.resolve("Hat") is None
+    assert index.resolve("Completely unrelated") is None
+    assert index.resolve("...") is None
+    index.close()
+
+
+def test_complete_returns_titles_by_prefix(tmp_path):
+    """Prefixes match the start of the loose keys, in key order."""
+    index = _index(tmp_path)
+    assert index.complete("alan tu") == ["Alan Tudyk", "Alan Turing", "Alan Turner"]
+    assert index.complete("Alan_Tur", limit=1) == ["Alan Turing"]
+    assert index.complete("zzz") == []
+    index.close()
+
+
+def test_read_titles_and_cli(tmp_path, capsys):
+    """All-titles dumps are read with their header, and the CLI resolves queries."""
+    ns0 = str(tmp_path / "all-titles-in-ns0.gz")
+    with gzip.open(ns0, "wt", encoding="utf-8") as f:
+        f.write("page_title\nAlan_Turing\nPython_(programming_language)\n")
+    everything = str(tmp_path / "all-titles")
+    with open(everything, "w", encoding="utf-8") as f:
+        f.write("page_namespace\tpage_title\n0\tAlan_Turing\n1\tAlan_Turing\n")
+    assert list(read_titles(ns0)) == ["Alan Turing", "Python (programming language)"]
+    assert list(read_titles(everything)) == ["Alan Turing"]
+
+    output = str(tmp_path / "titles.idx")
+    assert main(["build", "--titles", ns0, "--output", output]) == 0
+    assert main(["resolve", "--index", output, "Alan Turnig", "nothing"]) == 0
+    assert capsys.readouterr().out.splitlines()[-2:] == [
+        "Alan Turnig\tAlan Turing", "nothing\t-"
+    ]
+
+
+def test_lookup_skips_the_remote_search(fake_wiki, tmp_path):
+    """Resolved titles go straight to the page fetch, alone and in batches."""
+    index = _index(tmp_path, ["Alan Turing", "Python (programming language)"])
+
+    async def run():
+        async with fake_wiki.client(title_index=index) as client:
+            single = await client.lookup("Alan Turnig")
+            batch = await client.lookup_many(["python programming langauge", "mercury planet"])
+            return single, batch
+
+    single, batch = asyncio.run(run())
+    assert single["title"] == "Alan Turing"
+    assert batch[0]["title"] == "Python (programming language)"
+    assert batch[1]["title"] == "Mercury (planet)"
+    searches = [
+        r for r in fake_wiki.requests
+        if "generator" in r.url.params or "list" in r.url.params
+    ]
+    # Only "mercury planet", which the index does not know, was searched.
+    assert [r.url.params["srsearch"] for r in searches] == ["mercury planet"]
+
+
+def test_titles_missing_upstream_fall_back_to_the_search(fake_wiki, tmp_path):
+    """Indexed titles deleted from the wiki since are searched remotely instead."""
+    index = _index(tmp_path, ["Alan Turing (deleted)"])
+
+    async def run():
+        async with fake_wiki.client(title_index=index) as client:
+            single = await client.lookup("Alan Turing deleted")
+            batch = await client.lookup_many(["Alan Turing deleted"])
+            return single, batch
+
+    single, batch = asyncio.run(run())
+    assert single["title"] == "Alan Turing"
+    assert batch[0]["title"] == "Alan Turing"
+
+
+def test_offline_backend_corrects_typos(tmp_path):
+    """create_backend attaches the title index to the offline store."""
+    store_path = str(tmp_path / "wiki.sqlite3")
+    store = OfflineStore(store_path)
+    ingest(
+        os.path.join(os.path.dirname(__file__), "fixtures", "sample-pages-articles.xml.bz2"), store
+    )
+    titles = [title for title, _ in store.iter_articles()]
+    store.close()
+    index_path = str(tmp_path / "titles.idx")
+    build(titles, index_path)
+
+    backend = server.create_backend("offline", store_path, title_index=index_path)
+
+    async def run(query):
+        server.set_client(backend)
+        try:
+            return await server.fetch_wikipedia_info(query)
+        finally:
+            server.set_client(None)
+
+    assert asyncio.run(run("Alan Turnig"))["title"] == "Alan Turing"
+    assert asyncio.run(run("Alan Turing"))["title"] == "Alan Turing"
@@ -0,0 +1,197 @@
+"""Test the semantic vector index and semantic search in the tools."""
+import asyncio
+
+import numpy as np
+import pytest
+
+from wikipedia_assistant import server, vector_index
+from wikipedia_assistant.vector_index import (
+    HashingEmbedder,
+    VectorIndex,
+    build,
+    load_embedder,
+    write_index,
+)
+
+DOCS = [
+    ("Photosynthesis", "Process by which plants use light energy to make sugar from water."),
+    ("Alan Turing", "English mathematician and computer scientist."),
+    ("Mercury (planet)", "The smallest planet in the Solar System and the closest to the Sun."),
+    ("Python (programming language)", "A high-level general-purpose programming language."),
+]
+
+
+class TinyEmbedder:
+    """Embeds a text as its letter counts; a stand-in for a model-backed embedder."""
+
+    dim = 26
+
+    def config(self):
+        return {"name": "tests.test_vector_index:TinyEmbedder"}
+
+    def embed(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for char in text.lower():
+                if "a" <= char <= "z":
+                    out[row, ord(char) - ord("a")] += 1
+        return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+
+
+class FixedEmbedder:
+    """Returns row `int(text)` of a fixed matrix, to query with known vectors."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed(self, texts):
+        return self.vectors[[int(text) for text in texts]]
+
+
+def _clustered_vectors(count, dim, seed, clusters=16):
+    """Unit vectors around `clusters` random centres, like embeddings of topics."""
+    rng = np.random.default_rng(seed)
+    centres = np.random.default_rng(0).standard_normal((clusters, dim))
+    vectors = centres[rng.integers(clusters, size=count)] + 0.5 * rng.standard_normal((count, dim))
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    """The same text always embeds the same way, as a unit vector."""
+    embedder = HashingEmbedder(64)
+    a, b, empty = embedder.embed(["Plants make sugar", "plants making sugar", "the of"])
+    assert np.allclose(a, HashingEmbedder(64).embed(["Plants make sugar"])[0])
+    assert np.isclose(np.linalg.norm(a), 1.0)
+    assert a @ b > 0.5
+    assert not empty.any()
+
+
+@pytest.mark.parametrize("dtype", ["int8", "float16"])
+def test_descriptive_queries_find_the_topic(tmp_path, dtype):
+    """Queries describing a topic rank its article first."""
+    path = str(tmp_path / "wiki.vec")
+    assert build(DOCS, path, dtype=dtype) == 4
+    index = VectorIndex(path)
+    assert index.search("that thing where plants make sugar from light", 1) == ["Photosynthesis"]
+    assert index.search_many(["smallest planets", "computer pioneer", "zzzz"], 1) == [
+        ["Mercury (planet)"], ["Alan Turing"], [],
+    ]
+    index.close()
+
+
+def test_ivf_probes_nearby_lists(tmp_path):
+    """Probing every list is exact; probing a few still finds most neighbours."""
+    path = str(tmp_path / "ivf.vec")
+    vectors = _clustered_vectors(2000, 32, seed=1)
+    write_index(
+        path, [vectors[:1000], vectors[1000:]], [f"Row {i}" for i in range(2000)],
+        embedder={"name": "hashing", "dim": 32}, nlist=16,
+    )
+    queries = _clustered_vectors(10, 32, seed=2)
+    index = VectorIndex(path, embedder=FixedEmbedder(queries), nprobe=16, min_score=-1)
+    texts = [str(i) for i in range(10)]
+
+    full = index.top_k_many(texts, 5)
+    assert full == index.top_k_many(texts, 5, exact=True)
+    # Rows are stored grouped by list, but titles still follow their vectors.
+    best = np.argmax(queries @ vectors.T, axis=1)
+    assert [int(hits[0][0].split()[1]) for hits in full] == list(best)
+
+    index.nprobe = 4
+    approximate = index.top_k_many(texts, 5)
+    found = sum(
+        len({title for title, _ in a} & {title for title, _ in f})
+        for a, f in zip(approximate, full)
+    )
+    assert found >= 40
+    index.close()
+
+
+def test_large_indexes_get_ivf_lists_by_default(tmp_path, monkeypatch):
+    """Exact search is the default only below IVF_MIN_ROWS rows, or with nlist=0."""
+    monkeypatch.setattr(vector_index, "IVF_MIN_ROWS", 1000)
+    vectors = _clustered_vectors(2000, 32, seed=1)
+    titles = [f"Row {i}" for i in range(2000)]
+    embedder = {"name": "hashing", "dim": 32}
+
+    def lists(count, **kwargs):
+        path = str(tmp_path / "auto.vec")
+        write_index(path, [vectors[:count]], titles[:count], embedder=embedder, **kwargs)
+        index = VectorIndex(path)
+        try:
+            return index.footer["nlist"]
+        finally:
+            index.close()
+
+    assert lists(999) == 0
+    assert lists(2000) == 45
+    assert lists(2000, nlist=0) == 0
+    assert lists(2000, nlist=8) == 8
+
+
+def test_custom_embedder_is_loaded_from_the_index(tmp_path):
+    """The embedder named in the index embeds the queries."""
+    path = str(tmp_path / "tiny.vec")
+    build(DOCS, path, embedder=TinyEmbedder())
+    index = VectorIndex(path)
+    assert isinstance(index.embedder, TinyEmbedder)
+    assert isinstance(load_embedder({"name": "hashing", "dim": 8}), HashingEmbedder)
+    with pytest.raises(ValueError):
+        load_embedder({"name": "nonsense"})
+    index.close()
+
+
+@pytest.fixture
+def semantic_index(fake_wiki, tmp_path):
+    path = str(tmp_path / "wiki.vec")
+    build(
+        [(t, p["extract"]) for t, p in fake_wiki.pages.items() if not p["disambiguation"]],
+        path,
+    )
+    index = VectorIndex(path)
+    yield index
+    index.close()
+
+
+def _run(fake_wiki, coro_factory):
+    async def run():
+        client = fake_wiki.client()
+        server.set_client(client)
+        try:
+            return await coro_factory()
+        finally:
+            server.set_client(None)
+            await client.aclose()
+
+    return asyncio.run(run())
+
+
+def test_semantic_mode_and_fallback(fake_wiki, semantic_index):
+    """semantic=True skips the keyword search; unmatched keyword queries fall back."""
+    query = "smallest world of the solar system"
+    assert _run(fake_wiki, lambda: server.fetch_wikipedia_info(query))["code"] == "no_results"
+
+    server.set_vector_index(semantic_index)
+    fallback = _run(fake_wiki, lambda: server.fetch_wikipedia_info(query))
+    assert fallback["title"] == "Mercury (planet)"
+
+    searches = len(fake_wiki.requests)
+    semantic = _run(
+        fake_wiki, lambda: server.fetch_wikipedia_info("code readability", semantic=True)
+    )
+    assert semantic["title"] == "Python (programming language)"
+    # One page request, no search.
+    assert len(fake_wiki.requests) == searches + 1
+
+    batch = _run(fake_wiki, lambda: server.fetch_wikipedia_info_batch(
+        ["computer scientist", query, "zzzz"], semantic=True
+    ))
+    assert [r.get("title") for r in batch] == ["Alan Turing", "Mercury (planet)", None]
+    assert batch[2]["code"] == "no_results"
+
+
+def test_semantic_mode_needs_an_index(fake_wiki):
+    """Without an index for the language, semantic lookups are unsupported."""
+    result = _run(fake_wiki, lambda: server.fetch_wikipedia_info("anything", semantic=True))
+    assert result["code"] == "unsupported"
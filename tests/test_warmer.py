@@ -0,0 +1,87 @@
+"""Test the popular-article cache warmer."""
+import asyncio
+import gzip
+
+import httpx
+
+from wikipedia_assistant.cache import ResultCache
+from wikipedia_assistant.warmer import read_titles, warm
+from wikipedia_assistant.wikipedia_client import WikipediaClient
+
+
+def test_read_titles_from_plain_list(tmp_path):
+    """Plain lists keep their order; namespaces and the main page are skipped."""
+    path = tmp_path / "top.txt"
+    path.write_text(
+        "# most read\nAlan_Turing\nMain_Page\nSpecial:Search\n"
+        "Star Wars: Andor\n\nPython (programming language)\n",
+        encoding="utf-8",
+    )
+    assert read_titles(str(path)) == [
+        "Alan Turing", "Star Wars: Andor", "Python (programming language)"
+    ]
+    assert read_titles(str(path), limit=1) == ["Alan Turing"]
+
+
+def test_read_titles_from_pageviews_dump(tmp_path):
+    """Desktop and mobile views of the language are summed and ranked."""
+    path = tmp_path / "pageviews-20240101-000000.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(
+            "de Alan_Turing 900 0\n"
+            "en Alan_Turing 10 0\n"
+            "en.m Alan_Turing 15 0\n"
+            "en Mercury_(planet) 20 0\n"
+            "en.b Python 99 0\n"
+            "en - 500 0\n"
+        )
+    assert read_titles(str(path)) == ["Alan Turing", "Mercury (planet)"]
+    assert read_titles(str(path), lang="de") == ["Alan Turing"]
+
+
+def test_warm_fills_the_cache_in_batches(fake_wiki):
+    """Titles are packed into one request; misses and ambiguous pages are skipped."""
+    cache = ResultCache(":memory:")
+    titles = ["Alan Turing", "Turing", "Mercury", "Nope", "Python (programming language)"]
+
+    async def run():
+        async with fake_wiki.client() as client:
+            return await warm(client, cache, titles)
+
+    assert asyncio.run(run()) == 3
+    assert len(fake_wiki.requests) == 1
+    assert cache.get("Turing", "en")["title"] == "Alan Turing"
+    assert cache.get("Python (programming language)", "en")["url"].endswith("_language)")
+    assert cache.get("Mercury", "en") is None
+
+    fake_wiki.requests.clear()
+    asyncio.run(run())
+    requested = fake_wiki.requests[0].url.params["titles"].split("|")
+    assert requested == ["Mercury", "Nope"]
+
+
+def test_warm_bounds_concurrent_batches(fake_wiki):
+    """No more than `concurrency` batch requests are in flight at once."""
+    in_flight = 0
+    peak = 0
+    handle = fake_wiki.handle
+
+    async def slow_handle(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return handle(request)
+
+    async def run():
+        transport = httpx.MockTransport(slow_handle)
+        async with WikipediaClient(transport=transport) as client:
+            return await warm(
+                client, ResultCache(":memory:"), list(fake_wiki.pages),
+                batch_size=1, concurrency=2,
+            )
+
+    assert asyncio.run(run()) == 3
+    assert len(fake_wiki.requests) == 4
+    assert peak == 2
@@ -1,4 +1,5 @@
 """Test the Wikipedia fetch tool implementation."""
+import asyncio
 import pytest
 import sys
 import os
@@ -6,12 +7,26 @@ import os
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from wikipedia_assistant.server import fetch_wikipedia_info
+from wikipedia_assistant import server
+from wikipedia_assistant.wikipedia_client import WikipediaClient
 
 
-def test_fetch_wikipedia_info_success():
+def fetch_wikipedia_info(transport, query):
+    """Run the async tool against recorded Wikipedia responses."""
+    async def run():
+        async with WikipediaClient(transport=transport()) as client:
+            server.set_client(client)
+            try:
+                return await server.fetch_wikipedia_info(query)
+            finally:
+                server.set_client(None)
+
+    return asyncio.run(run())
+
+
+def test_fetch_wikipedia_info_success(replay_transport):
     """Test successful Wikipedia query."""
-    result = fetch_wikipedia_info("Python programming language")
+    result = fetch_wikipedia_info(replay_transport, "Python programming language")
     
     assert isinstance(result, dict)
     assert "title" in result
@@ -25,19 +40,19 @@ def test_fetch_wikipedia_info_success():
     assert result["url"].startswith("https://en.wikipedia.org/wiki/")
 
 
-def test_fetch_wikipedia_info_no_results():
+def test_fetch_wikipedia_info_no_results(replay_transport):
     """Test query with no results."""
-    result = fetch_wikipedia_info("xyznonexistentquery123456")
+    result = fetch_wikipedia_info(replay_transport, "xyznonexistentquery123456")
     
     assert isinstance(result, dict)
     assert "error" in result
     assert "No results found" in result["error"]
 
 
-def test_fetch_wikipedia_info_ambiguous():
+def test_fetch_wikipedia_info_ambiguous(replay_transport):
     """Test ambiguous query that triggers disambiguation."""
     # "Mercury" is typically ambiguous (planet, element, etc.)
-    result = fetch_wikipedia_info("Mercury")
+    result = fetch_wikipedia_info(replay_transport, "Mercury")
     
     assert isinstance(result, dict)
     # This might return either a valid result or disambiguation error
@@ -51,9 +66,9 @@ def test_fetch_wikipedia_info_ambiguous():
         assert "url" in result
 
 
-def test_fetch_wikipedia_info_basic_functionality():
+def test_fetch_wikipedia_info_basic_functionality(replay_transport):
     """Test basic functionality with a well-known topic."""
-    result = fetch_wikipedia_info("Albert Einstein")
+    result = fetch_wikipedia_info(replay_transport, "Albert Einstein")
     
     assert isinstance(result, dict)
     if "error" not in result: